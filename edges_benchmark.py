@@ -0,0 +1,353 @@
+"""Reproducible benchmark of every method x colour space x image size x precision.
+
+    python edges_benchmark.py -o bench.json
+    python edges_benchmark.py -o new.json --baseline bench.json --tolerance 0.15
+    python edges_benchmark.py -p float64 float32 integer --no-references
+
+Images are a seeded synthetic scene and bundled samples (SAMPLES_DIR),
+resized to every requested size. Each (image, size, colour space, method,
+precision) runs `detect_edges(..., cache=False)` `--repeat` times after one
+warm-up; `--precision` selects the compute modes (`edges_methods.PRECISIONS`,
+float64 only by default) and the reference entries, which have none, are
+recorded as float64. The report holds the median and minimum wall time, the
+throughput in megapixels per second of the median, and the peak traced
+allocation of one extra run (tracemalloc: Python / numpy buffers, not
+OpenCV-internal ones).
+
+The reference entries time the legacy cv2.Sobel path (`sobel_edges_old`,
+per channel; cv2.Canny is benchmarked as the 'Canny CV2' method) and the
+colour decomposition: exact converter (cv2.cvtColor, CMYK float32 formula),
+the path `detect_edges` uses and the 3-D lookup table of `edges_color`. The
+two NMS entries time Canny's non-maximum suppression alone, the legacy
+per-pixel loop (`non_max_suppression_loop`) against `non_max_suppression`,
+on the first channel's gradients (computed once per image, not timed).
+
+With `--baseline` every entry whose median is more than `--tolerance` slower
+than the baseline is reported as a regression and the exit code is 1.
+
+`--coarse-to-fine LEVELS` reports coarse-to-fine detection instead (see
+`edges_pyramid`): speed-up over the full run, ROI share, recall of the full
+run's edges and the largest edge-sum error inside the ROI.
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+
+import cv2
+import numpy as np
+
+from edges_color import CONVERTERS, cmyk_reference, convert_lut
+from edges_detection import (COLOR_SPACE_CHANNELS, METHODS, decompose_color_space, detect_edges,
+                             detect_edges_coarse_to_fine)
+from edges_io import open_image
+from edges_cache import image_key
+from edges_methods import (EDGE_STAGES, PRECISIONS, canny_gradients, non_max_suppression,
+                           non_max_suppression_loop, sobel_edges_old)
+from edges_pyramid import DEFAULT_ROI_THRESHOLD
+
+SAMPLES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "Przykładowe obrazy")
+
+DEFAULT_SIZES = ('512x512', '1024x1024', '1920x1080')
+DEFAULT_IMAGES = ('synthetic', 'prague.jpg')
+
+# Edge-sum level counted as an edge by the coarse-to-fine recall
+EDGE_LEVEL = 64
+
+
+def _legacy_sobel(img, color_space):
+    stack = decompose_color_space(img, color_space)
+    return [sobel_edges_old(stack[..., c]) for c in range(stack.shape[-1])]
+
+
+_nms_inputs = {}
+
+
+def _nms_input(img, color_space):
+    # Canny's magnitude / direction of the first channel, kept for the image being benchmarked
+    key = (image_key(img), color_space)
+    if key not in _nms_inputs:
+        _nms_inputs.clear()
+        mag, angle = canny_gradients(decompose_color_space(img, color_space)[..., 0])
+        _nms_inputs[key] = mag[0], angle[0]
+    return _nms_inputs[key]
+
+
+def _nms_loop(img, color_space):
+    return non_max_suppression_loop(*_nms_input(img, color_space))
+
+
+def _nms_vectorized(img, color_space):
+    return non_max_suppression(*_nms_input(img, color_space))
+
+
+# reference implementations timed next to the methods: name -> (function, colour spaces or None for all)
+REFERENCES = {
+    'cv2 Sobel (legacy)': (_legacy_sobel, None),
+    'decomposition (exact)': (lambda img, color_space: (cmyk_reference(img) if color_space == 'CMYK'
+                                                        else CONVERTERS[color_space](img)),
+                              ('HSV', 'LAB', 'CMYK')),
+    'decomposition (pipeline)': (decompose_color_space, ('HSV', 'LAB', 'CMYK')),
+    'decomposition (3-D table)': (convert_lut, ('HSV', 'LAB', 'CMYK')),
+    'NMS (loop)': (_nms_loop, ('RGB',)),
+    'NMS (vectorized)': (_nms_vectorized, ('RGB',)),
+}
+
+
+def parse_size(text):
+    """'WIDTHxHEIGHT' -> (width, height)"""
+    try:
+        w, h = (int(v) for v in text.lower().split('x'))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"size must look like WIDTHxHEIGHT, got {text!r}")
+    return w, h
+
+
+def synthetic_image(width, height, seed=0):
+    """Seeded BGR test scene: smooth noise with discs, rectangles and lines."""
+    rng = np.random.default_rng(seed)
+    img = cv2.GaussianBlur(rng.integers(0, 256, (height, width, 3), dtype=np.uint8), (0, 0), 2)
+    for _ in range(20):
+        x, y = int(rng.integers(0, width)), int(rng.integers(0, height))
+        color = tuple(int(c) for c in rng.integers(0, 256, 3))
+        size = int(rng.integers(5, max(6, min(width, height) // 6)))
+        shape = rng.integers(0, 3)
+        if shape == 0:
+            cv2.circle(img, (x, y), size, color, -1)
+        elif shape == 1:
+            cv2.rectangle(img, (x, y), (x + size, y + size // 2), color, -1)
+        else:
+            cv2.line(img, (x, y), (width - x, height - y), color, 3)
+    return img
+
+
+def load_image(name, width, height):
+    if name == 'synthetic':
+        return synthetic_image(width, height)
+    img = open_image(os.path.join(SAMPLES_DIR, name))
+    return cv2.resize(np.ascontiguousarray(img), (width, height), interpolation=cv2.INTER_AREA)
+
+
+def _time(run, repeat):
+    run()  # warm-up
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def _peak_bytes(run):
+    tracemalloc.start()
+    try:
+        run()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def run_benchmark(images=DEFAULT_IMAGES, sizes=DEFAULT_SIZES, color_spaces=None, methods=None,
+                  references=True, repeat=3, progress=None, precisions=('float64',)):
+    """Runs the benchmark matrix; returns the list of result records."""
+    color_spaces = color_spaces or list(COLOR_SPACE_CHANNELS)
+    methods = methods or list(METHODS)
+    entries = [(m, None, None, p) for m in methods for p in precisions]
+    if references:
+        # the references have no precision mode; recorded as float64
+        entries += [(name, func, spaces, 'float64') for name, (func, spaces) in REFERENCES.items()]
+
+    results = []
+    for image_name in images:
+        for size in sizes:
+            width, height = parse_size(size) if isinstance(size, str) else size
+            img = load_image(image_name, width, height)
+            megapixels = width * height / 1e6
+
+            for color_space in color_spaces:
+                for name, reference, spaces, precision in entries:
+                    if spaces is not None and color_space not in spaces:
+                        continue
+                    if reference is None:
+                        def run(cs=color_space, m=name, p=precision):
+                            detect_edges(img, cs, m, precision=p, cache=False)
+                    else:
+                        def run(cs=color_space, f=reference):
+                            f(img, cs)
+
+                    times = _time(run, repeat)
+                    median = statistics.median(times)
+                    record = dict(image=image_name, size=f"{width}x{height}", color_space=color_space,
+                                  method=name, precision=precision, reference=reference is not None,
+                                  median_s=median, min_s=min(times), repeat=repeat,
+                                  mp_per_s=megapixels / median if median > 0 else None,
+                                  peak_bytes=_peak_bytes(run))
+                    results.append(record)
+                    if progress:
+                        progress(record)
+    return results
+
+
+def compare_coarse_to_fine(img, color_space='RGB', method='Sobel', levels=2,
+                           roi_threshold=DEFAULT_ROI_THRESHOLD, repeat=3, edge_level=EDGE_LEVEL):
+    """Full vs coarse-to-fine run of one image: median times, ROI share, recall and error.
+
+    recall: share of the full run's edge-sum pixels >= `edge_level` that are
+    >= `edge_level` in the coarse-to-fine result as well; max_error: largest
+    edge-sum difference inside the ROI.
+    """
+    def full():
+        return detect_edges(img, color_space, method, cache=False)[2]
+
+    def coarse_to_fine():
+        return detect_edges_coarse_to_fine(img, color_space, method, levels=levels,
+                                           roi_threshold=roi_threshold)
+
+    full_s = statistics.median(_time(full, repeat))
+    c2f_s = statistics.median(_time(coarse_to_fine, repeat))
+    full_sum = full()
+    _, c2f_sum, mask = coarse_to_fine()
+
+    edges = full_sum >= edge_level
+    found = edges & (c2f_sum >= edge_level)
+    diff = np.abs(full_sum.astype(np.int16) - c2f_sum)
+    return dict(size=f"{img.shape[1]}x{img.shape[0]}", color_space=color_space, method=method,
+                levels=levels, full_s=full_s, coarse_to_fine_s=c2f_s, speedup=full_s / c2f_s,
+                roi_fraction=float(mask.mean()),
+                recall=float(found.sum() / edges.sum()) if edges.any() else 1.0,
+                max_error=int(diff[mask].max()) if mask.any() else 0)
+
+
+def run_coarse_to_fine(images, sizes, color_spaces, methods, levels, roi_threshold, repeat, progress=None):
+    """`compare_coarse_to_fine` over the benchmark matrix; `sizes` None keeps the native sizes."""
+    results = []
+    for image_name in images:
+        for size in sizes or [None]:
+            if size is None and image_name != 'synthetic':
+                img = np.ascontiguousarray(open_image(os.path.join(SAMPLES_DIR, image_name)))
+            else:
+                img = load_image(image_name, *parse_size(size or DEFAULT_SIZES[0]))
+            for color_space in color_spaces:
+                for method in methods:
+                    record = dict(image=image_name, **compare_coarse_to_fine(
+                        img, color_space, method, levels, roi_threshold, repeat))
+                    results.append(record)
+                    if progress:
+                        progress(record)
+    return results
+
+
+def environment():
+    return dict(
+        date=datetime.datetime.now().isoformat(timespec='seconds'),
+        python=platform.python_version(),
+        numpy=np.__version__,
+        opencv=cv2.__version__,
+        platform=platform.platform(),
+        processor=platform.processor(),
+        cpu_count=os.cpu_count(),
+    )
+
+
+def _key(record):
+    # reports written before the precision dimension hold float64 runs only
+    return (record['image'], record['size'], record['color_space'], record['method'],
+            record.get('precision', 'float64'))
+
+
+def compare(results, baseline, tolerance=0.10):
+    """Entries whose median is more than `tolerance` (fraction) slower than in `baseline`."""
+    previous = {_key(r): r for r in baseline}
+    regressions = []
+    for record in results:
+        old = previous.get(_key(record))
+        if old is None or not old['median_s']:
+            continue
+        ratio = record['median_s'] / old['median_s']
+        if ratio > 1 + tolerance:
+            regressions.append(dict(record, baseline_median_s=old['median_s'], slowdown=ratio))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark of the edge detection methods.")
+    parser.add_argument('-o', '--output', default=None, help="JSON report path")
+    parser.add_argument('--images', nargs='+', default=list(DEFAULT_IMAGES),
+                        help="'synthetic' and/or sample file names")
+    parser.add_argument('--all-samples', action='store_true', help="use every bundled sample image")
+    parser.add_argument('--sizes', nargs='+', default=None,
+                        help="WIDTHxHEIGHT (default: DEFAULT_SIZES; native sizes with --coarse-to-fine)")
+    parser.add_argument('-c', '--color-spaces', nargs='+', default=None, choices=list(COLOR_SPACE_CHANNELS))
+    parser.add_argument('-m', '--methods', nargs='+', default=None, choices=list(METHODS))
+    parser.add_argument('-p', '--precision', nargs='+', default=['float64'], choices=list(PRECISIONS),
+                        help="compute modes of the methods (default: float64)")
+    parser.add_argument('--no-references', action='store_true', help="skip the legacy cv2 reference paths")
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--baseline', default=None, help="earlier JSON report to compare against")
+    parser.add_argument('--tolerance', type=float, default=0.10,
+                        help="allowed slowdown against the baseline (fraction)")
+    parser.add_argument('--coarse-to-fine', type=int, default=None, metavar='LEVELS',
+                        help="report coarse-to-fine detection with this many pyramid levels")
+    parser.add_argument('--roi-threshold', type=float, default=DEFAULT_ROI_THRESHOLD)
+    args = parser.parse_args(argv)
+
+    for size in args.sizes or ():
+        parse_size(size)
+    images = args.images
+    if args.all_samples:
+        images = ['synthetic'] + sorted(os.listdir(SAMPLES_DIR))
+
+    if args.coarse_to_fine:
+        methods = args.methods or ['Sobel', 'Canny', 'Laplacian LoG']
+        unsupported = [m for m in methods if EDGE_STAGES[METHODS[m]].response is None]
+        if unsupported:
+            parser.error(f"no coarse-to-fine mode for: {', '.join(unsupported)}")
+
+        def c2f_progress(r):
+            print(f"{r['image']:<14} {r['size']:>10} {r['color_space']:<5} {r['method']:<22} "
+                  f"x{r['speedup']:5.2f}  roi {r['roi_fraction']:6.1%}  recall {r['recall']:6.1%}  "
+                  f"max error {r['max_error']}")
+
+        results = run_coarse_to_fine(images, args.sizes, args.color_spaces or ['RGB'],
+                                     methods,
+                                     args.coarse_to_fine, args.roi_threshold, args.repeat, c2f_progress)
+        if args.output:
+            with open(args.output, 'w', encoding='utf-8') as f:
+                json.dump(dict(environment=environment(), coarse_to_fine=results), f, indent=2)
+        return 0
+
+    def progress(r):
+        print(f"{r['image']:<14} {r['size']:>10} {r['color_space']:<5} {r['method']:<28} "
+              f"{r['precision']:<8} {r['median_s'] * 1000:9.1f} ms {r['mp_per_s']:8.2f} MP/s "
+              f"{r['peak_bytes'] / 2**20:8.1f} MiB")
+
+    results = run_benchmark(images, args.sizes or DEFAULT_SIZES, args.color_spaces, args.methods,
+                            not args.no_references, args.repeat, progress, args.precision)
+    report = dict(environment=environment(), results=results)
+
+    status = 0
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)['results']
+        regressions = compare(results, baseline, args.tolerance)
+        report['baseline'] = args.baseline
+        report['regressions'] = regressions
+        for r in regressions:
+            print(f"REGRESSION {r['image']} {r['size']} {r['color_space']} {r['method']} {r['precision']}: "
+                  f"{r['baseline_median_s'] * 1000:.1f} -> {r['median_s'] * 1000:.1f} ms "
+                  f"(x{r['slowdown']:.2f})", file=sys.stderr)
+        status = 1 if regressions else 0
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+    return status
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,204 @@
+"""Caches shared by the detection pipeline.
+
+`image_key` identifies an image by its content (shape, dtype and a blake2b
+hash of the pixels), hashed again on every call so that arrays modified in
+place never hit the entries of their earlier content.
+
+`LRUCache` is a thread-safe least-recently-used mapping bounded by the total
+`nbytes` of its values. Cached arrays are made read-only, so a caller cannot
+silently corrupt what later callers get.
+
+`ConversionCache` keeps colour-space decompositions, so every decomposition
+of a loaded image is computed once, however many frames or methods use it.
+
+`ResultCache` memoizes edge results (tuples of arrays), optionally persisted
+as '.npz' files in a directory so that they survive restarts; `memoized`
+wraps a single edge operator with such a cache.
+"""
+import functools
+import hashlib
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+# Default byte budget of the colour-conversion cache
+DEFAULT_CONVERSION_CACHE_BYTES = 256 * 2**20
+
+# Default byte budget of the threshold-independent response cache (float planes)
+DEFAULT_RESPONSE_CACHE_BYTES = 512 * 2**20
+
+# Default byte budget of the in-memory result cache
+DEFAULT_RESULT_CACHE_BYTES = 256 * 2**20
+
+# Part of every on-disk key; bump it when the operators change their output
+RESULT_CACHE_VERSION = 1
+
+_MISSING = object()
+
+
+def image_key(img):
+    """Content key of `img`: shape, dtype and a blake2b hash of the pixels.
+
+    Hashed on every call (about 5 ms per megapixel), so a buffer modified in
+    place and passed again - a reused capture frame, a preallocated array -
+    gets a new key instead of the results of its previous content.
+    """
+    h = hashlib.blake2b(digest_size=16)
+    h.update(repr((img.shape, img.dtype.str)).encode())
+    h.update(memoryview(np.ascontiguousarray(img)).cast('B'))
+    return h.hexdigest()
+
+
+def _nbytes(value):
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, (tuple, list)):
+        return sum(_nbytes(v) for v in value)
+    return 0
+
+
+def _freeze(value):
+    if isinstance(value, np.ndarray):
+        value.setflags(write=False)
+    elif isinstance(value, (tuple, list)):
+        for v in value:
+            _freeze(v)
+    return value
+
+
+class LRUCache:
+    """Least-recently-used cache bounded by the total size (bytes) of its values."""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key not in self._entries:
+                self.misses += 1
+                return default
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return self._entries[key][0]
+
+    def put(self, key, value):
+        """Stores `value` (made read-only); values larger than the whole budget are not kept."""
+        size = _nbytes(value)
+        _freeze(value)
+        with self._lock:
+            if key in self._entries:
+                self.nbytes -= self._entries.pop(key)[1]
+            if size > self.max_bytes:
+                return value
+            self._entries[key] = (value, size)
+            self.nbytes += size
+            while self.nbytes > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self.nbytes -= evicted
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.nbytes = 0
+
+    def stats(self):
+        return dict(hits=self.hits, misses=self.misses, entries=len(self._entries),
+                    nbytes=self.nbytes, max_bytes=self.max_bytes)
+
+
+class ConversionCache(LRUCache):
+    """Colour-space decompositions keyed on (image content, colour space).
+
+    `convert(img, color_space)` computes a missing decomposition.
+    """
+
+    def __init__(self, convert, max_bytes=DEFAULT_CONVERSION_CACHE_BYTES):
+        super().__init__(max_bytes)
+        self.convert = convert
+
+    def decompose(self, img, color_space, img_key=None):
+        """Decomposition of `img`; `img_key` is its `image_key` when the caller already has it."""
+        key = (img_key or image_key(img), color_space)
+        stack = self.get(key)
+        if stack is None:
+            stack = self.put(key, self.convert(img, color_space))
+        return stack
+
+
+class ResultCache(LRUCache):
+    """Memoized edge results: tuples of arrays keyed on any repr-stable tuple.
+
+    With `cache_dir` every stored result is also written there as '.npz' and
+    results missing in memory are looked up on disk (`disk_hits` counts those).
+    """
+
+    def __init__(self, max_bytes=DEFAULT_RESULT_CACHE_BYTES, cache_dir=None):
+        super().__init__(max_bytes)
+        self.cache_dir = cache_dir
+        self.disk_hits = 0
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    def _path(self, key):
+        digest = hashlib.blake2b(repr((RESULT_CACHE_VERSION, key)).encode(), digest_size=16)
+        return os.path.join(self.cache_dir, digest.hexdigest() + '.npz')
+
+    def get(self, key, default=None):
+        value = super().get(key, _MISSING)
+        if value is _MISSING and self.cache_dir:
+            path = self._path(key)
+            if os.path.exists(path):
+                with np.load(path) as data:
+                    value = tuple(data[f'arr_{i}'] for i in range(len(data.files)))
+                with self._lock:
+                    self.misses -= 1
+                    self.hits += 1
+                    self.disk_hits += 1
+                super().put(key, value)
+        return default if value is _MISSING else value
+
+    def put(self, key, value):
+        value = super().put(key, tuple(value))
+        if self.cache_dir:
+            path = self._path(key)
+            if not os.path.exists(path):
+                # written under a temporary name, so readers never see a partial file
+                fd, tmp = tempfile.mkstemp(suffix='.npz', dir=self.cache_dir)
+                with os.fdopen(fd, 'wb') as f:
+                    np.savez(f, *value)
+                os.replace(tmp, path)
+        return value
+
+    def stats(self):
+        return dict(super().stats(), disk_hits=self.disk_hits)
+
+
+def memoized(edge_func, cache):
+    """Wraps an edge operator `edge_func(channel, *args, **kwargs)` with `cache`.
+
+    The key is the operator name, the content of `channel` and the remaining
+    arguments. The returned edge map is read-only.
+    """
+    @functools.wraps(edge_func)
+    def wrapper(channel, *args, **kwargs):
+        key = (edge_func.__name__, image_key(channel), args, tuple(sorted(kwargs.items())))
+        result = cache.get(key)
+        if result is None:
+            result = cache.put(key, (edge_func(channel, *args, **kwargs),))
+        return result[0]
+    return wrapper
@@ -0,0 +1,211 @@
+"""Headless batch edge detection.
+
+Runs `detect_edges` over every image given on the command line (files,
+directories or glob patterns) for a matrix of colour spaces x methods x
+thresholds, spread over a process pool, e.g.:
+
+    python edges_cli.py "Przykładowe obrazy" -o results -c RGB LAB -m Sobel Canny -t 0:255 50:150
+
+For every job the edge sum (and with --save-channels every channel edge map)
+is written as PNG into the output directory, and one JSON line with the
+timing and status of the job is appended to `results.jsonl` as soon as its
+image is done. Failed jobs are recorded and make the exit code non-zero;
+--fail-fast cancels the remaining work on the first failure. Ctrl+C cancels
+pending images and waits for the running ones. With --cache-dir the edge
+maps are memoized on disk, so a rerun only computes new configurations;
+the workers keep no results in memory (every job runs once per image), and
+the decompositions and responses shared by the jobs of an image are
+dropped when it is done. Without it nothing is cached.
+"""
+import argparse
+import glob
+import json
+import os
+import signal
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import cv2
+import numpy as np
+
+import edges_detection
+from edges_cache import ResultCache
+from edges_detection import COLOR_SPACE_CHANNELS, METHODS, detect_edges
+from edges_io import open_image
+from edges_methods import PRECISIONS
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.bmp', '.tif', '.tiff', '.npy')
+
+
+def collect_images(patterns):
+    """Expands files, directories and glob patterns into a sorted list of image paths."""
+    paths = set()
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            candidates = [os.path.join(pattern, name) for name in os.listdir(pattern)]
+        else:
+            candidates = glob.glob(pattern, recursive=True)
+        paths.update(p for p in candidates
+                     if os.path.isfile(p) and p.lower().endswith(IMAGE_EXTENSIONS))
+    return sorted(paths)
+
+
+def parse_threshold(text):
+    """'low:high' -> (low, high)"""
+    try:
+        low, high = (int(v) for v in text.split(':'))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"threshold must look like LOW:HIGH, got {text!r}")
+    return low, high
+
+
+def job_name(path, color_space, method, low, high):
+    stem = os.path.splitext(os.path.basename(path))[0]
+    return f"{stem}_{color_space}_{method.replace(' ', '-')}_{low}-{high}"
+
+
+def _save_png(path, image):
+    # imencode + tofile works for non-ASCII paths, unlike cv2.imwrite on Windows
+    ok, data = cv2.imencode('.png', np.ascontiguousarray(image))
+    if not ok:
+        raise IOError(f"Cannot encode {path}")
+    data.tofile(path)
+
+
+def _init_worker(cache_dir=None):
+    # Ctrl+C is handled by the parent, which cancels the pool
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    if cache_dir:
+        # results of earlier runs are reused from disk; none is requested twice in
+        # a run, so the in-memory layer gets no budget
+        edges_detection.result_cache = ResultCache(max_bytes=0, cache_dir=cache_dir)
+
+
+def process_image(path, jobs, output_dir, save_channels=False, options=None):
+    """Runs all (color_space, method, low, high) `jobs` on one image, in a worker process.
+
+    Returns one record per job: name, parameters, status, seconds and error.
+    """
+    options = options or {}
+    records = []
+
+    try:
+        start = time.perf_counter()
+        img = open_image(path)
+        load_seconds = time.perf_counter() - start
+    except Exception as e:
+        return [dict(image=path, color_space=cs, method=m, low=lo, high=hi, status='error',
+                     error=f"load: {e}") for cs, m, lo, hi in jobs]
+
+    for color_space, method, low, high in jobs:
+        name = job_name(path, color_space, method, low, high)
+        record = dict(image=path, name=name, color_space=color_space, method=method,
+                      low=low, high=high, load_seconds=load_seconds)
+        try:
+            start = time.perf_counter()
+            _, edges, edges_sum, titles = detect_edges(img, color_space, method,
+                                                       low_threshold=low, high_threshold=high,
+                                                       **options)
+            record['detect_seconds'] = time.perf_counter() - start
+
+            start = time.perf_counter()
+            _save_png(os.path.join(output_dir, f"{name}_sum.png"), edges_sum)
+            if save_channels:
+                for title, e in zip(titles, edges):
+                    _save_png(os.path.join(output_dir, f"{name}_{title.replace('CHANNEL_', '')}.png"), e)
+            record['save_seconds'] = time.perf_counter() - start
+            record['status'] = 'ok'
+        except Exception as e:
+            record['status'] = 'error'
+            record['error'] = str(e)
+        records.append(record)
+
+    # only the jobs of this image could reuse its decompositions and responses
+    edges_detection.conversion_cache.clear()
+    edges_detection.response_cache.clear()
+    return records
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Batch edge detection over images.")
+    parser.add_argument('inputs', nargs='+', help="image files, directories or glob patterns")
+    parser.add_argument('-o', '--output-dir', required=True, help="directory for results")
+    parser.add_argument('-c', '--color-spaces', nargs='+', default=['RGB'],
+                        choices=list(COLOR_SPACE_CHANNELS))
+    parser.add_argument('-m', '--methods', nargs='+', default=['Sobel'], choices=list(METHODS))
+    parser.add_argument('-t', '--thresholds', nargs='+', type=parse_threshold, default=[(0, 255)],
+                        help="LOW:HIGH pairs")
+    parser.add_argument('-j', '--workers', type=int, default=os.cpu_count(),
+                        help="worker processes (default: all cores)")
+    parser.add_argument('--precision', default='float64', choices=PRECISIONS)
+    parser.add_argument('--tile-size', type=int, default=None, help="tiled execution, tile side in px")
+    parser.add_argument('--max-memory', type=int, default=None,
+                        help="tiled execution, peak working set per job in MiB")
+    parser.add_argument('--save-channels', action='store_true', help="also save every channel edge map")
+    parser.add_argument('--cache-dir', default=None,
+                        help="persist results here and reuse them in later runs")
+    parser.add_argument('--fail-fast', action='store_true', help="stop on the first failed job")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+
+    images = collect_images(args.inputs)
+    if not images:
+        print("No images found.", file=sys.stderr)
+        return 2
+    os.makedirs(args.output_dir, exist_ok=True)
+
+    jobs = [(cs, m, low, high) for cs in args.color_spaces for m in args.methods
+            for low, high in args.thresholds]
+    options = dict(precision=args.precision, tile_size=args.tile_size,
+                   max_memory=args.max_memory * 2**20 if args.max_memory else None,
+                   cache=bool(args.cache_dir))
+
+    failures = 0
+    done = 0
+    total = len(images) * len(jobs)
+    started = time.perf_counter()
+
+    executor = ProcessPoolExecutor(max_workers=args.workers, initializer=_init_worker,
+                                   initargs=(args.cache_dir,))
+    try:
+        with open(os.path.join(args.output_dir, 'results.jsonl'), 'a', encoding='utf-8') as log:
+            futures = {executor.submit(process_image, path, jobs, args.output_dir,
+                                       args.save_channels, options): path for path in images}
+            for future in as_completed(futures):
+                try:
+                    records = future.result()
+                except Exception as e:
+                    # the worker itself died (e.g. out of memory)
+                    records = [dict(image=futures[future], status='error', error=repr(e))]
+
+                for record in records:
+                    log.write(json.dumps(record) + '\n')
+                    done += 1
+                    if record['status'] != 'ok':
+                        failures += 1
+                        print(f"[{done}/{total}] FAILED {record.get('name', record['image'])}: "
+                              f"{record['error']}", file=sys.stderr)
+                    else:
+                        print(f"[{done}/{total}] {record['name']} {record['detect_seconds']:.3f}s")
+                log.flush()
+
+                if failures and args.fail_fast:
+                    print("Stopping after failure.", file=sys.stderr)
+                    break
+    except KeyboardInterrupt:
+        print("Interrupted, cancelling pending images.", file=sys.stderr)
+        failures += 1
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+
+    elapsed = time.perf_counter() - started
+    print(f"{done} jobs, {failures} failed, {elapsed:.1f}s")
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,277 @@
+"""Lookup-table colour conversions of 8-bit BGR images.
+
+Every decomposition of `edges_detection` is a function of the pixel's
+(B, G, R) value alone, so it can be tabulated once and applied to a whole
+image as a gather:
+
+- CMYK uses two small tables (`cmyk_tables`): C depends only on R and
+  max(R, G, B), likewise M and Y, and K only on the max. `decompose_cmyk` is
+  bit-identical to the float32 formula (`cmyk_reference`).
+- Any colour space can use a 3-D table (`ConversionTables`) indexed by the
+  packed BGR value: 2^24 entries at 8 bits (48 MiB for three channels), or
+  a quantized 2^(3 * bits) table whose entries hold the conversion of the
+  bin centres. Tables are built lazily from the exact converter and, with a
+  `cache_dir`, stored as '.npy' files that later processes map read-only.
+
+Full tables reproduce their converter exactly; `verify_tables` checks the
+gather path against `cv2.cvtColor` / `cmyk_reference` on every 8-bit colour
+and reports the error of quantized tables (largest near black and gray,
+where hue, saturation and CMY are singular).
+
+cv2.cvtColor remains the faster path for HSV and LAB (its SIMD kernels beat
+a random gather into a 48 MiB table), so `edges_detection` tabulates CMYK
+only, with the small tables: the 3-D CMYK table gathers about twice as fast
+but costs 64 MiB in every process (see `edges_benchmark`).
+"""
+import os
+import tempfile
+import threading
+
+import cv2
+import numpy as np
+
+# Pixels per band of the gather loops (bounds their scratch buffers)
+BAND_PIXELS = 1 << 16
+
+# Part of every table file name; bump it when a converter changes its output
+TABLE_VERSION = 1
+
+
+# ------------------------------------------------------------------------------
+#  CMYK
+# ------------------------------------------------------------------------------
+def cmyk_reference(img):
+    """CMYK stack of a BGR image from the float32 formula; the reference of `decompose_cmyk`."""
+    img_rgb = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
+    rgb = img_rgb.astype(np.float32) / 255.0
+    r, g, b = cv2.split(rgb)
+
+    c = 1 - r
+    m = 1 - g
+    y = 1 - b
+
+    k = np.minimum(np.minimum(c, m), y)
+
+    denom = 1 - k
+    denom[denom == 0] = 1
+
+    c_final = (c - k) / denom
+    m_final = (m - k) / denom
+    y_final = (y - k) / denom
+
+    C = (c_final * 255).astype(np.uint8)
+    M = (m_final * 255).astype(np.uint8)
+    Y = (y_final * 255).astype(np.uint8)
+    K = (k * 255).astype(np.uint8)
+
+    return cv2.merge([C, M, Y, K])
+
+
+_cmyk_tables = None
+
+
+def cmyk_tables():
+    """Lookup tables of `decompose_cmyk`: (256, 256) CMY[value, max(R, G, B)] and (256,) K[max].
+
+    C depends only on R and max(R, G, B) (K = 1 - max), likewise M and Y, so
+    the tables are taken from `cmyk_reference` over every (value, max) pair and
+    reproduce it bit for bit. Built on first use.
+    """
+    global _cmyk_tables
+    if _cmyk_tables is None:
+        value, maximum = np.meshgrid(np.arange(256, dtype=np.uint8), np.arange(256, dtype=np.uint8),
+                                     indexing='ij')
+        # BGR pixels (0, max, value): R = value, G = max; entries with value > max are never read
+        probe = cv2.merge([np.zeros_like(value), maximum, value])
+        cmyk = cmyk_reference(probe)
+        cmy_table = np.ascontiguousarray(cmyk[..., 0])
+        k_table = np.ascontiguousarray(cmyk[0, :, 3])
+        cmy_table.setflags(write=False)
+        k_table.setflags(write=False)
+        _cmyk_tables = cmy_table, k_table
+    return _cmyk_tables
+
+
+def decompose_cmyk(img, out=None):
+    """(H, W, 4) uint8 CMYK stack of a BGR image, identical to `cmyk_reference`.
+
+    Each band of rows takes max(R, G, B) once and gathers C, M, Y and K from
+    `cmyk_tables` straight into `out` (allocated when not given); the only
+    temporaries are two band-sized index buffers.
+    """
+    H, W = img.shape[:2]
+    if out is None:
+        out = np.empty((H, W, 4), dtype=np.uint8)
+    cmy_table, k_table = cmyk_tables()
+    flat = cmy_table.ravel()
+
+    rows = max(1, min(H, BAND_PIXELS // max(W, 1)))
+    maximum = np.empty((rows, W), dtype=np.uint8)
+    index = np.empty((rows, W), dtype=np.intp)
+
+    for y0 in range(0, H, rows):
+        band = img[y0:y0 + rows]
+        n = band.shape[0]
+        mx, idx = maximum[:n], index[:n]
+        np.maximum(band[..., 0], band[..., 1], out=mx)
+        np.maximum(mx, band[..., 2], out=mx)
+        np.take(k_table, mx, out=out[y0:y0 + n, :, 3], mode='clip')
+
+        # C from R, M from G, Y from B (BGR input): table index value * 256 + max
+        for plane, channel in enumerate((2, 1, 0)):
+            np.multiply(band[..., channel], 256, out=idx, dtype=np.intp)
+            idx += mx
+            np.take(flat, idx, out=out[y0:y0 + n, :, plane], mode='clip')
+    return out
+
+
+# ------------------------------------------------------------------------------
+#  3-D tables
+# ------------------------------------------------------------------------------
+# exact converters the tables are built from: BGR uint8 image -> (H, W, C) uint8
+CONVERTERS = {
+    'RGB': lambda img: cv2.cvtColor(img, cv2.COLOR_BGR2RGB),
+    'HSV': lambda img: cv2.cvtColor(img, cv2.COLOR_BGR2HSV),
+    'LAB': lambda img: cv2.cvtColor(img, cv2.COLOR_BGR2LAB),
+    'CMYK': decompose_cmyk,
+}
+
+
+def color_lattice(bits=8):
+    """BGR image of every colour of a `bits`-per-channel grid, in packed-index order.
+
+    Pixel i has B = i >> 2 * bits, G = (i >> bits) & mask, R = i & mask, each
+    mapped to the centre of its bin; the image is (2^bits, 2^(2 * bits), 3).
+    """
+    levels = 1 << bits
+    shift = 8 - bits
+    values = (np.arange(levels, dtype=np.uint16) << shift) + ((1 << shift) >> 1)
+    b, g, r = np.meshgrid(values, values, values, indexing='ij')
+    return np.stack([b, g, r], axis=-1).astype(np.uint8).reshape(levels, levels * levels, 3)
+
+
+def build_table(color_space, bits=8):
+    """(2^(3 * bits), C) uint8 table of `color_space`, indexed by the packed quantized BGR value."""
+    lattice = color_lattice(bits)
+    table = CONVERTERS[color_space](lattice)
+    return np.ascontiguousarray(table.reshape(lattice.shape[0] * lattice.shape[1], -1))
+
+
+class ConversionTables:
+    """Lazily built 3-D conversion tables, optionally persisted in `cache_dir`.
+
+    Table files are named after the colour space, the bit depth, the OpenCV
+    version (cvtColor results may change between versions) and TABLE_VERSION,
+    and are mapped read-only when loaded, so processes share their pages.
+    """
+
+    def __init__(self, cache_dir=None):
+        self.cache_dir = cache_dir
+        self._tables = {}
+        self._lock = threading.Lock()
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    def _path(self, color_space, bits):
+        name = f"{color_space.lower()}_{bits}bit_cv{cv2.__version__}_v{TABLE_VERSION}.npy"
+        return os.path.join(self.cache_dir, name)
+
+    def table(self, color_space, bits=8):
+        if color_space not in CONVERTERS:
+            raise ValueError("UNKNOWN_COLOR_SPACE")
+        if not 1 <= bits <= 8:
+            raise ValueError(f"Table bits must be within 1..8, got {bits}")
+
+        key = (color_space, bits)
+        with self._lock:
+            table = self._tables.get(key)
+            if table is not None:
+                return table
+
+            path = self._path(color_space, bits) if self.cache_dir else None
+            if path and os.path.exists(path):
+                table = np.load(path, mmap_mode='r')
+            else:
+                table = build_table(color_space, bits)
+                table.setflags(write=False)
+                if path:
+                    # written under a temporary name, so readers never see a partial file
+                    fd, tmp = tempfile.mkstemp(suffix='.npy', dir=self.cache_dir)
+                    with os.fdopen(fd, 'wb') as f:
+                        np.save(f, table)
+                    os.replace(tmp, path)
+            self._tables[key] = table
+            return table
+
+    def clear(self):
+        with self._lock:
+            self._tables.clear()
+
+    def convert(self, img, color_space, bits=8, out=None):
+        """(H, W, C) uint8 conversion of a BGR uint8 image by gathering from the 3-D table."""
+        table = self.table(color_space, bits)
+        H, W = img.shape[:2]
+        channels = table.shape[1]
+        if out is None:
+            out = np.empty((H, W, channels), dtype=np.uint8)
+
+        shift = 8 - bits
+        rows = max(1, min(H, BAND_PIXELS // max(W, 1)))
+        index = np.empty((rows, W), dtype=np.intp)
+        scratch = np.empty((rows, W), dtype=np.intp)
+        planes = np.ascontiguousarray(table.T) if not out.flags.c_contiguous else None
+
+        for y0 in range(0, H, rows):
+            band = img[y0:y0 + rows]
+            n = band.shape[0]
+            idx, tmp = index[:n], scratch[:n]
+            # packed index (B << 2 * bits) | (G << bits) | R of the quantized values
+            np.right_shift(band[..., 0], shift, out=idx, dtype=np.intp)
+            idx <<= bits
+            np.right_shift(band[..., 1], shift, out=tmp, dtype=np.intp)
+            idx += tmp
+            idx <<= bits
+            np.right_shift(band[..., 2], shift, out=tmp, dtype=np.intp)
+            idx += tmp
+
+            if planes is None:
+                # whole pixels at once into the contiguous output rows
+                np.take(table, idx.ravel(), axis=0, out=out[y0:y0 + n].reshape(-1, channels), mode='clip')
+            else:
+                for c in range(channels):
+                    np.take(planes[c], idx, out=out[y0:y0 + n, :, c], mode='clip')
+        return out
+
+
+# shared tables of the process (memory only; give it a cache_dir to persist them)
+conversion_tables = ConversionTables()
+
+
+def convert_lut(img, color_space, bits=8, out=None):
+    """`ConversionTables.convert` with the shared `conversion_tables`."""
+    return conversion_tables.convert(img, color_space, bits, out)
+
+
+def _channel_error(a, b, color_space):
+    diff = np.abs(a.astype(np.int16) - b.astype(np.int16))
+    if color_space == 'HSV':
+        # hue is circular (0..179 in OpenCV)
+        diff[..., 0] = np.minimum(diff[..., 0], 180 - diff[..., 0])
+    return diff
+
+
+def verify_tables(color_spaces=('HSV', 'LAB', 'CMYK'), bits=8, tables=None):
+    """Compares table conversions with the exact converters on every 8-bit colour.
+
+    Returns {colour space: (max error, mean error)} per channel in gray levels;
+    8-bit tables must give (0, 0).
+    """
+    tables = tables or conversion_tables
+    lattice = color_lattice(8)
+    report = {}
+    for color_space in color_spaces:
+        exact = CONVERTERS[color_space](lattice)
+        converted = tables.convert(lattice, color_space, bits)
+        diff = _channel_error(converted, exact, color_space)
+        report[color_space] = (diff.max(axis=(0, 1)).tolist(), diff.mean(axis=(0, 1)).round(3).tolist())
+    return report
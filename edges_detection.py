@@ -8,164 +8,342 @@ from edges_methods import (
     scharr_edges,
     prewitt_edges,
     canny_edges,
+    canny_hysteresis_edges,
     canny_cv2_edges,
-    roberts_edges
+    roberts_edges,
+    EDGE_STAGES,
+    PRECISIONS
 )
+from edges_scale import (
+    gaussian_gradient_edges,
+    log_edges,
+    dog_edges,
+    multiscale_gradient_edges,
+    multiscale_log_edges
+)
+from edges_pyramid import (DEFAULT_PYRAMID_LEVELS, DEFAULT_ROI_THRESHOLD, DEFAULT_ROI_TILE, capped_levels,
+                           pyramid_level, roi_mask, roi_strips)
+from edges_tiling import run_tiled, tile_grid
+from edges_color import decompose_cmyk
+from edges_cache import DEFAULT_RESPONSE_CACHE_BYTES, ConversionCache, LRUCache, ResultCache, image_key
+from edges_profile import profiled
 
-def detect_edges(img, color_space='RGB', method='Sobel',
-                 translations_getter=None, low_threshold=0, high_threshold=255):
+METHODS = {
+    'Sobel': sobel_edges,
+    'Laplacian 4-neighbor': laplacian_edges_4,
+    'Laplacian 8-neighbor': laplacian_edges_8,
+    'Laplacian LoG': laplacian_edges_log,
+    'Scharr': scharr_edges,
+    'Prewitt': prewitt_edges,
+    'Canny': canny_edges,
+    'Canny Hysteresis': canny_hysteresis_edges,
+    'Canny CV2': canny_cv2_edges,
+    'Roberts': roberts_edges,
+    'Gaussian Gradient': gaussian_gradient_edges,
+    'Gaussian LoG': log_edges,
+    'DoG': dog_edges,
+    'Multi-scale Gradient': multiscale_gradient_edges,
+    'Multi-scale LoG': multiscale_log_edges
+}
 
-    if translations_getter is None:
-        def get_text(key): return key
-    else:
-        get_text = translations_getter
-
-    if img is None:
-        raise ValueError(get_text("INVALID_IMAGE"))
+# translation keys of the channels of every colour space
+COLOR_SPACE_CHANNELS = {
+    'RGB': ('CHANNEL_R', 'CHANNEL_G', 'CHANNEL_B'),
+    'HSV': ('CHANNEL_H', 'CHANNEL_S', 'CHANNEL_V'),
+    'LAB': ('CHANNEL_L', 'CHANNEL_A', 'CHANNEL_B'),
+    'CMYK': ('CHANNEL_C', 'CHANNEL_M', 'CHANNEL_Y', 'CHANNEL_K'),
+}
 
-    methods_dict = {
-        'Sobel': sobel_edges,
-        'Laplacian 4-neighbor': laplacian_edges_4,
-        'Laplacian 8-neighbor': laplacian_edges_8,
-        'Laplacian LoG': laplacian_edges_log,
-        'Scharr': scharr_edges,
-        'Prewitt': prewitt_edges,
-        'Canny': canny_edges,
-        'Canny CV2': canny_cv2_edges,
-        'Roberts': roberts_edges
-    }
-
-    if method not in methods_dict:
-        raise ValueError(get_text("UNKNOWN_METHOD"))
 
-    edge_func = methods_dict[method]
-    img_rgb = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
+@profiled
+def decompose_color_space(img, color_space, out=None):
+    """Converts a BGR image (or any region of it) into the (H, W, C) channel stack of `color_space`.
 
+    Every conversion is per pixel, so a tile of the image gives the same
+    values as the matching region of the whole-image conversion. `out` is an
+    optional (H, W, C) uint8 array receiving the stack.
+    """
     # --------------------------------------------------
     #  RGB
     # --------------------------------------------------
     if color_space == 'RGB':
-        R, G, B = cv2.split(img_rgb)
-        edges_R = edge_func(R, low_threshold, high_threshold)
-        edges_G = edge_func(G, low_threshold, high_threshold)
-        edges_B = edge_func(B, low_threshold, high_threshold)
-
-        edges = [edges_R, edges_G, edges_B]
-        if method == 'Canny CV2' or 'Canny':
-            edges_sum = np.maximum.reduce(edges)
-        else:
-            edges_sum = cv2.addWeighted(
-                cv2.addWeighted(edges_R, 1/3, edges_G, 1/3, 0),
-                1, edges_B, 1/3, 0
-            )
-
-        titles = [
-            get_text('CHANNEL_R'),
-            get_text('CHANNEL_G'),
-            get_text('CHANNEL_B'),
-            get_text('EDGE_SUM_TITLE')
-        ]
+        return cv2.cvtColor(img, cv2.COLOR_BGR2RGB, dst=out)
 
     # --------------------------------------------------
     #  HSV
     # --------------------------------------------------
-    elif color_space == 'HSV':
-        hsv = cv2.cvtColor(img, cv2.COLOR_BGR2HSV)
-        H, S, V = cv2.split(hsv)
-
-        edges_H = edge_func(H, low_threshold, high_threshold)
-        edges_S = edge_func(S, low_threshold, high_threshold)
-        edges_V = edge_func(V, low_threshold, high_threshold)
-
-        edges = [edges_H, edges_S, edges_V]
-        if method == 'Canny CV2' or 'Canny':
-            edges_sum = np.maximum.reduce(edges)
-        else:
-            edges_sum = np.maximum(np.maximum(edges_H, edges_S), edges_V)
-
-        titles = [
-            get_text('CHANNEL_H'),
-            get_text('CHANNEL_S'),
-            get_text('CHANNEL_V'),
-            get_text('EDGE_SUM_TITLE')
-        ]
+    if color_space == 'HSV':
+        return cv2.cvtColor(img, cv2.COLOR_BGR2HSV, dst=out)
 
     # --------------------------------------------------
     #  LAB
     # --------------------------------------------------
-    elif color_space == 'LAB':
-        lab = cv2.cvtColor(img, cv2.COLOR_BGR2LAB)
-        L, A, B = cv2.split(lab)
+    if color_space == 'LAB':
+        return cv2.cvtColor(img, cv2.COLOR_BGR2LAB, dst=out)
+
+    # --------------------------------------------------
+    #  CMYK (lookup tables, see edges_color)
+    # --------------------------------------------------
+    return decompose_cmyk(img, out)
+
+
+# decompositions of the loaded images, shared by all frames and methods
+conversion_cache = ConversionCache(decompose_color_space)
+
+# threshold-independent responses (gradient magnitude, Canny NMS map, ...) of whole-image runs
+response_cache = LRUCache(DEFAULT_RESPONSE_CACHE_BYTES)
+
+# memoized (edges, edges_sum) of whole-image runs; give it a cache_dir to persist them
+result_cache = ResultCache()
+
+
+@profiled
+def fuse_edges(edges, color_space, method):
+    """Combines the per-channel edge maps of `color_space` into one edge sum."""
+    if color_space == 'RGB':
+        edges_R, edges_G, edges_B = edges
+        if method == 'Canny CV2' or 'Canny':
+            return np.maximum.reduce(edges)
+        return cv2.addWeighted(
+            cv2.addWeighted(edges_R, 1/3, edges_G, 1/3, 0),
+            1, edges_B, 1/3, 0
+        )
 
-        edges_L = edge_func(L, low_threshold, high_threshold)
-        edges_A = edge_func(A, low_threshold, high_threshold)
-        edges_B = edge_func(B, low_threshold, high_threshold)
+    if color_space == 'HSV':
+        edges_H, edges_S, edges_V = edges
+        if method == 'Canny CV2' or 'Canny':
+            return np.maximum.reduce(edges)
+        return np.maximum(np.maximum(edges_H, edges_S), edges_V)
 
-        edges = [edges_L, edges_A, edges_B]
+    if color_space == 'LAB':
+        edges_L, edges_A, edges_B = edges
 
         # suma wektorowa
         if method == 'Canny CV2' or 'Canny':
-            edges_sum = np.maximum.reduce(edges)
-        else:
-            edges_sum = np.sqrt(
-                edges_L.astype(np.float64)**2 +
-                edges_A.astype(np.float64)**2 +
-                edges_B.astype(np.float64)**2
-            )
-            edges_sum = cv2.normalize(edges_sum, None, 0, 255, cv2.NORM_MINMAX).astype(np.uint8)
-
-        titles = [
-            get_text('CHANNEL_L'),
-            get_text('CHANNEL_A'),
-            get_text('CHANNEL_B'),
-            get_text('EDGE_SUM_TITLE')
-        ]
+            return np.maximum.reduce(edges)
+        edges_sum = np.sqrt(
+            edges_L.astype(np.float64)**2 +
+            edges_A.astype(np.float64)**2 +
+            edges_B.astype(np.float64)**2
+        )
+        return cv2.normalize(edges_sum, None, 0, 255, cv2.NORM_MINMAX).astype(np.uint8)
 
-    # --------------------------------------------------
-    #  CMYK
-    # --------------------------------------------------
-    elif color_space == 'CMYK':
-        rgb = img_rgb.astype(np.float32) / 255.0
-        r, g, b = cv2.split(rgb)
+    # CMYK
+    if method == 'Canny CV2' or 'Canny':
+        return np.maximum.reduce(edges)
+    return np.max(np.stack(edges, axis=0), axis=0)
 
-        c = 1 - r
-        m = 1 - g
-        y = 1 - b
 
-        k = np.minimum(np.minimum(c, m), y)
+@profiled
+def detect_edges(img, color_space='RGB', method='Sobel',
+                 translations_getter=None, low_threshold=0, high_threshold=255,
+                 precision='float64', tile_size=None, max_memory=None, out=None, cache=True,
+                 pyramid_levels=None, roi_threshold=DEFAULT_ROI_THRESHOLD):
+    """Runs `method` on every channel of `img` (BGR) decomposed into `color_space`.
 
-        denom = 1 - k
-        denom[denom == 0] = 1
+    `precision` ('float64', 'float32' or 'integer') selects the compute mode of
+    the edge operators, see `edges_methods.PRECISIONS`.
 
-        c_final = (c - k) / denom
-        m_final = (m - k) / denom
-        y_final = (y - k) / denom
+    Setting `tile_size` (pixels) and/or `max_memory` (bytes) switches to tiled
+    execution (see `edges_tiling`): the colour conversion and the operator run
+    on overlapping tiles, so the working set stays bounded while the result is
+    the same as the whole-image run.
 
-        C = (c_final * 255).astype(np.uint8)
-        M = (m_final * 255).astype(np.uint8)
-        Y = (y_final * 255).astype(np.uint8)
-        K = (k * 255).astype(np.uint8)
+    `out` is an optional (C + 1, H, W) uint8 array (e.g. a memory map from
+    `edges_io.create_edge_output`) receiving the C channel edge maps followed by
+    the edge sum; the returned `edges` and `edges_sum` are then views of it.
 
-        edges_C = edge_func(C, low_threshold, high_threshold)
-        edges_M = edge_func(M, low_threshold, high_threshold)
-        edges_Y = edge_func(Y, low_threshold, high_threshold)
-        edges_K = edge_func(K, low_threshold, high_threshold)
+    Whole-image colour decompositions are kept in `conversion_cache`, so other
+    methods on the same image content skip the conversion, and whole-image
+    results are memoized in `result_cache` under (image content, colour space,
+    method, thresholds, precision); the returned edge maps are then read-only.
+    The content is hashed on every call (`edges_cache.image_key`), so a buffer
+    modified in place never gets the results of its earlier content.
+    The threshold-independent response stage (`edges_methods.EDGE_STAGES`) is
+    kept in `response_cache`, so a new threshold pair only reruns the finishing
+    stage instead of the convolutions.
+    The tiled path uses neither. `cache=False` bypasses both.
 
-        edges = [edges_C, edges_M, edges_Y, edges_K]
+    `pyramid_levels` switches to coarse-to-fine detection (see `edges_pyramid`):
+    the method runs on the image reduced `pyramid_levels` times, and at full
+    resolution only around the coarse edges that reach `roi_threshold` of the
+    coarse maximum. Weak and fine edges away from them are dropped (0). It
+    cannot be combined with tiling (`tile_size`, `max_memory`), uses no
+    caches and rejects operators without a response stage (Canny CV2).
 
-        if method == 'Canny CV2' or 'Canny':
-            edges_sum = np.maximum.reduce(edges)
-        else:
-            edges_sum = np.max(np.stack(edges, axis=0), axis=0)
-        titles = [
-            get_text('CHANNEL_C'),
-            get_text('CHANNEL_M'),
-            get_text('CHANNEL_Y'),
-            get_text('CHANNEL_K'),
-            get_text('EDGE_SUM_TITLE')
-        ]
+    The colour decomposition, the operator stages and the fusion are recorded
+    by an active `edges_profile.Profiler`.
 
+    `img_rgb` is returned as a view of `img`, no RGB copy is made.
+    Returns (img_rgb, edges, edges_sum, titles).
+    """
+
+    if translations_getter is None:
+        def get_text(key): return key
     else:
+        get_text = translations_getter
+
+    if img is None:
+        raise ValueError(get_text("INVALID_IMAGE"))
+
+    if method not in METHODS:
+        raise ValueError(get_text("UNKNOWN_METHOD"))
+    if color_space not in COLOR_SPACE_CHANNELS:
         raise ValueError(get_text("UNKNOWN_COLOR_SPACE"))
+    if precision not in PRECISIONS:
+        raise ValueError(get_text("UNKNOWN_PRECISION"))
+
+    edge_func = METHODS[method]
+    channels = len(COLOR_SPACE_CHANNELS[color_space])
+    titles = [get_text(key) for key in COLOR_SPACE_CHANNELS[color_space]]
+    titles.append(get_text('EDGE_SUM_TITLE'))
+
+    if out is not None and (out.shape != (channels + 1,) + img.shape[:2] or out.dtype != np.uint8):
+        raise ValueError(get_text("INVALID_OUTPUT"))
+
+    # BGR -> RGB as a view, the operators copy into their own planes anyway
+    img_rgb = img[..., ::-1]
+
+    if pyramid_levels:
+        if tile_size is not None or max_memory is not None:
+            raise ValueError("pyramid_levels cannot be combined with tile_size or max_memory")
+        edges, edges_sum, _ = detect_edges_coarse_to_fine(img, color_space, method, low_threshold,
+                                                          high_threshold, precision, pyramid_levels,
+                                                          roi_threshold, out=out)
+        return img_rgb, edges, edges_sum, titles
+
+    if tile_size is not None or max_memory is not None:
+        edges, edges_sum = _detect_edges_tiled(img, color_space, method, low_threshold,
+                                               high_threshold, precision, tile_size,
+                                               max_memory, out)
+        return img_rgb, edges, edges_sum, titles
+
+    # hashed once per call: the caches below all key on it
+    img_key = image_key(img) if cache else None
+    key = (img_key, color_space, method, low_threshold, high_threshold, precision)
+    cached = result_cache.get(key) if cache else None
+
+    if cached is not None:
+        edges_planes, edges_sum = cached
+        edges = list(edges_planes)
+    else:
+        # one vectorized call over the whole (H, W, C) stack, split back into per-channel maps
+        edges_stack = _run_operator(img, color_space, edge_func, low_threshold, high_threshold,
+                                    precision, img_key)
+        edges_planes = np.moveaxis(edges_stack, -1, 0)
+        edges_sum = fuse_edges(list(edges_planes), color_space, method)
+        if cache:
+            # the cache freezes the planes: the maps returned on a miss are the same
+            # read-only views a later hit gets, not writable aliases of the entry
+            edges_planes, edges_sum = result_cache.put(key, (edges_planes, edges_sum))
+        edges = list(edges_planes)
+
+    if out is not None:
+        for target, e in zip(out, edges + [edges_sum]):
+            target[...] = e
+        edges, edges_sum = list(out[:-1]), out[-1]
+
+    return img_rgb, edges, edges_sum, titles
+
+
+def _channel_stack(img, color_space, img_key):
+    # RGB is a free view; the other decompositions are computed once per image
+    # (`img_key`: the image's content key, None without caching)
+    if color_space == 'RGB':
+        return img[..., ::-1]
+    if img_key is not None:
+        return conversion_cache.decompose(img, color_space, img_key)
+    return decompose_color_space(img, color_space)
+
+
+def _run_operator(img, color_space, edge_func, low_threshold, high_threshold, precision, img_key):
+    """(H, W, C) edge maps of `edge_func`, reusing a cached threshold-independent response."""
+    stages = EDGE_STAGES[edge_func]
+    if img_key is None or stages.response is None:
+        return edge_func(_channel_stack(img, color_space, img_key), low_threshold, high_threshold,
+                         precision=precision)
+
+    # shared by all thresholds (and by operators with the same response stage)
+    key = (img_key, color_space, stages.response.__name__, precision)
+    response = response_cache.get(key)
+    if response is None:
+        response = response_cache.put(key, stages.response(_channel_stack(img, color_space, img_key),
+                                                           precision))
+
+    # only the cheap clip / normalize / linking stage depends on the thresholds
+    return np.moveaxis(stages.finish(response, low_threshold, high_threshold), 0, -1)
+
+
+def _detect_edges_tiled(img, color_space, method, low_threshold, high_threshold,
+                        precision, tile_size, max_memory, out=None):
+    H, W = img.shape[:2]
+    channels = len(COLOR_SPACE_CHANNELS[color_space])
+    if out is None:
+        out = np.empty((channels + 1, H, W), dtype=np.uint8)
+
+    def read_stack(y0, y1, x0, x1):
+        return decompose_color_space(img[y0:y1, x0:x1], color_space)
+
+    _, tile_size = run_tiled(read_stack, (H, W), channels, METHODS[method],
+                             low_threshold, high_threshold, precision,
+                             tile_size=tile_size, max_memory=max_memory, out=out[:-1])
+    edges = list(out[:-1])
+
+    # channel fusion is per pixel, so it is done tile by tile as well
+    edges_sum = out[-1]
+    for y0, y1, x0, x1 in tile_grid(H, W, tile_size):
+        edges_sum[y0:y1, x0:x1] = fuse_edges([e[y0:y1, x0:x1] for e in edges], color_space, method)
+
+    return edges, edges_sum
+
+
+def detect_edges_coarse_to_fine(img, color_space='RGB', method='Sobel', low_threshold=0,
+                                high_threshold=255, precision='float64', levels=DEFAULT_PYRAMID_LEVELS,
+                                roi_threshold=DEFAULT_ROI_THRESHOLD, tile_size=DEFAULT_ROI_TILE, out=None):
+    """Coarse-to-fine `detect_edges` of a BGR image; returns (edges, edges_sum, mask).
+
+    `out` is an optional (C + 1, H, W) uint8 array receiving the edge planes
+    and the edge sum, as in `detect_edges`; `mask` is the ROI. `levels` is
+    capped by `edges_pyramid.capped_levels`.
+    """
+    if method not in METHODS:
+        raise ValueError("UNKNOWN_METHOD")
+    if color_space not in COLOR_SPACE_CHANNELS:
+        raise ValueError("UNKNOWN_COLOR_SPACE")
+
+    H, W = img.shape[:2]
+    channels = len(COLOR_SPACE_CHANNELS[color_space])
+    stages = EDGE_STAGES[METHODS[method]]
+    if stages.response is None:
+        # the whole operator per strip would link edges differently at the strip borders
+        raise ValueError(f"{method} has no separate response stage and cannot run coarse-to-fine")
+    levels = capped_levels(img.shape, levels)
+    if out is None:
+        out = np.empty((channels + 1, H, W), dtype=np.uint8)
+
+    # 1. + 2. detection at the coarse level and its region of interest
+    _, _, coarse_sum, _ = detect_edges(pyramid_level(img, levels), color_space, method,
+                                       low_threshold=low_threshold, high_threshold=high_threshold,
+                                       precision=precision, cache=False)
+    mask = roi_mask(coarse_sum, (H, W), levels, roi_threshold)
+    strips = roi_strips(mask, tile_size)
+
+    # 3. full-resolution response on the ROI strips only, each grown by the
+    # halo (clipped at the border) and cropped back
+    halo = stages.halo
+    response = None
+    for y0, y1, x0, x1 in strips:
+        ys, ye = max(0, y0 - halo), min(H, y1 + halo)
+        xs, xe = max(0, x0 - halo), min(W, x1 + halo)
+        part = stages.response(decompose_color_space(img[ys:ye, xs:xe], color_space), precision)
+        if response is None:
+            response = np.zeros((channels, H, W), dtype=part.dtype)
+        response[:, y0:y1, x0:x1] = part[:, y0 - ys:y1 - ys, x0 - xs:x1 - xs]
+    if response is None:
+        response = np.zeros((channels, H, W), dtype=np.float32)
+
+    # 4. finishing stage over the whole image (global range, edge linking)
+    out[:-1] = stages.finish(response, low_threshold, high_threshold)
 
-    return img_rgb, edges, edges_sum, titles
\ No newline at end of file
+    out[-1] = fuse_edges(list(out[:-1]), color_space, method)
+    return list(out[:-1]), out[-1], mask
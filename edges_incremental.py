@@ -0,0 +1,184 @@
+"""Incremental edge detection for frame sequences of a mostly static scene.
+
+`IncrementalEdges` keeps the threshold-independent response of the previous
+frame (`EdgeStages.response`: gradient magnitude, Laplacian, Canny NMS map)
+and a persistent (C + 1, H, W) uint8 output. For every new frame:
+
+1. the pixels that differ from the previous frame are found and dilated by
+   the operator's halo - only responses within that distance can change;
+2. the tiles (see `edges_tiling.tile_grid`) touched by the dilated mask are
+   recomputed with their halo, exactly like a tiled run, and patched into
+   the stored response;
+3. the finishing stage is redone where needed: per tile for 'local'
+   operators and for 'minmax' operators whose per-channel range did not
+   change, over the stored response otherwise (no convolution involved),
+   and the hysteresis of 'linked' operators is relinked over the whole
+   channel;
+4. the edge sum is re-fused over the same area.
+
+The result equals a full `detect_edges` of the frame; `verify_incremental`
+checks this on a frame sequence. Canny CV2 has no separate response stage
+and is recomputed in full whenever a frame changes.
+"""
+import cv2
+import numpy as np
+
+from edges_detection import COLOR_SPACE_CHANNELS, METHODS, decompose_color_space, detect_edges, fuse_edges
+from edges_methods import EDGE_STAGES, PRECISIONS, normalize_response
+from edges_tiling import tile_grid, tiles_touching
+
+# Side of the tiles that are recomputed as a whole
+DEFAULT_INCREMENTAL_TILE = 64
+
+
+class IncrementalEdges:
+    """Edge maps of a frame sequence, updated only where the frames change."""
+
+    def __init__(self, color_space='RGB', method='Sobel', low_threshold=0, high_threshold=255,
+                 precision='float64', tile_size=DEFAULT_INCREMENTAL_TILE):
+        if method not in METHODS:
+            raise ValueError("UNKNOWN_METHOD")
+        if color_space not in COLOR_SPACE_CHANNELS:
+            raise ValueError("UNKNOWN_COLOR_SPACE")
+        if precision not in PRECISIONS:
+            raise ValueError("UNKNOWN_PRECISION")
+
+        self.color_space = color_space
+        self.method = method
+        self.low_t = low_threshold
+        self.high_t = high_threshold
+        self.precision = precision
+        self.tile_size = tile_size
+        self.stages = EDGE_STAGES[METHODS[method]]
+
+        self.previous = None
+        self.response = None
+        self.value_range = None
+        self.out = None
+        # fraction of the tiles recomputed for the last frame
+        self.dirty_fraction = 0.0
+
+    @property
+    def edges(self):
+        return list(self.out[:-1])
+
+    @property
+    def edges_sum(self):
+        return self.out[-1]
+
+    def reset(self):
+        """Forgets the previous frame; the next update is a full computation."""
+        self.previous = None
+
+    def update(self, frame):
+        """Processes the next BGR frame; returns (edges, edges_sum) views of the persistent output."""
+        if self.previous is None or self.previous.shape != frame.shape:
+            self._full(frame)
+        else:
+            self._incremental(frame)
+        self.previous = np.array(frame, copy=True)
+        return self.edges, self.edges_sum
+
+    # --------------------------------------------------------------------------
+    def _full(self, frame):
+        H, W = frame.shape[:2]
+        channels = len(COLOR_SPACE_CHANNELS[self.color_space])
+        self.out = np.empty((channels + 1, H, W), dtype=np.uint8)
+        self.dirty_fraction = 1.0
+
+        if self.stages.response is None:
+            _, edges, edges_sum, _ = detect_edges(frame, self.color_space, self.method,
+                                                  low_threshold=self.low_t, high_threshold=self.high_t,
+                                                  precision=self.precision, cache=False)
+            self.out[:-1] = edges
+            self.out[-1] = edges_sum
+            return
+
+        stack = decompose_color_space(frame, self.color_space)
+        self.response = self.stages.response(stack, self.precision)
+        self.value_range = self._value_range()
+        self._finish_all()
+
+    def _incremental(self, frame):
+        changed = np.any(frame != self.previous, axis=-1)
+        if not changed.any():
+            self.dirty_fraction = 0.0
+            return
+        if self.stages.response is None:
+            self._full(frame)
+            return
+
+        tiles = self._dirty_tiles(changed)
+        self.dirty_fraction = len(tiles) / len(list(tile_grid(*frame.shape[:2], self.tile_size)))
+
+        # 2. recompute the responses of the dirty tiles (halo clipped at the border, as in run_tiled)
+        H, W = frame.shape[:2]
+        halo = self.stages.halo
+        for y0, y1, x0, x1 in tiles:
+            ys, ye = max(0, y0 - halo), min(H, y1 + halo)
+            xs, xe = max(0, x0 - halo), min(W, x1 + halo)
+            stack = decompose_color_space(frame[ys:ye, xs:xe], self.color_space)
+            self.response[:, y0:y1, x0:x1] = self.stages.response(stack, self.precision)[
+                :, y0 - ys:y1 - ys, x0 - xs:x1 - xs]
+
+        # 3. finishing stage
+        if self.stages.scope == 'local':
+            for y0, y1, x0, x1 in tiles:
+                self.out[:-1, y0:y1, x0:x1] = self.stages.finish(self.response[:, y0:y1, x0:x1],
+                                                                 self.low_t, self.high_t)
+        elif self.stages.scope == 'minmax':
+            value_range = self._value_range()
+            if value_range != self.value_range:
+                # the normalization of every pixel changed
+                self.value_range = value_range
+                self._finish_all()
+                return
+            for y0, y1, x0, x1 in tiles:
+                self.out[:-1, y0:y1, x0:x1] = normalize_response(self.response[:, y0:y1, x0:x1],
+                                                                 self.low_t, self.high_t,
+                                                                 value_range=value_range)
+        else:
+            # edge chains may link across the whole channel
+            self._finish_all()
+            return
+
+        # 4. fusion is per pixel
+        for y0, y1, x0, x1 in tiles:
+            self.out[-1, y0:y1, x0:x1] = fuse_edges([e[y0:y1, x0:x1] for e in self.out[:-1]],
+                                                    self.color_space, self.method)
+
+    # --------------------------------------------------------------------------
+    def _dirty_tiles(self, changed):
+        # every response within `halo` pixels of a changed pixel can change
+        halo = self.stages.halo
+        kernel = np.ones((2 * halo + 1, 2 * halo + 1), dtype=np.uint8)
+        dirty = cv2.dilate(changed.view(np.uint8), kernel)
+        return tiles_touching(dirty, self.tile_size)
+
+    def _value_range(self):
+        # per-channel (min, max) of the clipped response; clipping is monotonic
+        lo = np.clip(self.response.min(axis=(1, 2)), self.low_t, self.high_t)
+        hi = np.clip(self.response.max(axis=(1, 2)), self.low_t, self.high_t)
+        return list(zip(lo.tolist(), hi.tolist()))
+
+    def _finish_all(self):
+        self.out[:-1] = self.stages.finish(self.response, self.low_t, self.high_t)
+        self.out[-1] = fuse_edges(list(self.out[:-1]), self.color_space, self.method)
+
+
+def verify_incremental(frames, color_space='RGB', method='Sobel', low_threshold=0,
+                       high_threshold=255, precision='float64', tile_size=DEFAULT_INCREMENTAL_TILE):
+    """Runs `frames` incrementally and in full; returns the indices of frames whose results differ."""
+    incremental = IncrementalEdges(color_space, method, low_threshold, high_threshold,
+                                   precision, tile_size)
+    mismatches = []
+    for index, frame in enumerate(frames):
+        edges, edges_sum = incremental.update(frame)
+        _, full_edges, full_sum, _ = detect_edges(frame, color_space, method,
+                                                  low_threshold=low_threshold,
+                                                  high_threshold=high_threshold,
+                                                  precision=precision, cache=False)
+        if not (np.array_equal(edges_sum, full_sum)
+                and all(np.array_equal(a, b) for a, b in zip(edges, full_edges))):
+            mismatches.append(index)
+    return mismatches
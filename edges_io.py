@@ -0,0 +1,71 @@
+"""Image input/output for the detection pipeline, with memory-mapped large-image support.
+
+`open_image` returns a BGR (H, W, 3) uint8 array ready for `detect_edges`:
+
+- '.npy' files are opened with np.load(mmap_mode='r') - nothing is read until
+  a region is touched,
+- raw files (RAW_EXTENSIONS) are opened as np.memmap; their (H, W, 3) shape
+  (and optionally a header offset) must be given,
+- anything else is decoded with cv2.imdecode (one in-memory BGR copy).
+
+Arrays that are not (H, W, 3) uint8 (grayscale, BGRA, 16-bit, ...) are
+rejected with a ValueError instead of failing later inside an operator.
+
+`create_edge_output` creates a (C + 1, H, W) uint8 memory-mapped array that
+`detect_edges(..., out=...)` writes the channel edge maps and the edge sum into.
+Combined with tiled execution (`tile_size` / `max_memory`) neither the input
+nor the results have to be resident in RAM as a whole.
+"""
+import os
+
+import cv2
+import numpy as np
+
+from edges_detection import COLOR_SPACE_CHANNELS
+
+RAW_EXTENSIONS = ('.raw', '.bin')
+
+
+def _check_bgr(img, path):
+    # cv2.imdecode always gives 8-bit BGR; a '.npy' array is taken as stored
+    if img.ndim != 3 or img.shape[2] != 3 or img.dtype != np.uint8:
+        raise ValueError(f"Expected an (H, W, 3) uint8 BGR image, got {img.shape} {img.dtype}: {path}")
+    return img
+
+
+def open_image(path, shape=None, offset=0):
+    """Opens a BGR image, memory-mapped for '.npy' and raw inputs."""
+    ext = os.path.splitext(path)[1].lower()
+
+    if ext == '.npy':
+        return _check_bgr(np.load(path, mmap_mode='r'), path)
+
+    if ext in RAW_EXTENSIONS:
+        if shape is None:
+            raise ValueError(f"Raw image needs an explicit shape: {path}")
+        if len(shape) != 3 or shape[2] != 3:
+            raise ValueError(f"Raw image shape must be (H, W, 3), got {tuple(shape)}: {path}")
+        return np.memmap(path, dtype=np.uint8, mode='r', shape=tuple(shape), offset=offset)
+
+    # np.fromfile + imdecode also works for non-ASCII paths on Windows, unlike cv2.imread
+    img = cv2.imdecode(np.fromfile(path, dtype=np.uint8), cv2.IMREAD_COLOR)
+    if img is None:
+        raise ValueError(f"Cannot decode image: {path}")
+    return img
+
+
+def create_output(path, shape, dtype=np.uint8):
+    """Creates a writable memory-mapped array: a '.npy' file or a raw file otherwise."""
+    if os.path.splitext(path)[1].lower() == '.npy':
+        return np.lib.format.open_memmap(path, mode='w+', dtype=dtype, shape=tuple(shape))
+    return np.memmap(path, dtype=dtype, mode='w+', shape=tuple(shape))
+
+
+def edge_output_shape(img, color_space):
+    """Shape of the `out` array `detect_edges` expects: (channels + 1, H, W)."""
+    return (len(COLOR_SPACE_CHANNELS[color_space]) + 1,) + tuple(img.shape[:2])
+
+
+def create_edge_output(path, img, color_space):
+    """Memory-mapped (C + 1, H, W) uint8 output for `detect_edges(img, color_space, out=...)`."""
+    return create_output(path, edge_output_shape(img, color_space))
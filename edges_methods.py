@@ -1,24 +1,376 @@
+"""Edge detection operators.
+
+Every operator accepts either a single 2D channel or an (H, W, C) stack of
+channels. A stack is processed in one vectorized pass (one padding and one
+cast for all channels) and an (H, W, C) uint8 result is returned,
+each channel normalized on its own exactly like a separate 2D call.
+
+Precision
+---------
+Every operator takes `precision`, one of PRECISIONS:
+
+- 'float64' (default): the reference path, bit-for-bit as before.
+- 'float32': convolution, magnitude, blur and NMS in float32. Half the memory
+  traffic; results stay within 1 gray level of float64 on 8-bit input
+  (Laplacians are exact, the multi-scale LoG of `edges_scale` is within 2).
+  Canny differs on up to ~1.6% of pixels (with hysteresis ~0.8%), where
+  float32 rounding changes the outcome of an NMS comparison; its residual
+  magnitudes below FLOAT32_MAGNITUDE_FLOOR are set to 0.
+- 'integer': for integer kernels on 8/16-bit integer input the convolution
+  is accumulated exactly in int16 (int32 when the kernel bound needs it).
+  Laplacians are then identical to float64, gradient magnitudes are taken in
+  float32 (same tolerance as above). Operators with non-integer
+  intermediates (Canny's Gaussian blur) fall back to float32.
+"""
+from collections import namedtuple
+
 import cv2
 import numpy as np
 from scipy.ndimage import gaussian_filter
+from scipy.signal import fftconvolve
+
+from edges_profile import profiled, stage
+
+# Dense kernels with at least this many taps are convolved in the frequency domain
+FFT_MIN_KERNEL_AREA = 49
+
+PRECISIONS = ('float64', 'float32', 'integer')
+
+# float32 Canny magnitudes below this are rounding residue (up to ~1.3e-4 on
+# 8-bit input) and set to 0; real gradients of 8-bit input stay above ~8e-4
+FLOAT32_MAGNITUDE_FLOOR = 5e-4
+
+
+def _integer_accumulator(dtype, kernels):
+    """Smallest of int16/int32 that holds every response of integer `kernels` on
+    integer input of `dtype`, or None when the integer path does not apply."""
+    kernels = np.asarray(kernels, dtype=np.float64)
+    if not np.issubdtype(dtype, np.integer) or np.any(kernels != np.round(kernels)):
+        return None
+
+    info = np.iinfo(dtype)
+    bound = np.abs(kernels).sum(axis=(-2, -1)).max() * max(abs(int(info.min)), int(info.max))
+    for acc in (np.int16, np.int32):
+        if bound <= np.iinfo(acc).max:
+            return np.dtype(acc)
+    return None
+
+
+def _working_dtype(precision, channel, kernels=None):
+    """Maps a precision mode to the dtype the convolution of `channel` is computed in."""
+    if precision not in PRECISIONS:
+        raise ValueError(f"Unknown precision: {precision}")
+    if precision == 'integer':
+        acc = None
+        if kernels is not None:
+            acc = _integer_accumulator(np.asarray(channel).dtype, kernels)
+        return acc if acc is not None else np.dtype(np.float32)
+    return np.dtype(precision)
 
-def fast_convolve2d(image, kernel):
-    """Performs a fast 2D convolution using numpy's stride tricks."""
-    image = image.astype(np.float64)
-    kernel = np.flipud(np.fliplr(kernel))
-    kh, kw = kernel.shape
+
+def _is_integer(channel):
+    return np.asarray(channel).dtype.kind in 'biu'
+
+
+def _magnitude(grad_x, grad_y):
+    """Gradient magnitude, in place for float gradients; integer gradients give float32."""
+    if grad_x.dtype.kind == 'f':
+        return np.hypot(grad_x, grad_y, out=grad_x)
+    return np.hypot(grad_x, grad_y, dtype=np.float32)
+
+
+def _pad_reflect(image, kh, kw):
+    """Pads the last two axes for a (kh, kw) kernel using the 'reflect' mode used by all backends."""
     pad_h, pad_w = kh // 2, kw // 2
-    padded = np.pad(image, ((pad_h, pad_h), (pad_w, pad_w)), mode='reflect')
+    pad = ((0, 0),) * (image.ndim - 2) + ((pad_h, pad_h), (pad_w, pad_w))
+    return np.pad(image, pad, mode='reflect')
+
+
+def _as_planes(channel, dtype=np.float64):
+    """Returns a C-contiguous (C, H, W) copy of a 2D channel or an (H, W, C) stack.
+
+    The second value tells whether the input was a stack, for `_from_planes`.
+    """
+    channel = np.asarray(channel)
+    if channel.ndim == 3:
+        return np.ascontiguousarray(np.moveaxis(channel, -1, 0), dtype=dtype), True
+    return np.ascontiguousarray(channel, dtype=dtype)[np.newaxis], False
+
 
-    # generate shifted windows
-    shape = (image.shape[0], image.shape[1], kh, kw)
-    strides = padded.strides * 2
-    windows = np.lib.stride_tricks.as_strided(padded, shape=shape, strides=strides)
+def _from_planes(planes, stacked):
+    """Inverse of `_as_planes`: (C, H, W) -> (H, W, C) view, or the single 2D plane."""
+    return np.moveaxis(planes, 0, -1) if stacked else planes[0]
 
-    # calculate convolution vectorially
-    return np.tensordot(windows, kernel, axes=((2, 3), (0, 1)))
 
+def _normalize_uint8(planes, value_range=None):
+    """Min-max normalizes every plane of a (C, H, W) array to 0-255 uint8 (cv2.NORM_MINMAX).
 
+    `value_range` optionally gives a (min, max) per plane to normalize against
+    instead of the plane's own extremes, e.g. the global range of a tiled run.
+    """
+    out = np.empty(planes.shape, dtype=np.uint8)
+    for n, plane in enumerate(planes):
+        if value_range is None:
+            out[n] = cv2.normalize(plane, None, 0, 255, cv2.NORM_MINMAX).astype(np.uint8)
+            continue
+        # cv2.normalize takes min/max from its input, so one extra row carrying the
+        # requested range makes it apply exactly the scale/shift of the full image
+        lo, hi = value_range[n]
+        extended = np.empty((plane.shape[0] + 2, plane.shape[1]), dtype=plane.dtype)
+        extended[:-2] = plane
+        extended[-2:] = lo
+        extended[-1, -1] = hi
+        normalized = cv2.normalize(extended, None, 0, 255, cv2.NORM_MINMAX)
+        out[n] = normalized[:-2].astype(np.uint8)
+    return out
+
+
+def _convert_scale_abs(planes):
+    """cv2.convertScaleAbs applied to every plane of a (C, H, W) array."""
+    out = np.empty(planes.shape, dtype=np.uint8)
+    for n, plane in enumerate(planes):
+        out[n] = cv2.convertScaleAbs(plane)
+    return out
+
+
+def separable_factors(kernel, tol=1e-9):
+    """Splits a rank-1 kernel into (column, row) 1D factors.
+
+    Returns None when the kernel is not separable. The factors are taken
+    straight from the kernel (no SVD), so integer kernels such as Sobel,
+    Prewitt or Scharr give exact integer factors.
+    """
+    kernel = np.asarray(kernel, dtype=np.float64)
+    if kernel.shape[0] == 1 or kernel.shape[1] == 1:
+        return kernel[:, :1].ravel(), kernel[:1, :].ravel()
+
+    i, j = np.unravel_index(np.argmax(np.abs(kernel)), kernel.shape)
+    if kernel[i, j] == 0:
+        return None
+
+    column = kernel[:, j]
+    row = kernel[i, :] / kernel[i, j]
+    if np.any(row != np.round(row)):
+        # scale the other factor instead, e.g. Sobel y = [-2, 0, 2]^T x [0.5, 1, 0.5]
+        column, row = kernel[:, j] / kernel[i, j], kernel[i, :]
+    if not np.allclose(np.outer(column, row), kernel, rtol=0, atol=tol):
+        return None
+    return column, row
+
+
+def _convolve_strided(padded, bank, shape):
+    """Dense backend: a window view of every plane, one np.tensordot per kernel and plane.
+
+    Each product is the (H * W, kh * kw) x (kh * kw,) reduction of the original
+    single-kernel path, so float results keep its exact rounding (a shared
+    tensordot over the bank or the stack sums in a different order).
+    """
+    bank = bank[:, ::-1, ::-1].astype(padded.dtype)
+    _, kh, kw = bank.shape
+    H, W = shape
+    planes = padded.reshape((-1,) + padded.shape[-2:])
+
+    out = np.empty((len(bank), len(planes), H, W), dtype=padded.dtype)
+    for c, plane in enumerate(planes):
+        # generate shifted windows, (H, W, kh, kw)
+        windows = np.lib.stride_tricks.as_strided(
+            plane, shape=(H, W, kh, kw), strides=plane.strides * 2)
+
+        # calculate convolution vectorially
+        for n, kernel in enumerate(bank):
+            out[n, c] = np.tensordot(windows, kernel, axes=((2, 3), (0, 1)))
+    return out.reshape((len(bank),) + padded.shape[:-2] + (H, W))
+
+
+def _convolve_bank(padded, bank, shape):
+    """Dense backend: every tap of every kernel accumulated over shifted slices, plane by plane.
+
+    Needs only the output and one scratch plane (none for +-1 taps, zero taps
+    are skipped) instead of a window copy of the stack, but sums in another
+    order than 'strided', so it is only exact (and picked by 'auto') for
+    integer-valued input.
+    """
+    bank = bank[:, ::-1, ::-1].astype(padded.dtype)
+    _, kh, kw = bank.shape
+    H, W = shape
+    planes = padded.reshape((-1,) + padded.shape[-2:])
+
+    out = np.zeros((len(bank), len(planes), H, W), dtype=padded.dtype)
+    scratch = None
+    if np.any((bank != 0) & (np.abs(bank) != 1)):
+        scratch = np.empty((H, W), dtype=padded.dtype)
+    for c, plane in enumerate(planes):
+        for n, kernel in enumerate(bank):
+            for i in range(kh):
+                for j in range(kw):
+                    _accumulate(out[n, c], plane[i:i + H, j:j + W], kernel[i, j], scratch)
+    return out.reshape((len(bank),) + padded.shape[:-2] + (H, W))
+
+
+def _accumulate(acc, view, weight, scratch):
+    """acc += weight * view without allocating a temporary (zero taps are skipped)."""
+    if weight == 0:
+        return
+    if weight == 1:
+        acc += view
+    elif weight == -1:
+        acc -= view
+    else:
+        np.multiply(view, weight, out=scratch)
+        acc += scratch
+
+
+def _typed_factors(kernel, dtype):
+    """separable_factors cast to `dtype`; None if they are not exact in that dtype."""
+    factors = separable_factors(kernel)
+    if factors is None:
+        return None
+    typed = tuple(f.astype(dtype) for f in factors)
+    if np.issubdtype(dtype, np.integer) and not all(np.array_equal(t, f) for t, f in zip(typed, factors)):
+        return None
+    return typed
+
+
+def _exact_factors(kernel, dtype):
+    """True when `kernel` splits into integer factors representable in `dtype`."""
+    factors = _typed_factors(kernel, dtype)
+    return factors is not None and all(np.array_equal(f, np.round(f)) for f in factors)
+
+
+def _convolve_separable(padded, bank, shape):
+    """Rank-1 backend: one vertical and one horizontal 1D pass over shifted slices per kernel and plane."""
+    H, W = shape
+    factors = []
+    for kernel in bank:
+        typed = _typed_factors(kernel, padded.dtype)
+        if typed is None:
+            raise ValueError("kernel is not separable in this dtype")
+        factors.append((typed[0][::-1], typed[1][::-1]))
+
+    planes = padded.reshape((-1,) + padded.shape[-2:])
+    out = np.zeros((len(bank), len(planes), H, W), dtype=padded.dtype)
+    # one plane of intermediates, not the whole stack
+    vertical = np.empty((H, padded.shape[-1]), dtype=padded.dtype)
+    scratch = np.empty_like(vertical)
+
+    for c, plane in enumerate(planes):
+        for n, (column, row) in enumerate(factors):
+            vertical.fill(0)
+            for t, w in enumerate(column):
+                _accumulate(vertical, plane[t:t + H, :], w, scratch)
+
+            for t, w in enumerate(row):
+                _accumulate(out[n, c], vertical[:, t:t + W], w, scratch[:, :W])
+    return out.reshape((len(bank),) + padded.shape[:-2] + (H, W))
+
+
+def _convolve_fft(padded, bank, shape):
+    """Large-kernel backend: FFT convolution of the reflect-padded image."""
+    H, W = shape
+    lead = (1,) * (padded.ndim - 2)
+    out = np.stack([fftconvolve(padded, kernel.reshape(lead + kernel.shape),
+                                mode='valid', axes=(-2, -1))[..., :H, :W]
+                    for kernel in bank])
+    return _cast_result(out, padded.dtype)
+
+
+def _cast_result(out, dtype):
+    """Casts a floating backend result to the working dtype (rounding for integer paths)."""
+    if np.issubdtype(dtype, np.integer):
+        out = np.rint(out)
+    return out.astype(dtype, copy=False)
+
+
+def _convolve_cv2(padded, bank, shape):
+    """Fallback backend: cv2.filter2D (correlation) with flipped kernels on the padded image."""
+    H, W = shape
+    _, kh, kw = bank.shape
+    pad_h, pad_w = kh // 2, kw // 2
+    ddepth = cv2.CV_64F if padded.dtype == np.float64 else cv2.CV_32F
+    planes = padded.reshape((-1,) + padded.shape[-2:])
+    if planes.dtype.kind != 'f':
+        planes = planes.astype(np.float32)
+
+    out = np.empty((len(bank), len(planes), H, W), dtype=planes.dtype)
+    for n, kernel in enumerate(bank):
+        flipped = np.ascontiguousarray(kernel[::-1, ::-1])
+        for c, plane in enumerate(planes):
+            filtered = cv2.filter2D(plane, ddepth, flipped, borderType=cv2.BORDER_REFLECT_101)
+            out[n, c] = filtered[pad_h:pad_h + H, pad_w:pad_w + W]
+    out = out.reshape((len(bank),) + padded.shape[:-2] + (H, W))
+    return _cast_result(out, padded.dtype)
+
+
+CONVOLUTION_BACKENDS = {
+    'strided': _convolve_strided,
+    'bank': _convolve_bank,
+    'separable': _convolve_separable,
+    'fft': _convolve_fft,
+    'cv2': _convolve_cv2,
+}
+
+
+def choose_backend(kernels, dtype=np.float64, integer_input=True):
+    """Picks a convolution backend from the rank and size of a (k, kh, kw) kernel bank.
+
+    'separable' and 'bank' sum in another order than 'strided', so they are
+    only picked for integer-valued input (`integer_input`) and integer
+    factors, where every partial sum is an exact integer. On other float input
+    the last bits would change and flip exact ties downstream (Canny's NMS on
+    its blurred planes), so it keeps the 'strided' rounding.
+    """
+    _, kh, kw = kernels.shape
+    if kh * kw > 1 and integer_input and all(_exact_factors(k, dtype) for k in kernels):
+        return 'separable'
+    if kh * kw >= FFT_MIN_KERNEL_AREA:
+        return 'fft'
+    return 'bank' if integer_input else 'strided'
+
+
+@profiled
+def convolve2d_bank(image, kernels, backend='auto', dtype=np.float64, integer_input=None):
+    """Convolves one image with a stack of equally sized kernels.
+
+    `kernels` is a (k, kh, kw) array (or a sequence of (kh, kw) kernels). The
+    image is cast to `dtype` and reflect-padded once, and every response is
+    computed from that single buffer, e.g. both Sobel gradients in one
+    tensordot. Returns a (k, H, W) array of `dtype`.
+
+    `image` may also be a (C, H, W) stack of planes; all of them are padded
+    and convolved in the same pass and a (k, C, H, W) array is returned.
+
+    `integer_input` tells 'auto' that a float `image` holds integer values
+    (e.g. 8-bit pixels already cast); by default only integer dtypes count.
+    """
+    image = np.asarray(image)
+    if integer_input is None:
+        integer_input = image.dtype.kind in 'biu'
+    image = np.asarray(image, dtype=dtype)
+    kernels = np.asarray(kernels, dtype=np.float64)
+    if kernels.ndim == 2:
+        kernels = kernels[np.newaxis]
+
+    _, kh, kw = kernels.shape
+    padded = _pad_reflect(image, kh, kw)
+
+    if backend == 'auto':
+        backend = choose_backend(kernels, image.dtype, integer_input)
+    return CONVOLUTION_BACKENDS[backend](padded, kernels, image.shape[-2:])
+
+
+def fast_convolve2d(image, kernel, backend='auto', dtype=np.float64, integer_input=None):
+    """Performs a fast 2D convolution with reflect padding.
+
+    `backend` is one of CONVOLUTION_BACKENDS or 'auto' (see `choose_backend`),
+    which separates rank-1 integer kernels on integer input into two 1D
+    passes, sends large dense kernels through the FFT and uses numpy's stride
+    tricks for the rest. All backends return the same (H, W) result up to the
+    last bits of float rounding, computed in `dtype` (float64 by default).
+    """
+    return convolve2d_bank(image, kernel, backend, dtype, integer_input)[0]
+
+
+@profiled
 def sobel_edges_old(channel):
     """Edge detection using cv2.Sobel (for comparison/legacy)."""
     ch = channel.astype(np.float64)
@@ -27,8 +379,57 @@ def sobel_edges_old(channel):
     magnitude = np.hypot(grad_x, grad_y)
     return cv2.normalize(magnitude, None, 0, 255, cv2.NORM_MINMAX).astype(np.uint8)
 
-def sobel_edges(channel, low_t=0, high_t=255):
-    """Edge detection using Sobel filter without cv2.Sobel."""
+
+# ------------------------------------------------------------------------------
+#  Finishing stages: (C, H, W) response planes -> uint8 edge planes
+# ------------------------------------------------------------------------------
+@profiled
+def normalize_response(response, low_t=0, high_t=255, value_range=None, overwrite=False):
+    """Clips a response to [low_t, high_t] and min-max normalizes every plane to uint8.
+
+    `value_range` is the per-plane (min, max) of the clipped response over the
+    whole image when `response` is only a tile of it. With `overwrite=True` the
+    response is clipped in place.
+    """
+    clipped = np.clip(response, low_t, high_t, out=response if overwrite else None)
+    return _normalize_uint8(clipped, value_range)
+
+
+@profiled
+def scale_abs_response(response, low_t=0, high_t=255, overwrite=False):
+    """Clips a response to [low_t, high_t] and converts it with cv2.convertScaleAbs."""
+    clipped = np.clip(response, low_t, high_t, out=response if overwrite else None)
+    return _convert_scale_abs(clipped)
+
+
+@profiled
+def hysteresis_response(response, low_t=0, high_t=255, overwrite=False):
+    """Hysteresis edge linking (see `hysteresis_threshold`) of every plane of a response."""
+    return np.stack([hysteresis_threshold(plane, low_t, high_t) for plane in response])
+
+
+# ------------------------------------------------------------------------------
+#  Operators
+# ------------------------------------------------------------------------------
+def _gradient_magnitude(channel, kernel_x, kernel_y, precision):
+    """(C, H, W) gradient magnitude of a channel or stack from one kernel-bank pass."""
+    dtype = _working_dtype(precision, channel, [kernel_x, kernel_y])
+    planes, _ = _as_planes(channel, dtype)
+    grad_x, grad_y = convolve2d_bank(planes, [kernel_x, kernel_y], dtype=dtype,
+                                     integer_input=_is_integer(channel))
+    return _magnitude(grad_x, grad_y)
+
+
+def _laplacian_response(channel, kernel, precision):
+    """(C, H, W) response of a single Laplacian-type kernel."""
+    dtype = _working_dtype(precision, channel, kernel)
+    planes, _ = _as_planes(channel, dtype)
+    return fast_convolve2d(planes, kernel, dtype=dtype, integer_input=_is_integer(channel))
+
+
+@profiled
+def sobel_response(channel, precision='float64'):
+    """Threshold-independent stage of `sobel_edges`: gradient magnitude planes."""
     sobel_x = np.array([[-1, 0, 1],
                         [-2, 0, 2],
                         [-1, 0, 1]], dtype=np.float64)
@@ -37,14 +438,19 @@ def sobel_edges(channel, low_t=0, high_t=255):
                         [ 0,  0,  0],
                         [ 1,  2,  1]], dtype=np.float64)
 
-    grad_x = fast_convolve2d(channel, sobel_x)
-    grad_y = fast_convolve2d(channel, sobel_y)
-    magnitude = np.hypot(grad_x, grad_y)
-    magnitude = np.clip(magnitude, low_t, high_t)
-    return cv2.normalize(magnitude, None, 0, 255, cv2.NORM_MINMAX).astype(np.uint8)
+    return _gradient_magnitude(channel, sobel_x, sobel_y, precision)
+
+
+@profiled
+def sobel_edges(channel, low_t=0, high_t=255, precision='float64'):
+    """Edge detection using Sobel filter without cv2.Sobel."""
+    magnitude = sobel_response(channel, precision)
+    edges = normalize_response(magnitude, low_t, high_t, overwrite=True)
+    return _from_planes(edges, np.ndim(channel) == 3)
 
 
-def laplacian_edges(channel, low_t=0, high_t=255):
+@profiled
+def laplacian_edges(channel, low_t=0, high_t=255, precision='float64'):
     """Compatibility alias for the 4-neighbor Laplacian variant.
 
     The repository now exposes three Laplacian variants:
@@ -55,10 +461,21 @@ def laplacian_edges(channel, low_t=0, high_t=255):
     `laplacian_edges` is kept as an alias to `laplacian_edges_4` for backward compatibility.
     """
 
-    return laplacian_edges_4(channel, low_t, high_t)
+    return laplacian_edges_4(channel, low_t, high_t, precision)
+
+
+@profiled
+def laplacian_4_response(channel, precision='float64'):
+    """Threshold-independent stage of `laplacian_edges_4`: signed Laplacian planes."""
+    laplacian_kernel = np.array([[0,  1, 0],
+                                 [1, -4, 1],
+                                 [0,  1, 0]], dtype=np.float64)
 
+    return _laplacian_response(channel, laplacian_kernel, precision)
 
-def laplacian_edges_4(channel, low_t=0, high_t=255):
+
+@profiled
+def laplacian_edges_4(channel, low_t=0, high_t=255, precision='float64'):
     """Edge detection using 4-neighbor Laplacian kernel (cross).
 
     Kernel:
@@ -66,17 +483,23 @@ def laplacian_edges_4(channel, low_t=0, high_t=255):
       [1,-4, 1]
       [0, 1, 0]
     """
-    laplacian_kernel = np.array([[0,  1, 0],
-                                 [1, -4, 1],
-                                 [0,  1, 0]], dtype=np.float64)
+    lap = laplacian_4_response(channel, precision)
+    edges = scale_abs_response(lap, low_t, high_t, overwrite=True)
+    return _from_planes(edges, np.ndim(channel) == 3)
+
 
-    lap = fast_convolve2d(channel, laplacian_kernel)
-    lap = np.clip(lap, low_t, high_t)
+@profiled
+def laplacian_8_response(channel, precision='float64'):
+    """Threshold-independent stage of `laplacian_edges_8`: signed Laplacian planes."""
+    kernel_8 = np.array([[1, 1, 1],
+                         [1,-8, 1],
+                         [1, 1, 1]], dtype=np.float64)
 
-    return cv2.convertScaleAbs(lap)
+    return _laplacian_response(channel, kernel_8, precision)
 
 
-def laplacian_edges_8(channel, low_t=0, high_t=255):
+@profiled
+def laplacian_edges_8(channel, low_t=0, high_t=255, precision='float64'):
     """Edge detection using 8-neighbor Laplacian kernel (full 3x3).
 
     Kernel:
@@ -84,21 +507,14 @@ def laplacian_edges_8(channel, low_t=0, high_t=255):
       [1,-8, 1]
       [1, 1, 1]
     """
-    kernel_8 = np.array([[1, 1, 1],
-                         [1,-8, 1],
-                         [1, 1, 1]], dtype=np.float64)
-
-    lap = fast_convolve2d(channel, kernel_8)
-    lap = np.clip(lap, low_t, high_t)
-
-    return cv2.convertScaleAbs(lap)
+    lap = laplacian_8_response(channel, precision)
+    edges = scale_abs_response(lap, low_t, high_t, overwrite=True)
+    return _from_planes(edges, np.ndim(channel) == 3)
 
 
-def laplacian_edges_log(channel, low_t=0, high_t=255):
-    """Laplacian of Gaussian (LoG) approximate 5x5 kernel.
-
-    Uses a small 5x5 LoG kernel to provide smoothing + second-derivative.
-    """
+@profiled
+def laplacian_log_response(channel, precision='float64'):
+    """Threshold-independent stage of `laplacian_edges_log`: signed LoG planes."""
     # 5x5 LoG kernel (approximation)
     log_kernel = np.array([
         [0,  0, -1,  0,  0],
@@ -108,14 +524,23 @@ def laplacian_edges_log(channel, low_t=0, high_t=255):
         [0,  0, -1,  0,  0]
     ], dtype=np.float64)
 
-    lap = fast_convolve2d(channel, log_kernel)
-    lap = np.clip(lap, low_t, high_t)
+    return _laplacian_response(channel, log_kernel, precision)
 
-    return cv2.convertScaleAbs(lap)
 
+@profiled
+def laplacian_edges_log(channel, low_t=0, high_t=255, precision='float64'):
+    """Laplacian of Gaussian (LoG) approximate 5x5 kernel.
 
-def scharr_edges(channel, low_t=0, high_t=255):
-    """Edge detection using Scharr filter without cv2.Scharr."""
+    Uses a small 5x5 LoG kernel to provide smoothing + second-derivative.
+    """
+    lap = laplacian_log_response(channel, precision)
+    edges = scale_abs_response(lap, low_t, high_t, overwrite=True)
+    return _from_planes(edges, np.ndim(channel) == 3)
+
+
+@profiled
+def scharr_response(channel, precision='float64'):
+    """Threshold-independent stage of `scharr_edges`: gradient magnitude planes."""
     scharr_x = np.array([[-3, 0, 3],
                          [-10, 0, 10],
                          [-3, 0, 3]], dtype=np.float64)
@@ -124,14 +549,20 @@ def scharr_edges(channel, low_t=0, high_t=255):
                          [ 0,   0,  0],
                          [ 3,  10,  3]], dtype=np.float64)
 
-    grad_x = fast_convolve2d(channel, scharr_x)
-    grad_y = fast_convolve2d(channel, scharr_y)
-    magnitude = np.hypot(grad_x, grad_y)
-    magnitude = np.clip(magnitude, low_t, high_t)
-    return cv2.normalize(magnitude, None, 0, 255, cv2.NORM_MINMAX).astype(np.uint8)
+    return _gradient_magnitude(channel, scharr_x, scharr_y, precision)
 
-def prewitt_edges(channel, low_t=0, high_t=255):
-    """Edge detection using Prewitt filter."""
+
+@profiled
+def scharr_edges(channel, low_t=0, high_t=255, precision='float64'):
+    """Edge detection using Scharr filter without cv2.Scharr."""
+    magnitude = scharr_response(channel, precision)
+    edges = normalize_response(magnitude, low_t, high_t, overwrite=True)
+    return _from_planes(edges, np.ndim(channel) == 3)
+
+
+@profiled
+def prewitt_response(channel, precision='float64'):
+    """Threshold-independent stage of `prewitt_edges`: gradient magnitude planes."""
     prewitt_x = np.array([[-1, 0, 1],
                           [-1, 0, 1],
                           [-1, 0, 1]], dtype=np.float64)
@@ -140,47 +571,75 @@ def prewitt_edges(channel, low_t=0, high_t=255):
                           [0, 0, 0],
                           [-1, -1, -1]], dtype=np.float64)
 
-    grad_x = fast_convolve2d(channel, prewitt_x)
-    grad_y = fast_convolve2d(channel, prewitt_y)
-    magnitude = np.hypot(grad_x, grad_y)
-    magnitude = np.clip(magnitude, low_t, high_t)
-    return cv2.normalize(magnitude, None, 0, 255, cv2.NORM_MINMAX).astype(np.uint8)
+    return _gradient_magnitude(channel, prewitt_x, prewitt_y, precision)
 
-def canny_cv2_edges(channel, low_t=50, high_t=150):
-    ch = channel.astype(np.uint8)
-    edges = cv2.Canny(ch, low_t, high_t)
-    return edges
 
+@profiled
+def prewitt_edges(channel, low_t=0, high_t=255, precision='float64'):
+    """Edge detection using Prewitt filter."""
+    magnitude = prewitt_response(channel, precision)
+    edges = normalize_response(magnitude, low_t, high_t, overwrite=True)
+    return _from_planes(edges, np.ndim(channel) == 3)
 
-def canny_edges(channel, low_t=0, high_t=255):
-    """
-    Soft Canny edges using explicit Sobel kernels with non-maximum suppression.
-    Returns uint8 edges clipped to [low_t, high_t].
+
+@profiled
+def canny_cv2_edges(channel, low_t=50, high_t=150, precision='float64'):
+    # `precision` only keeps the signature uniform, cv2.Canny always works on 8-bit input
+    planes, stacked = _as_planes(channel, np.uint8)
+    edges = np.stack([cv2.Canny(plane, low_t, high_t) for plane in planes])
+    return _from_planes(edges, stacked)
+
+
+@profiled
+def non_max_suppression(mag, angle):
+    """Vectorized non-maximum suppression of a gradient magnitude map.
+
+    `angle` is the gradient direction in radians (as returned by np.arctan2).
+    Directions are quantized once into four sectors (0, 45, 90, 135 degrees)
+    and the two neighbours along the gradient are gathered with shifted views
+    of `mag`, so no per-pixel Python loop is needed. The one pixel wide image
+    border is left at zero. Leading axes (e.g. a (C, H, W) stack) are kept.
     """
-    import numpy as np
-    import cv2
+    M, N = mag.shape[-2:]
+    nms = np.zeros(mag.shape, dtype=mag.dtype)
+    if M < 3 or N < 3:
+        return nms
 
-    ch = channel.astype(np.float64)
-    blurred = cv2.GaussianBlur(ch, (5, 5), 1.4)
+    angle_deg = angle * 180. / np.pi
+    angle_deg[angle_deg < 0] += 180
+    a = angle_deg[..., 1:-1, 1:-1]
 
-    # Sobel kernels
-    sobel_x = np.array([[-1, 0, 1],
-                        [-2, 0, 2],
-                        [-1, 0, 1]], dtype=np.float64)
-    sobel_y = np.array([[-1, -2, -1],
-                        [ 0,  0,  0],
-                        [ 1,  2,  1]], dtype=np.float64)
+    # quantized direction sectors
+    sector_0 = (a < 22.5) | (a >= 157.5)
+    sector_45 = (a >= 22.5) & (a < 67.5)
+    sector_90 = (a >= 67.5) & (a < 112.5)
 
-    # Gradients using convolution
-    Ix = fast_convolve2d(blurred, sobel_x)
-    Iy = fast_convolve2d(blurred, sobel_y)
+    # shifted views of the neighbours: mag[i + di, j + dj] for the interior
+    def shifted(di, dj):
+        return mag[..., 1 + di:M - 1 + di, 1 + dj:N - 1 + dj]
 
-    mag = np.hypot(Ix, Iy)
-    angle = np.arctan2(Iy, Ix)
+    q = np.where(sector_0, shifted(0, 1),
+        np.where(sector_45, shifted(1, -1),
+        np.where(sector_90, shifted(1, 0), shifted(-1, -1))))
+    r = np.where(sector_0, shifted(0, -1),
+        np.where(sector_45, shifted(-1, 1),
+        np.where(sector_90, shifted(-1, 0), shifted(1, 1))))
 
-    # Non-maximum suppression
+    center = mag[..., 1:-1, 1:-1]
+    keep = (center >= q) & (center >= r)
+    nms[..., 1:-1, 1:-1] = np.where(keep, center, 0)
+    return nms
+
+
+@profiled
+def non_max_suppression_loop(mag, angle):
+    """Per-pixel double loop NMS of a 2D magnitude map (for comparison/legacy).
+
+    The original implementation `non_max_suppression` replaced; kept as its
+    reference in the tests and `edges_benchmark`.
+    """
     M, N = mag.shape
-    nms = np.zeros((M, N), dtype=np.float64)
+    nms = np.zeros((M, N), dtype=mag.dtype)
     angle_deg = angle * 180. / np.pi
     angle_deg[angle_deg < 0] += 180
 
@@ -201,29 +660,143 @@ def canny_edges(channel, low_t=0, high_t=255):
                     nms[i, j] = mag[i, j]
             except IndexError:
                 pass
+    return nms
 
-    # Clip to user-defined range
-    nms = np.clip(nms, low_t, high_t)
 
-    # Normalize to 0-255
-    nms = cv2.normalize(nms, None, 0, 255, cv2.NORM_MINMAX)
+@profiled
+def hysteresis_threshold(nms, low_t, high_t):
+    """Double threshold + hysteresis edge linking on a suppressed magnitude map.
 
-    return nms.astype(np.uint8)
+    Pixels above `high_t` are strong edges, pixels above `low_t` are weak
+    candidates (same convention as cv2.Canny). Weak pixels are kept only when
+    their 8-connected component contains at least one strong pixel; components
+    are found with cv2.connectedComponents instead of a per-pixel recursion.
+    Returns a binary uint8 map (0 / 255).
+    """
+    weak = nms > low_t
+    strong = nms > high_t
 
-def roberts_edges(channel, low_t=0, high_t=255):
-    """Edge detection using Roberts cross operator (2x2) without cv2."""
+    n_labels, labels = cv2.connectedComponents(weak.astype(np.uint8), connectivity=8)
+
+    keep = np.zeros(n_labels, dtype=bool)
+    keep[labels[strong]] = True
+    keep[0] = False  # background
+
+    return keep[labels].astype(np.uint8) * 255
+
+
+def canny_gradients(channel, precision='float64'):
+    """Gaussian blur and Sobel gradients of `canny_edges`: (C, H, W) magnitude and direction (radians)."""
+    dtype = _working_dtype(precision, channel)
+    planes, _ = _as_planes(channel, dtype)
+    blurred = np.empty_like(planes)
+    with stage('GaussianBlur', planes):
+        for n, plane in enumerate(planes):
+            blurred[n] = cv2.GaussianBlur(plane, (5, 5), 1.4)
+
+    # Sobel kernels
+    sobel_x = np.array([[-1, 0, 1],
+                        [-2, 0, 2],
+                        [-1, 0, 1]], dtype=np.float64)
+    sobel_y = np.array([[-1, -2, -1],
+                        [ 0,  0,  0],
+                        [ 1,  2,  1]], dtype=np.float64)
+
+    # Gradients using convolution
+    Ix, Iy = convolve2d_bank(blurred, [sobel_x, sobel_y], dtype=dtype)
+
+    mag = np.hypot(Ix, Iy)
+    if dtype != np.float64:
+        # float32 rounding of the blur leaves residual magnitudes where float64 gives
+        # (almost) 0; as weak edges they would all pass a low threshold of 0
+        mag[mag < FLOAT32_MAGNITUDE_FLOOR] = 0
+    angle = np.arctan2(Iy, Ix)
+    return mag, angle
+
+
+@profiled
+def canny_response(channel, precision='float64'):
+    """Threshold-independent stage of `canny_edges`: Gaussian blur, Sobel gradients
+    and non-maximum suppression, returned as (C, H, W) suppressed magnitudes."""
+    mag, angle = canny_gradients(channel, precision)
+
+    # Non-maximum suppression
+    return non_max_suppression(mag, angle)
+
+
+@profiled
+def canny_edges(channel, low_t=0, high_t=255, hysteresis=False, precision='float64'):
+    """
+    Soft Canny edges using explicit Sobel kernels with non-maximum suppression.
+    Returns uint8 edges clipped to [low_t, high_t].
+
+    With `hysteresis=True` the suppressed magnitudes are instead passed through
+    a double threshold with edge linking (see `hysteresis_threshold`) and a
+    binary 0/255 map is returned, as with cv2.Canny.
+    """
+    nms = canny_response(channel, precision)
+
+    if hysteresis:
+        # Double threshold + edge linking on the same NMS result
+        edges = hysteresis_response(nms, low_t, high_t)
+    else:
+        # Clip to user-defined range and normalize to 0-255
+        edges = normalize_response(nms, low_t, high_t, overwrite=True)
+
+    return _from_planes(edges, np.ndim(channel) == 3)
+
+
+@profiled
+def canny_hysteresis_edges(channel, low_t=0, high_t=255, precision='float64'):
+    """Binary Canny edges: `canny_edges` with hysteresis edge linking."""
+    return canny_edges(channel, low_t, high_t, hysteresis=True, precision=precision)
+
+
+@profiled
+def roberts_response(channel, precision='float64'):
+    """Threshold-independent stage of `roberts_edges`: gradient magnitude planes."""
     # Roberts cross kernels (2x2)
     roberts_x = np.array([[1, 0],
                           [0, -1]], dtype=np.float64)
     roberts_y = np.array([[0, 1],
                           [-1, 0]], dtype=np.float64)
 
-    # ensure float for convolution
-    grad_x = fast_convolve2d(channel, roberts_x)
-    grad_y = fast_convolve2d(channel, roberts_y)
+    return _gradient_magnitude(channel, roberts_x, roberts_y, precision)
 
-    magnitude = np.hypot(grad_x, grad_y)
-    magnitude = np.clip(magnitude, low_t, high_t)
+
+@profiled
+def roberts_edges(channel, low_t=0, high_t=255, precision='float64'):
+    """Edge detection using Roberts cross operator (2x2) without cv2."""
+    magnitude = roberts_response(channel, precision)
 
     # normalize to 0-255 uint8 like other functions
-    return cv2.normalize(magnitude, None, 0, 255, cv2.NORM_MINMAX).astype(np.uint8)
\ No newline at end of file
+    edges = normalize_response(magnitude, low_t, high_t, overwrite=True)
+    return _from_planes(edges, np.ndim(channel) == 3)
+
+
+# ------------------------------------------------------------------------------
+#  Stage table
+# ------------------------------------------------------------------------------
+# response: threshold-independent stage, channel/stack -> (C, H, W) planes (None: not split)
+# finish:   (response, low_t, high_t) -> uint8 planes
+# scope:    'local'  - finish is per pixel,
+#           'minmax' - finish needs the per-plane min/max of the whole image,
+#           'linked' - finish links pixels across the whole image (hysteresis)
+# halo:     pixels of context needed around a region to reproduce it exactly
+# work:     working buffers of the compute dtype per pixel and channel (memory estimate)
+EdgeStages = namedtuple('EdgeStages', 'response finish scope halo work')
+
+EDGE_STAGES = {
+    sobel_edges: EdgeStages(sobel_response, normalize_response, 'minmax', 1, 8),
+    scharr_edges: EdgeStages(scharr_response, normalize_response, 'minmax', 1, 8),
+    prewitt_edges: EdgeStages(prewitt_response, normalize_response, 'minmax', 1, 8),
+    roberts_edges: EdgeStages(roberts_response, normalize_response, 'minmax', 1, 11),
+    laplacian_edges: EdgeStages(laplacian_4_response, scale_abs_response, 'local', 1, 12),
+    laplacian_edges_4: EdgeStages(laplacian_4_response, scale_abs_response, 'local', 1, 12),
+    laplacian_edges_8: EdgeStages(laplacian_8_response, scale_abs_response, 'local', 1, 12),
+    laplacian_edges_log: EdgeStages(laplacian_log_response, scale_abs_response, 'local', 2, 28),
+    canny_edges: EdgeStages(canny_response, normalize_response, 'minmax', 4, 16),
+    canny_hysteresis_edges: EdgeStages(canny_response, hysteresis_response, 'linked', 4, 16),
+    # cv2.Canny links edges internally; tiles only see `halo` pixels of context
+    canny_cv2_edges: EdgeStages(None, None, 'local', 16, 4),
+}
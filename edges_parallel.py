@@ -0,0 +1,180 @@
+"""Runs many `detect_edges` configurations of one image on a process pool.
+
+The image is copied once into a `multiprocessing.shared_memory` segment;
+tasks only carry its name, shape and dtype, and every worker maps the
+segment instead of receiving a pickled copy per task:
+
+    pool = SharedImagePool()
+    image = pool.share(img)
+    futures = [pool.submit(image, 'RGB', method) for method in METHODS]
+    ...
+    pool.close()
+
+Each worker keeps its own conversion / response / result caches (see
+`edges_detection`), so tasks are routed with affinity: all runs of one
+configuration (shared image, colour space, method, precision) go to the
+worker that ran it first, and a rerun with new thresholds finds its cached
+response instead of landing on a cold worker. New configurations go to the
+worker with the fewest pending tasks. Since a worker only caches its own
+configurations, its budgets are the single-process budgets divided by
+WORKER_CACHE_SHARE rather than by the number of workers: a 3 MP float64 RGB
+response (72 MiB) still fits several times.
+
+On platforms that start workers with 'spawn' (Windows, macOS) the main
+script is imported again in every worker, so it must guard its start-up
+code with `if __name__ == '__main__':`.
+"""
+import contextlib
+import os
+import threading
+from collections import OrderedDict, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+import edges_detection
+from edges_profile import Profiler
+
+# What a task needs to map the shared image: segment name, shape, dtype
+SharedImage = namedtuple('SharedImage', 'name shape dtype')
+
+# Shared images a worker keeps mapped (the current one and the one before)
+WORKER_ATTACHED_IMAGES = 2
+
+# A worker's cache budgets are the single-process budgets divided by this (at most)
+WORKER_CACHE_SHARE = 2
+
+# per-worker state: segment name -> (SharedMemory, ndarray view)
+_attached = OrderedDict()
+
+
+def _init_worker(workers):
+    share = min(workers, WORKER_CACHE_SHARE)
+    for cache in (edges_detection.conversion_cache, edges_detection.response_cache,
+                  edges_detection.result_cache):
+        cache.max_bytes //= share
+
+
+def _attach(image):
+    if image.name in _attached:
+        _attached.move_to_end(image.name)
+        return _attached[image.name][1]
+
+    # workers share the parent's resource tracker, so attaching does not
+    # take ownership: the segment is unlinked by the pool that created it
+    shm = shared_memory.SharedMemory(name=image.name)
+    img = np.ndarray(image.shape, dtype=image.dtype, buffer=shm.buf)
+    img.setflags(write=False)
+    _attached[image.name] = (shm, img)
+
+    while len(_attached) > WORKER_ATTACHED_IMAGES:
+        _, (old_shm, old_img) = _attached.popitem(last=False)
+        del old_img
+        try:
+            old_shm.close()
+        except BufferError:
+            # still referenced by a cached view; released with the worker
+            pass
+    return img
+
+
+def detect_edges_shared(image, color_space='RGB', method='Sobel', low_threshold=0,
+                        high_threshold=255, precision='float64', profile=False):
+    """`detect_edges` on a shared image, run in a worker.
+
+    Returns (edges, edges_sum, titles); titles are the untranslated keys.
+    With `profile=True` the list of `edges_profile.ProfileEvent`s of the run
+    is appended.
+    """
+    img = _attach(image)
+    profiler = Profiler() if profile else contextlib.nullcontext()
+    with profiler:
+        _, edges, edges_sum, titles = edges_detection.detect_edges(
+            img, color_space, method, low_threshold=low_threshold,
+            high_threshold=high_threshold, precision=precision)
+    if profile:
+        return np.stack(edges), edges_sum, titles, profiler.events
+    return np.stack(edges), edges_sum, titles
+
+
+class SharedImagePool:
+    """Process pool running `detect_edges` on images shared through shared memory.
+
+    Every worker is a single-process executor, so a task can be sent to the
+    worker holding the caches of its configuration.
+    """
+
+    def __init__(self, max_workers=None):
+        self.max_workers = max_workers or os.cpu_count()
+        self._workers = [ProcessPoolExecutor(max_workers=1, initializer=_init_worker,
+                                             initargs=(self.max_workers,))
+                         for _ in range(self.max_workers)]
+        self._lock = threading.Lock()
+        # pending tasks of every worker
+        self._pending = [0] * self.max_workers
+        # (segment name, colour space, method, precision) -> worker index
+        self._affinity = {}
+        # segment name -> [SharedMemory, pending tasks, retired]
+        self._segments = {}
+
+    def share(self, img):
+        """Copies `img` into a new shared segment; earlier images are released once their tasks finish."""
+        img = np.asarray(img)
+        shm = shared_memory.SharedMemory(create=True, size=max(img.nbytes, 1))
+        np.ndarray(img.shape, dtype=img.dtype, buffer=shm.buf)[...] = img
+
+        with self._lock:
+            for name in list(self._segments):
+                self._retire(name)
+            self._segments[shm.name] = [shm, 0, False]
+        return SharedImage(shm.name, img.shape, img.dtype.str)
+
+    def submit(self, image, color_space='RGB', method='Sobel', low_threshold=0,
+               high_threshold=255, precision='float64', profile=False):
+        """Schedules `detect_edges_shared` on the worker of its configuration; returns its Future."""
+        with self._lock:
+            self._segments[image.name][1] += 1
+            worker = self._affinity.setdefault((image.name, color_space, method, precision),
+                                               self._pending.index(min(self._pending)))
+            self._pending[worker] += 1
+        future = self._workers[worker].submit(detect_edges_shared, image, color_space, method,
+                                              low_threshold, high_threshold, precision, profile)
+        future.add_done_callback(lambda _: self._task_done(image.name, worker))
+        return future
+
+    def worker_of(self, image, color_space='RGB', method='Sobel', precision='float64'):
+        """Index of the worker that runs this configuration, None before its first task."""
+        with self._lock:
+            return self._affinity.get((image.name, color_space, method, precision))
+
+    def _task_done(self, name, worker):
+        with self._lock:
+            self._pending[worker] -= 1
+            segment = self._segments.get(name)
+            if segment is not None:
+                segment[1] -= 1
+                if segment[2]:
+                    self._retire(name)
+
+    def _retire(self, name):
+        # called with the lock held
+        segment = self._segments[name]
+        segment[2] = True
+        for key in [key for key in self._affinity if key[0] == name]:
+            del self._affinity[key]
+        if segment[1] == 0:
+            del self._segments[name]
+            segment[0].close()
+            segment[0].unlink()
+
+    def close(self, wait=True):
+        """Cancels pending tasks, stops the workers and frees all shared images."""
+        for executor in self._workers:
+            executor.shutdown(wait=False, cancel_futures=True)
+        if wait:
+            for executor in self._workers:
+                executor.shutdown(wait=True)
+        with self._lock:
+            for name in list(self._segments):
+                self._retire(name)
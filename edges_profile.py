@@ -0,0 +1,271 @@
+"""Per-stage profiling of the detection pipeline.
+
+The operators of `edges_methods` and the stages of `detect_edges` (colour
+decomposition, fusion) are wrapped with `profiled`. While a `Profiler` is
+active every such call is recorded as a ProfileEvent: wall time (total and
+self, i.e. without the profiled calls nested in it), bytes of the returned
+arrays (`out_bytes`), the shapes of the array arguments and results and,
+with `Profiler(trace_memory=True)`, the bytes allocated (`alloc_bytes`):
+
+    with Profiler() as prof:
+        detect_edges(img, 'LAB', 'Canny')
+    print(prof.breakdown())
+    prof.save_chrome_trace('trace.json')    # chrome://tracing, Perfetto
+
+`callback(event)` is called for every recorded event as it happens. Code
+that is not a single function can be timed with `with stage(name): ...`.
+
+Without an active profiler a wrapped call costs one context variable
+lookup; nothing is timed or recorded. The active profiler is per thread
+(a `contextvars` slot): a profiler records the calls of the thread - or
+asyncio task - that entered it, profilers of other threads run alongside
+it, and nested profilers replace the outer one until they exit.
+
+`alloc_bytes` is the peak of the memory traced by `tracemalloc` during the
+call above the amount traced when it started: Python and numpy buffers, not
+OpenCV-internal ones. tracemalloc slows every allocation down, so it is only
+started (and stopped again) by profilers created with `trace_memory=True`;
+its counters are process wide, so allocations of other threads running at
+the same time are counted too. Otherwise `alloc_bytes` is None.
+"""
+import contextvars
+import functools
+import json
+import os
+import threading
+import time
+import tracemalloc
+from collections import OrderedDict, namedtuple
+
+import numpy as np
+
+# start and times in seconds (start relative to the profiler's creation);
+# out_bytes: bytes of the returned arrays; alloc_bytes: peak traced allocation
+# (None without trace_memory); inputs / output: shapes of the arrays
+ProfileEvent = namedtuple('ProfileEvent', 'name start duration self_time out_bytes alloc_bytes '
+                                          'inputs output thread depth')
+
+# the active profiler of the current thread / context, None when profiling is off
+_active = contextvars.ContextVar('edges_profiler', default=None)
+
+
+def _shapes(values):
+    shapes = []
+    for value in values:
+        if isinstance(value, np.ndarray):
+            shapes.append(list(value.shape))
+        elif isinstance(value, (tuple, list)):
+            shapes.extend(_shapes(value))
+    return shapes
+
+
+def _nbytes(value):
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, (tuple, list)):
+        return sum(_nbytes(v) for v in value)
+    return 0
+
+
+class _Frame:
+    """Time spent in the nested stages of an open stage and the highest traced memory they saw."""
+    __slots__ = ('children', 'peak')
+
+    def __init__(self):
+        self.children = 0.0
+        self.peak = 0
+
+
+class _Stage:
+    """One timed region of a profiler; nested regions are subtracted from its self time."""
+
+    def __init__(self, profiler, name, args=()):
+        self.profiler = profiler
+        self.name = name
+        self.args = args
+        self.result = None
+
+    def __enter__(self):
+        self.stack = self.profiler._stack()
+        self.frame = _Frame()
+        self.traced = self.profiler.trace_memory and tracemalloc.is_tracing()
+        if self.traced:
+            # the peak counter is global: fold it into the enclosing stage before resetting it
+            current, peak = tracemalloc.get_traced_memory()
+            if self.stack:
+                self.stack[-1].peak = max(self.stack[-1].peak, peak)
+            tracemalloc.reset_peak()
+            self.base = current
+        self.stack.append(self.frame)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        duration = time.perf_counter() - self.start
+        alloc = None
+        if self.traced:
+            peak = max(tracemalloc.get_traced_memory()[1], self.frame.peak)
+            alloc = max(0, peak - self.base)
+        self.stack.pop()
+        if self.stack:
+            self.stack[-1].children += duration
+            if self.traced:
+                self.stack[-1].peak = max(self.stack[-1].peak, peak)
+        self.profiler._record(ProfileEvent(
+            self.name, self.start - self.profiler.origin, duration, duration - self.frame.children,
+            _nbytes(self.result), alloc, _shapes(self.args), _shapes([self.result]),
+            threading.get_ident(), len(self.stack)))
+        return False
+
+
+class Profiler:
+    """Context manager recording the profiled calls made in its thread while it is active.
+
+    With `trace_memory=True` tracemalloc runs while the profiler is active
+    (unless it was already running) and every event gets its `alloc_bytes`.
+    """
+
+    def __init__(self, callback=None, trace_memory=False):
+        self.callback = callback
+        self.trace_memory = trace_memory
+        self.events = []
+        self.origin = time.perf_counter()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        # (context variable token, whether this entry started tracemalloc) per entry
+        self._entries = []
+
+    def __enter__(self):
+        started = self.trace_memory and not tracemalloc.is_tracing()
+        if started:
+            tracemalloc.start()
+        self._entries.append((_active.set(self), started))
+        return self
+
+    def __exit__(self, *exc):
+        token, started = self._entries.pop()
+        # restores the profiler that was active in this context (raises if exited elsewhere)
+        _active.reset(token)
+        if started:
+            tracemalloc.stop()
+        return False
+
+    def _stack(self):
+        # per-thread stack of the time spent in nested stages
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def _record(self, event):
+        with self._lock:
+            self.events.append(event)
+        if self.callback is not None:
+            self.callback(event)
+
+    def call(self, name, func, args, kwargs):
+        with _Stage(self, name, args) as timed:
+            timed.result = func(*args, **kwargs)
+        return timed.result
+
+    def clear(self):
+        with self._lock:
+            self.events = []
+
+    def summary(self):
+        return summarize(self.events)
+
+    def breakdown(self, limit=4):
+        return breakdown(self.events, limit)
+
+    def to_dict(self):
+        return dict(events=[e._asdict() for e in self.events], summary=self.summary())
+
+    def save_json(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+    def chrome_trace(self):
+        return chrome_trace(self.events)
+
+    def save_chrome_trace(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.chrome_trace(), f)
+
+
+def profiled(func=None, name=None):
+    """Decorator recording every call of `func` into the active profiler."""
+    if func is None:
+        return functools.partial(profiled, name=name)
+    label = name or func.__name__
+    get_active = _active.get
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        profiler = get_active()
+        if profiler is None:
+            return func(*args, **kwargs)
+        return profiler.call(label, func, args, kwargs)
+    return wrapper
+
+
+class _NoStage:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NO_STAGE = _NoStage()
+
+
+def stage(name, *arrays):
+    """Context manager timing a block as stage `name`; `arrays` are its inputs."""
+    profiler = _active.get()
+    if profiler is None:
+        return _NO_STAGE
+    return _Stage(profiler, name, arrays)
+
+
+def active_profiler():
+    return _active.get()
+
+
+# ------------------------------------------------------------------------------
+#  Reports
+# ------------------------------------------------------------------------------
+def summarize(events):
+    """Per-stage totals {name: {calls, total_s, self_s, out_bytes, alloc_bytes}}, by self time,
+    largest first; alloc_bytes is the largest peak of a single call (None when not traced)."""
+    totals = {}
+    for e in events:
+        entry = totals.setdefault(e.name, dict(calls=0, total_s=0.0, self_s=0.0, out_bytes=0,
+                                               alloc_bytes=None))
+        entry['calls'] += 1
+        entry['total_s'] += e.duration
+        entry['self_s'] += e.self_time
+        entry['out_bytes'] += e.out_bytes
+        if e.alloc_bytes is not None:
+            entry['alloc_bytes'] = max(entry['alloc_bytes'] or 0, e.alloc_bytes)
+    return OrderedDict(sorted(totals.items(), key=lambda item: -item[1]['self_s']))
+
+
+def breakdown(events, limit=4):
+    """One-line report: total time of the outermost stages and the `limit` largest self times."""
+    total = sum(e.duration for e in events if e.depth == 0)
+    parts = [f"{name} {entry['self_s'] * 1000:.0f} ms"
+             for name, entry in list(summarize(events).items())[:limit]]
+    return f"{total * 1000:.0f} ms: " + ", ".join(parts)
+
+
+def chrome_trace(events, pid=None):
+    """Events in the Chrome trace event format (complete 'X' events, microseconds)."""
+    pid = os.getpid() if pid is None else pid
+    return dict(traceEvents=[
+        dict(name=e.name, cat='edges', ph='X', ts=e.start * 1e6, dur=e.duration * 1e6,
+             pid=pid, tid=e.thread,
+             args=dict(out_bytes=e.out_bytes, alloc_bytes=e.alloc_bytes,
+                       inputs=e.inputs, output=e.output))
+        for e in events
+    ], displayTimeUnit='ms')
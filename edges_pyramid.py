@@ -0,0 +1,92 @@
+"""Coarse-to-fine edge detection over an image pyramid.
+
+For large images where only the strong structural edges matter:
+
+1. the image is reduced `levels` times with cv2.pyrDown and the method runs
+   on that small level;
+2. pixels whose coarse edge sum reaches `roi_threshold` of its maximum are
+   scaled back to full resolution and dilated by a margin, giving the
+   region of interest (ROI);
+3. the full-resolution operator runs only on the `edges_tiling.tile_grid`
+   tiles touching the ROI (consecutive tiles of a row merged into one
+   strip), each read with the operator's halo - like a tiled run, so the
+   response inside those tiles equals the whole-image response;
+4. the finishing stage and the channel fusion run over the whole image,
+   with a zero response outside the ROI tiles.
+
+Inside the ROI tiles the result therefore equals the full run as long as
+the normalization range is the same, i.e. the strongest response lies in
+the ROI (which it is built around); outside them it is 0. Edges too weak or
+too fine to show at the coarse level are lost, which costs most with edge
+linking (Canny Hysteresis keeps only the chains seeded inside the ROI).
+Operators without a separate response stage (Canny CV2) cannot be
+restricted this way and are rejected, and `levels` is capped by
+`capped_levels` so the coarse level keeps at least MIN_COARSE_SIDE pixels.
+
+    _, edges, edges_sum, _ = detect_edges(img, 'RGB', 'Sobel', pyramid_levels=2)
+
+`edges_detection.detect_edges_coarse_to_fine` also returns the ROI;
+`edges_benchmark --coarse-to-fine` reports speed-up, ROI share and the
+recall of the full run's edges on the sample images.
+"""
+import cv2
+import numpy as np
+
+from edges_tiling import tiles_touching
+
+DEFAULT_PYRAMID_LEVELS = 2
+
+# ROI: coarse edge sum >= this fraction of its maximum
+DEFAULT_ROI_THRESHOLD = 0.2
+
+# Side of the full-resolution tiles evaluated inside the ROI
+DEFAULT_ROI_TILE = 64
+
+# Shorter side (pixels) the coarse level keeps at least; deeper levels are capped
+MIN_COARSE_SIDE = 16
+
+
+def capped_levels(shape, levels):
+    """`levels` reduced until the coarse level of an image of `shape` keeps MIN_COARSE_SIDE pixels."""
+    if levels < 0:
+        raise ValueError(f"Pyramid levels must not be negative, got {levels}")
+    side = min(shape[:2])
+    while levels > 0 and side >> levels < MIN_COARSE_SIDE:
+        levels -= 1
+    return levels
+
+
+def pyramid_level(img, levels):
+    """`img` reduced `levels` times by cv2.pyrDown."""
+    for _ in range(levels):
+        img = cv2.pyrDown(img)
+    return img
+
+
+def roi_mask(coarse_sum, shape, levels, threshold=DEFAULT_ROI_THRESHOLD):
+    """Full-resolution (H, W) bool ROI from the edge sum of pyramid level `levels`.
+
+    The strong coarse pixels are scaled up and dilated by two coarse pixels,
+    covering the blur of pyrDown and the position lost by downsampling.
+    """
+    H, W = shape
+    peak = int(coarse_sum.max())
+    if peak == 0:
+        return np.zeros((H, W), dtype=bool)
+    strong = (coarse_sum >= max(1, threshold * peak)).view(np.uint8)
+    mask = cv2.resize(strong, (W, H), interpolation=cv2.INTER_NEAREST)
+
+    margin = 2 << levels
+    kernel = np.ones((2 * margin + 1, 2 * margin + 1), dtype=np.uint8)
+    return cv2.dilate(mask, kernel).astype(bool)
+
+
+def roi_strips(mask, tile_size=DEFAULT_ROI_TILE):
+    """Tiles touching `mask`, consecutive tiles of a tile row merged into one (y0, y1, x0, x1) strip."""
+    strips = []
+    for y0, y1, x0, x1 in tiles_touching(mask, tile_size):
+        if strips and strips[-1][0] == y0 and strips[-1][3] == x0:
+            strips[-1] = (y0, y1, strips[-1][2], x1)
+        else:
+            strips.append((y0, y1, x0, x1))
+    return strips
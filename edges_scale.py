@@ -0,0 +1,359 @@
+"""Scale-space operators: Gaussian derivatives, LoG and DoG at any sigma.
+
+The fixed-size kernels of `edges_methods` (5x5 LoG, Canny's 5x5 blur) only
+see fine structure. Here every operator takes `sigma` and works on a
+Gaussian-smoothed image, never on a dense (H, W, kh, kw) window view:
+
+- `gaussian_blur` is separable. Up to RECURSIVE_MIN_SIGMA it runs
+  cv2.GaussianBlur (cost grows linearly with sigma); above it a recursive
+  (IIR) Gaussian (Young & van Vliet), four scipy `lfilter` passes whose cost
+  does not depend on sigma. The recursive filter approximates the Gaussian
+  to about 1% and extends borders by replication; both passes start from
+  the exact state of the replicated border (Triggs & Sdika), so border
+  pixels are as close to gaussian_filter(mode='nearest') as interior ones.
+- Derivatives are central differences of the smoothed image.
+- `gaussian_gradient_response`: |grad L|, `log_response`: |sigma^2 lap L|,
+  `dog_response`: |L(k sigma) - L(sigma)| / (k - 1), which approximates the
+  scale-normalized LoG.
+
+`scale_space` builds the levels of several sigmas as a cascade, each level
+blurred from the previous one by the missing sqrt(s_i^2 - s_{i-1}^2), and
+`multiscale_response` selects the strongest scale-normalized response per
+pixel (Lindeberg: sigma^(1/2) |grad L| for edges, sigma^2 |lap L| for the
+Laplacian, adjacent-level differences for DoG), optionally with the
+selected sigma.
+
+The operators registered in `edges_detection.METHODS` use the default
+sigmas, which stay on the FIR path; tiled and incremental runs read the
+whole blur support (EDGE_STAGES halo = blur support + 1) and reproduce them
+exactly, since the FIR blur pads the planes itself instead of leaving the
+border to cv2.GaussianBlur. In float32 and integer precision they stay
+within 1 gray level of float64, the multi-scale LoG within 2.
+"""
+import math
+
+import cv2
+import numpy as np
+from scipy.signal import lfilter, lfilter_zi, lfiltic
+
+from edges_methods import (EDGE_STAGES, EdgeStages, _as_planes, _from_planes, _working_dtype,
+                           normalize_response)
+from edges_profile import profiled
+
+# Sigma from which the recursive Gaussian is faster than cv2.GaussianBlur
+RECURSIVE_MIN_SIGMA = 24.0
+
+# FIR Gaussians are truncated at this many sigmas
+GAUSSIAN_TRUNCATE = 4.0
+
+DEFAULT_SIGMA = 2.0
+DEFAULT_SIGMAS = (1.0, 2.0, 4.0, 8.0)
+
+# sigma ratio of the two Gaussians of a DoG
+DOG_RATIO = 1.6
+
+# Lindeberg's gamma of the scale-normalized operators used for scale selection
+EDGE_GAMMA = 0.5
+LOG_GAMMA = 2.0
+
+
+# ------------------------------------------------------------------------------
+#  Gaussian smoothing
+# ------------------------------------------------------------------------------
+def blur_radius(sigma):
+    """Radius of the truncated FIR Gaussian of `sigma`."""
+    return int(math.ceil(GAUSSIAN_TRUNCATE * sigma))
+
+
+def _fir_blur(planes, sigma):
+    radius = blur_radius(sigma)
+    size = 2 * radius + 1
+    out = np.empty_like(planes)
+    for n, plane in enumerate(planes):
+        # padded here rather than by cv2: its own border handling rounds the pixels
+        # near the image border differently depending on the row length, so a tile
+        # touching the border would not reproduce the whole-image values
+        padded = np.pad(plane, radius, mode='reflect')
+        out[n] = cv2.GaussianBlur(padded, (size, size), sigma)[radius:-radius, radius:-radius]
+    return out
+
+
+def _recursive_coefficients(sigma):
+    """(b, a) of the third-order recursive Gaussian of Young & van Vliet (1995)."""
+    if sigma >= 2.5:
+        q = 0.98711 * sigma - 0.96330
+    else:
+        q = 3.97156 - 4.14554 * math.sqrt(1 - 0.26891 * max(sigma, 0.5))
+    b0 = 1.57825 + 2.44413 * q + 1.4281 * q**2 + 0.422205 * q**3
+    b1 = 2.44413 * q + 2.85619 * q**2 + 1.26661 * q**3
+    b2 = -(1.4281 * q**2 + 1.26661 * q**3)
+    b3 = 0.422205 * q**3
+    gain = 1 - (b1 + b2 + b3) / b0
+    return np.array([gain]), np.array([1, -b1 / b0, -b2 / b0, -b3 / b0])
+
+
+def _triggs_sdika_matrix(a):
+    """Boundary matrix of Triggs & Sdika (2006) for the denominator `a` = [1, -a1, -a2, -a3].
+
+    Times the gain, it maps the last three causal outputs minus their steady
+    state to the first three anti-causal outputs of a signal whose last
+    sample repeats forever.
+    """
+    a1, a2, a3 = -np.asarray(a[1:], dtype=np.float64)
+    scale = 1 / ((1 + a1 - a2 + a3) * (1 - a1 - a2 - a3) * (1 + a2 + (a1 - a3) * a3))
+    return scale * np.array([
+        [1 - a2 - a1 * a3 - a3**2, (a1 + a3) * (a2 + a1 * a3), a3 * (a1 + a2 * a3)],
+        [a1 + a2 * a3, (1 - a2) * (a2 + a1 * a3), a3 * (1 - a2 - a1 * a3 - a3**2)],
+        [a1**2 + a2 - a2**2 + a1 * a3, a3 + a1 * a2 - a2 * a3 - a1 * a3**2 + a2**2 * a3 - a3**3,
+         a3 * (a1 + a2 * a3)],
+    ])
+
+
+def _recursive_pass(x, b, a, axis):
+    # causal then anti-causal filter along `axis`, both exact for border pixels repeated forever
+    x = np.moveaxis(x, axis, -1)
+    n = x.shape[-1]
+    if n < 3:
+        # the boundary matrix needs three samples; repeating the last one is what it models
+        padded = np.concatenate([x] + [x[..., -1:]] * (3 - n), axis=-1)
+        return np.moveaxis(_recursive_pass(padded, b, a, -1)[..., :n], -1, axis)
+
+    # causal: the state of a constant signal at the first pixel
+    zi = lfilter_zi(b, a).astype(x.dtype)
+    y, _ = lfilter(b, a, x, axis=-1, zi=zi * x[..., :1])
+
+    # anti-causal: its first three outputs v[n-1], v[n], v[n+1] from Triggs & Sdika
+    # (the causal pass keeps running past the end on the repeated last pixel)
+    last = x[..., -1:]
+    boundary = (b[0] * _triggs_sdika_matrix(a)).astype(x.dtype)
+    v = (y[..., :-4:-1] - last) @ boundary.T + last
+
+    # lfilter state equivalent to those past outputs (linear in them)
+    state = np.stack([lfiltic(b, a, unit) for unit in np.eye(3)], axis=1).astype(x.dtype)
+    out = np.empty_like(y)
+    out[..., -1] = v[..., 0]
+    backward, _ = lfilter(b, a, y[..., -2::-1], axis=-1, zi=v @ state.T)
+    out[..., :-1] = backward[..., ::-1]
+    return np.moveaxis(out, -1, axis)
+
+
+def _recursive_blur(planes, sigma):
+    # coefficients in the planes' dtype, so float32 planes are filtered in float32
+    b, a = (c.astype(planes.dtype) for c in _recursive_coefficients(sigma))
+    return _recursive_pass(_recursive_pass(planes, b, a, -1), b, a, -2)
+
+
+GAUSSIAN_BLURS = {
+    'fir': _fir_blur,
+    'recursive': _recursive_blur,
+}
+
+
+@profiled
+def gaussian_blur(planes, sigma, method='auto'):
+    """Gaussian smoothing of every plane of a (C, H, W) float array.
+
+    `method` is one of GAUSSIAN_BLURS or 'auto' (recursive from
+    RECURSIVE_MIN_SIGMA on). Returns a new array of the same dtype.
+    """
+    if method == 'auto':
+        method = 'recursive' if sigma >= RECURSIVE_MIN_SIGMA else 'fir'
+    return GAUSSIAN_BLURS[method](planes, sigma)
+
+
+def scale_space(planes, sigmas, method='auto'):
+    """Yields (sigma, smoothed planes) for ascending `sigmas`, each level blurred from the previous one."""
+    previous, level = 0.0, planes
+    for sigma in sorted(sigmas):
+        step = math.sqrt(sigma**2 - previous**2)
+        if step > 0:
+            level = gaussian_blur(level, step, method)
+        previous = sigma
+        yield sigma, level
+
+
+def _cascade_radius(sigmas):
+    # support of the cascaded FIR blurs of `scale_space`
+    radius, previous = 0, 0.0
+    for sigma in sorted(sigmas):
+        step = math.sqrt(sigma**2 - previous**2)
+        radius += blur_radius(step) if step > 0 else 0
+        previous = sigma
+    return radius
+
+
+# ------------------------------------------------------------------------------
+#  Derivatives of the smoothed planes
+# ------------------------------------------------------------------------------
+def _gradient_magnitude(level):
+    """|grad L| from central differences (reflected border), (C, H, W)."""
+    padded = np.pad(level, ((0, 0), (1, 1), (1, 1)), mode='reflect')
+    dx = padded[:, 1:-1, 2:] - padded[:, 1:-1, :-2]
+    dy = padded[:, 2:, 1:-1] - padded[:, :-2, 1:-1]
+    magnitude = np.hypot(dx, dy, out=dx)
+    magnitude *= 0.5
+    return magnitude
+
+
+def _laplacian(level):
+    """Lxx + Lyy from the 5-point stencil (reflected border), (C, H, W)."""
+    padded = np.pad(level, ((0, 0), (1, 1), (1, 1)), mode='reflect')
+    lap = padded[:, 1:-1, 2:] + padded[:, 1:-1, :-2]
+    lap += padded[:, 2:, 1:-1]
+    lap += padded[:, :-2, 1:-1]
+    lap -= 4 * level
+    return lap
+
+
+def _smoothed(channel, precision, sigma, method):
+    planes, _ = _as_planes(channel, _working_dtype(precision, channel))
+    return gaussian_blur(planes, sigma, method)
+
+
+# ------------------------------------------------------------------------------
+#  Response stages: channel / (H, W, C) stack -> (C, H, W) planes
+# ------------------------------------------------------------------------------
+@profiled
+def gaussian_gradient_response(channel, precision='float64', sigma=DEFAULT_SIGMA, method='auto'):
+    """Threshold-independent stage of `gaussian_gradient_edges`: |grad (G_sigma * I)|."""
+    return _gradient_magnitude(_smoothed(channel, precision, sigma, method))
+
+
+@profiled
+def log_response(channel, precision='float64', sigma=DEFAULT_SIGMA, method='auto'):
+    """Threshold-independent stage of `log_edges`: |sigma^2 lap (G_sigma * I)|."""
+    response = _laplacian(_smoothed(channel, precision, sigma, method))
+    response *= sigma**2
+    return np.abs(response, out=response)
+
+
+@profiled
+def dog_response(channel, precision='float64', sigma=DEFAULT_SIGMA, ratio=DOG_RATIO, method='auto'):
+    """Threshold-independent stage of `dog_edges`: |G_(ratio sigma) * I - G_sigma * I| / (ratio - 1)."""
+    planes, _ = _as_planes(channel, _working_dtype(precision, channel))
+    (_, fine), (_, coarse) = scale_space(planes, (sigma, ratio * sigma), method)
+    response = np.subtract(coarse, fine)
+    response *= 1 / (ratio - 1)
+    return np.abs(response, out=response)
+
+
+@profiled
+def multiscale_response(channel, precision='float64', sigmas=DEFAULT_SIGMAS, operator='gradient',
+                        method='auto', return_scale=False):
+    """Strongest scale-normalized response over `sigmas`, per pixel.
+
+    `operator` is 'gradient' (sigma^EDGE_GAMMA |grad L|), 'log'
+    (sigma^LOG_GAMMA |lap L|) or 'dog' (differences of adjacent levels,
+    attributed to the finer sigma). The levels are built once by
+    `scale_space`. With `return_scale=True` the sigma selected for every
+    pixel is returned as well, as a (C, H, W) float32 array.
+    """
+    if operator not in ('gradient', 'log', 'dog'):
+        raise ValueError(f"Unknown scale-space operator: {operator}")
+    planes, _ = _as_planes(channel, _working_dtype(precision, channel))
+
+    best = scale = previous = None
+    for sigma, level in scale_space(planes, sigmas, method):
+        if operator == 'gradient':
+            response = _gradient_magnitude(level)
+            response *= sigma**EDGE_GAMMA
+            level_sigma = sigma
+        elif operator == 'log':
+            response = _laplacian(level)
+            response *= sigma**LOG_GAMMA
+            np.abs(response, out=response)
+            level_sigma = sigma
+        else:
+            if previous is None:
+                previous = (sigma, level)
+                continue
+            fine_sigma, fine = previous
+            response = np.subtract(level, fine)
+            response *= 1 / (sigma / fine_sigma - 1)
+            np.abs(response, out=response)
+            previous = (sigma, level)
+            level_sigma = fine_sigma
+
+        if best is None:
+            best = response
+            scale = np.full(response.shape, level_sigma, dtype=np.float32)
+        else:
+            stronger = response > best
+            np.copyto(best, response, where=stronger)
+            scale[stronger] = level_sigma
+
+    if best is None:
+        raise ValueError("The DoG needs at least two sigmas")
+    return (best, scale) if return_scale else best
+
+
+def multiscale_gradient_response(channel, precision='float64', sigmas=DEFAULT_SIGMAS, method='auto'):
+    """Threshold-independent stage of `multiscale_gradient_edges`."""
+    return multiscale_response(channel, precision, sigmas, 'gradient', method)
+
+
+def multiscale_log_response(channel, precision='float64', sigmas=DEFAULT_SIGMAS, method='auto'):
+    """Threshold-independent stage of `multiscale_log_edges`."""
+    return multiscale_response(channel, precision, sigmas, 'log', method)
+
+
+# ------------------------------------------------------------------------------
+#  Operators
+# ------------------------------------------------------------------------------
+@profiled
+def gaussian_gradient_edges(channel, low_t=0, high_t=255, precision='float64', sigma=DEFAULT_SIGMA,
+                            method='auto'):
+    """Edges as the gradient magnitude of the image smoothed at `sigma`."""
+    response = gaussian_gradient_response(channel, precision, sigma, method)
+    edges = normalize_response(response, low_t, high_t, overwrite=True)
+    return _from_planes(edges, np.ndim(channel) == 3)
+
+
+@profiled
+def log_edges(channel, low_t=0, high_t=255, precision='float64', sigma=DEFAULT_SIGMA, method='auto'):
+    """Edges as the magnitude of the Laplacian of Gaussian at `sigma`."""
+    response = log_response(channel, precision, sigma, method)
+    edges = normalize_response(response, low_t, high_t, overwrite=True)
+    return _from_planes(edges, np.ndim(channel) == 3)
+
+
+@profiled
+def dog_edges(channel, low_t=0, high_t=255, precision='float64', sigma=DEFAULT_SIGMA, ratio=DOG_RATIO,
+              method='auto'):
+    """Edges as the magnitude of the difference of Gaussians at `sigma` and `ratio * sigma`."""
+    response = dog_response(channel, precision, sigma, ratio, method)
+    edges = normalize_response(response, low_t, high_t, overwrite=True)
+    return _from_planes(edges, np.ndim(channel) == 3)
+
+
+@profiled
+def multiscale_gradient_edges(channel, low_t=0, high_t=255, precision='float64', sigmas=DEFAULT_SIGMAS,
+                              method='auto'):
+    """Edges as the strongest scale-normalized gradient over `sigmas`."""
+    response = multiscale_response(channel, precision, sigmas, 'gradient', method)
+    edges = normalize_response(response, low_t, high_t, overwrite=True)
+    return _from_planes(edges, np.ndim(channel) == 3)
+
+
+@profiled
+def multiscale_log_edges(channel, low_t=0, high_t=255, precision='float64', sigmas=DEFAULT_SIGMAS,
+                         method='auto'):
+    """Edges as the strongest scale-normalized Laplacian of Gaussian over `sigmas`."""
+    response = multiscale_log_response(channel, precision, sigmas, method)
+    edges = normalize_response(response, low_t, high_t, overwrite=True)
+    return _from_planes(edges, np.ndim(channel) == 3)
+
+
+# halos: blur support plus one pixel for the central differences
+EDGE_STAGES.update({
+    gaussian_gradient_edges: EdgeStages(gaussian_gradient_response, normalize_response, 'minmax',
+                                        blur_radius(DEFAULT_SIGMA) + 1, 6),
+    log_edges: EdgeStages(log_response, normalize_response, 'minmax',
+                          blur_radius(DEFAULT_SIGMA) + 1, 6),
+    dog_edges: EdgeStages(dog_response, normalize_response, 'minmax',
+                          _cascade_radius((DEFAULT_SIGMA, DOG_RATIO * DEFAULT_SIGMA)), 6),
+    multiscale_gradient_edges: EdgeStages(multiscale_gradient_response, normalize_response, 'minmax',
+                                          _cascade_radius(DEFAULT_SIGMAS) + 1, 11),
+    multiscale_log_edges: EdgeStages(multiscale_log_response, normalize_response, 'minmax',
+                                     _cascade_radius(DEFAULT_SIGMAS) + 1, 11),
+})
@@ -0,0 +1,377 @@
+"""Streaming edge detection over video files, camera feeds and frame sequences.
+
+A source is any iterable of BGR frames: `video_source` (file or camera via
+cv2.VideoCapture), `sequence_source` (image files) or `synthetic_source`
+(generated frames, for testing without a camera). `EdgeStream` runs three
+stages in their own threads, connected by bounded queues:
+
+    decode (source) -> [queue] -> detect (detect_edges) -> [queue] -> encode (sink) -> [queue] -> consumer
+
+A full queue blocks the stage before it (back-pressure), so a slow consumer
+slows decoding down instead of buffering frames without bound. With
+`drop=True` (live sources) the decoder instead discards the oldest waiting
+frame, keeping latency bounded under overload; dropped frames are counted.
+With `incremental=True` only the regions that changed since the previous
+frame are recomputed (see `edges_incremental`), with identical results.
+
+    stream = EdgeStream(video_source(0), 'LAB', 'Sobel', sink=VideoSink('edges.mp4', 30), drop=True)
+    for result in stream:
+        ...
+    print(stream.stats.summary())
+"""
+import argparse
+import glob
+import os
+import queue
+import sys
+import threading
+import time
+from collections import namedtuple
+
+import cv2
+import numpy as np
+
+from edges_detection import COLOR_SPACE_CHANNELS, METHODS, detect_edges
+from edges_incremental import IncrementalEdges
+from edges_io import open_image
+
+# A decoded frame and the moment it entered the pipeline (time.perf_counter)
+Frame = namedtuple('Frame', 'index timestamp image')
+
+# A processed frame; latency is measured from decoding until the sink is done
+StreamResult = namedtuple('StreamResult', 'index timestamp edges edges_sum latency')
+
+DEFAULT_QUEUE_SIZE = 4
+
+_END = object()
+
+
+# ------------------------------------------------------------------------------
+#  Sources
+# ------------------------------------------------------------------------------
+def video_source(path_or_index):
+    """Frames of a video file, or of a camera when given a device index."""
+    capture = cv2.VideoCapture(path_or_index)
+    if not capture.isOpened():
+        raise ValueError(f"Cannot open video source: {path_or_index}")
+    try:
+        while True:
+            ok, frame = capture.read()
+            if not ok:
+                return
+            yield frame
+    finally:
+        capture.release()
+
+
+def sequence_source(pattern):
+    """Frames read one by one from a directory or glob of images, in name order."""
+    if os.path.isdir(pattern):
+        paths = sorted(os.path.join(pattern, name) for name in os.listdir(pattern))
+    else:
+        paths = sorted(glob.glob(pattern))
+    for path in paths:
+        yield open_image(path)
+
+
+def synthetic_source(count=100, shape=(480, 640), fps=None, seed=0):
+    """`count` generated BGR frames: a textured background with a moving disc and bar.
+
+    With `fps` the frames are produced at that rate, like a camera would.
+    """
+    rng = np.random.default_rng(seed)
+    h, w = shape
+    background = cv2.GaussianBlur(rng.integers(0, 256, (h, w, 3), dtype=np.uint8), (0, 0), 3)
+    start = time.perf_counter()
+
+    for i in range(count):
+        frame = background.copy()
+        x = int((w - 1) * (0.5 + 0.4 * np.sin(i / 15)))
+        y = int((h - 1) * (0.5 + 0.4 * np.cos(i / 20)))
+        cv2.circle(frame, (x, y), max(4, min(h, w) // 10), (40, 200, 250), -1)
+        cv2.rectangle(frame, (0, i * 3 % h), (w - 1, i * 3 % h + 8), (255, 255, 255), -1)
+
+        if fps:
+            delay = start + i / fps - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+        yield frame
+
+
+# ------------------------------------------------------------------------------
+#  Sinks
+# ------------------------------------------------------------------------------
+class VideoSink:
+    """Encodes the edge sums into a video file (cv2.VideoWriter, grayscale)."""
+
+    def __init__(self, path, fps=30, fourcc='mp4v'):
+        self.path = path
+        self.fps = fps
+        self.fourcc = cv2.VideoWriter_fourcc(*fourcc)
+        self._writer = None
+
+    def __call__(self, result):
+        frame = result.edges_sum
+        if self._writer is None:
+            h, w = frame.shape
+            self._writer = cv2.VideoWriter(self.path, self.fourcc, self.fps, (w, h), isColor=False)
+            if not self._writer.isOpened():
+                raise IOError(f"Cannot open video writer: {self.path}")
+        self._writer.write(np.ascontiguousarray(frame))
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.release()
+            self._writer = None
+
+
+class SequenceSink:
+    """Writes the edge sums as numbered PNG files into a directory."""
+
+    def __init__(self, directory, prefix='edges'):
+        self.directory = directory
+        self.prefix = prefix
+        os.makedirs(directory, exist_ok=True)
+
+    def __call__(self, result):
+        path = os.path.join(self.directory, f"{self.prefix}_{result.index:06d}.png")
+        ok, data = cv2.imencode('.png', np.ascontiguousarray(result.edges_sum))
+        if not ok:
+            raise IOError(f"Cannot encode {path}")
+        data.tofile(path)
+
+    def close(self):
+        pass
+
+
+# ------------------------------------------------------------------------------
+#  Pipeline
+# ------------------------------------------------------------------------------
+class StreamStats:
+    """Frame counts, per-frame latencies and throughput of a stream."""
+
+    def __init__(self):
+        self.decoded = 0
+        self.dropped = 0
+        self.latencies = []
+        self.started = None
+        self.finished = None
+
+    @property
+    def frames(self):
+        return len(self.latencies)
+
+    def summary(self):
+        elapsed = ((self.finished or time.perf_counter()) - self.started) if self.started else 0.0
+        latencies = np.array(self.latencies) if self.latencies else np.zeros(1)
+        return dict(
+            frames=self.frames,
+            decoded=self.decoded,
+            dropped=self.dropped,
+            seconds=elapsed,
+            fps=self.frames / elapsed if elapsed > 0 else 0.0,
+            latency_mean=float(latencies.mean()),
+            latency_p50=float(np.percentile(latencies, 50)),
+            latency_p95=float(np.percentile(latencies, 95)),
+            latency_max=float(latencies.max()),
+        )
+
+
+class EdgeStream:
+    """Iterable pipeline running `detect_edges` over the frames of `source`.
+
+    Yields a StreamResult per processed frame, in order. `sink(result)` (e.g.
+    VideoSink) runs in the encode stage; its `close()` is called at the end.
+    Stage errors are re-raised in the consumer; leaving the loop early stops
+    all stages.
+    """
+
+    def __init__(self, source, color_space='RGB', method='Sobel', low_threshold=0,
+                 high_threshold=255, precision='float64', sink=None,
+                 queue_size=DEFAULT_QUEUE_SIZE, drop=False, incremental=False):
+        if method not in METHODS:
+            raise ValueError("UNKNOWN_METHOD")
+        if color_space not in COLOR_SPACE_CHANNELS:
+            raise ValueError("UNKNOWN_COLOR_SPACE")
+
+        self.source = source
+        self.options = dict(low_threshold=low_threshold, high_threshold=high_threshold,
+                            precision=precision)
+        self.color_space = color_space
+        self.method = method
+        self.sink = sink
+        self.queue_size = queue_size
+        self.drop = drop
+        self.stats = StreamStats()
+        self.incremental = IncrementalEdges(color_space, method, low_threshold, high_threshold,
+                                            precision) if incremental else None
+
+        self._stop = threading.Event()
+        self._error = None
+
+    # --- helpers -------------------------------------------------------------
+    def _put(self, q, item):
+        # blocking put that gives up when the stream is stopped
+        while not self._stop.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def _get(self, q):
+        while not self._stop.is_set():
+            try:
+                return q.get(timeout=0.1)
+            except queue.Empty:
+                pass
+        return _END
+
+    def _stage(self, work):
+        # runs a stage, turning its exception into a stream error
+        def run():
+            try:
+                work()
+            except BaseException as e:
+                self._error = e
+                self._stop.set()
+        thread = threading.Thread(target=run, daemon=True)
+        thread.start()
+        return thread
+
+    # --- stages ----------------------------------------------------------------
+    def _decode(self, out):
+        try:
+            for index, image in enumerate(self.source):
+                if self._stop.is_set():
+                    return
+                frame = Frame(index, time.perf_counter(), image)
+                self.stats.decoded += 1
+
+                if self.drop:
+                    # overload: the oldest waiting frame makes room for the newest one
+                    while True:
+                        try:
+                            out.put_nowait(frame)
+                            break
+                        except queue.Full:
+                            try:
+                                out.get_nowait()
+                                self.stats.dropped += 1
+                            except queue.Empty:
+                                pass
+                elif not self._put(out, frame):
+                    return
+        finally:
+            self._put(out, _END)
+
+    def _detect(self, inp, out):
+        while True:
+            frame = self._get(inp)
+            if frame is _END:
+                self._put(out, _END)
+                return
+            if self.incremental is not None:
+                # the persistent output is patched by the next frame - hand out a copy
+                self.incremental.update(frame.image)
+                planes = self.incremental.out.copy()
+                edges, edges_sum = list(planes[:-1]), planes[-1]
+            else:
+                # video frames are never repeated - the caches would only be polluted
+                _, edges, edges_sum, _ = detect_edges(frame.image, self.color_space, self.method,
+                                                      cache=False, **self.options)
+            if not self._put(out, StreamResult(frame.index, frame.timestamp, edges, edges_sum, None)):
+                return
+
+    def _encode(self, inp, out):
+        try:
+            while True:
+                result = self._get(inp)
+                if result is _END:
+                    self._put(out, _END)
+                    return
+                if self.sink is not None:
+                    self.sink(result)
+                result = result._replace(latency=time.perf_counter() - result.timestamp)
+                if not self._put(out, result):
+                    return
+        finally:
+            if self.sink is not None:
+                self.sink.close()
+
+    # --- consumer --------------------------------------------------------------
+    def __iter__(self):
+        decoded, detected, encoded = (queue.Queue(self.queue_size) for _ in range(3))
+        self.stats.started = time.perf_counter()
+        threads = [
+            self._stage(lambda: self._decode(decoded)),
+            self._stage(lambda: self._detect(decoded, detected)),
+            self._stage(lambda: self._encode(detected, encoded)),
+        ]
+        try:
+            while True:
+                result = self._get(encoded)
+                if result is _END:
+                    break
+                self.stats.latencies.append(result.latency)
+                yield result
+        finally:
+            self._stop.set()
+            for thread in threads:
+                thread.join()
+            self.stats.finished = time.perf_counter()
+
+        if self._error is not None:
+            raise self._error
+
+    def close(self):
+        """Stops all stages (also done when the consuming loop ends)."""
+        self._stop.set()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Streaming edge detection over video.")
+    parser.add_argument('source', help="video file, camera index, image directory/glob or 'synthetic'")
+    parser.add_argument('-o', '--output', default=None, help="output video file or directory for PNG frames")
+    parser.add_argument('-c', '--color-space', default='RGB', choices=list(COLOR_SPACE_CHANNELS))
+    parser.add_argument('-m', '--method', default='Sobel', choices=list(METHODS))
+    parser.add_argument('--low', type=int, default=0)
+    parser.add_argument('--high', type=int, default=255)
+    parser.add_argument('--fps', type=float, default=30, help="output fps (and synthetic source rate)")
+    parser.add_argument('--frames', type=int, default=300, help="synthetic source length")
+    parser.add_argument('--queue-size', type=int, default=DEFAULT_QUEUE_SIZE)
+    parser.add_argument('--drop', action='store_true', help="drop frames under overload (live sources)")
+    parser.add_argument('--incremental', action='store_true', help="recompute only changed regions")
+    args = parser.parse_args(argv)
+
+    if args.source == 'synthetic':
+        source = synthetic_source(args.frames, fps=args.fps)
+    elif args.source.isdigit():
+        source = video_source(int(args.source))
+    elif os.path.isdir(args.source) or glob.has_magic(args.source):
+        source = sequence_source(args.source)
+    else:
+        source = video_source(args.source)
+
+    sink = None
+    if args.output:
+        sink = VideoSink(args.output, args.fps) if os.path.splitext(args.output)[1] else SequenceSink(args.output)
+
+    stream = EdgeStream(source, args.color_space, args.method, args.low, args.high,
+                        sink=sink, queue_size=args.queue_size, drop=args.drop,
+                        incremental=args.incremental)
+    try:
+        for result in stream:
+            print(f"frame {result.index}: {result.latency * 1000:.1f} ms")
+    except KeyboardInterrupt:
+        stream.close()
+
+    stats = stream.stats.summary()
+    print(f"{stats['frames']} frames ({stats['dropped']} dropped), {stats['fps']:.1f} fps, "
+          f"latency mean {stats['latency_mean'] * 1000:.1f} ms, p95 {stats['latency_p95'] * 1000:.1f} ms")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,153 @@
+"""Tiled, bounded-memory execution of the edge operators.
+
+The image is cut into tiles that are processed independently. Every tile is
+read with a halo of `EdgeStages.halo` pixels (clipped at the image border, where
+the operators' own reflect padding takes over), so the cropped tile result is
+identical to the same region of a whole-image run:
+
+- 'local' operators (Laplacians, Canny CV2) are finished tile by tile.
+- 'minmax' operators (gradients, Canny) need the global per-channel range for
+  their normalization: a first pass collects it, a second pass recomputes the
+  tiles and normalizes them against it.
+- 'linked' operators (Canny with hysteresis) write weak/strong classes per
+  tile and link them over the whole channel at the end. The linking works
+  on one whole channel at a time (int32 labels and a few masks), which an
+  explicit `max_memory` budgets for before planning the tiles.
+
+cv2.Canny ('Canny CV2') links edges inside the library, so tiles only get
+`halo` pixels of context; edge chains crossing tile borders may be linked
+slightly differently than in a whole-image run.
+"""
+import numpy as np
+
+from edges_methods import EDGE_STAGES, hysteresis_threshold, normalize_response
+
+# Default peak working-set budget for tiled runs (bytes)
+DEFAULT_MAX_MEMORY = 256 * 2**20
+
+# Tiles smaller than this (without halo) are not worth the per-tile overhead
+MIN_TILE_SIZE = 32
+
+# Bytes per pixel of the whole-channel linking of 'linked' operators (classes,
+# int32 labels, masks), taken from `max_memory` before the tiles are planned
+LINK_BYTES_PER_PIXEL = 10
+
+
+def tile_grid(height, width, tile_h, tile_w=None):
+    """Yields (y0, y1, x0, x1) of the tiles covering a (height, width) image, row by row."""
+    tile_w = tile_h if tile_w is None else tile_w
+    for y0 in range(0, height, tile_h):
+        for x0 in range(0, width, tile_w):
+            yield y0, min(y0 + tile_h, height), x0, min(x0 + tile_w, width)
+
+
+def tiles_touching(mask, tile_h, tile_w=None):
+    """The `tile_grid` tiles containing at least one nonzero pixel of a 2D `mask`, row by row."""
+    tile_w = tile_h if tile_w is None else tile_w
+    H, W = mask.shape
+    starts_y = np.arange(0, H, tile_h)
+    starts_x = np.arange(0, W, tile_w)
+
+    # any() per tile: max over row bands, then over column bands
+    mask = np.asarray(mask, dtype=bool).view(np.uint8)
+    per_tile = np.maximum.reduceat(np.maximum.reduceat(mask, starts_y, axis=0), starts_x, axis=1)
+    rows, cols = np.nonzero(per_tile)
+    return [(int(y0), min(int(y0) + tile_h, H), int(x0), min(int(x0) + tile_w, W))
+            for y0, x0 in zip(starts_y[rows], starts_x[cols])]
+
+
+def plan_tile_size(edge_func, channels, precision='float64', max_memory=DEFAULT_MAX_MEMORY):
+    """Largest square tile whose estimated working set (halo included) fits into `max_memory` bytes."""
+    stages = EDGE_STAGES[edge_func]
+    itemsize = 8 if precision == 'float64' else 4
+    per_pixel = channels * itemsize * stages.work
+
+    side = int(np.sqrt(max_memory / per_pixel)) - 2 * stages.halo
+    if side < MIN_TILE_SIZE:
+        raise ValueError(f"max_memory of {max_memory} bytes is too small for tiled processing")
+    return side
+
+
+def run_tiled(read_stack, shape, channels, edge_func, low_t=0, high_t=255, precision='float64',
+              tile_size=None, max_memory=None, out=None):
+    """Runs `edge_func` over an image tile by tile.
+
+    `read_stack(y0, y1, x0, x1)` must return the (h, w, C) channel stack of that
+    region of the image; it is the only way the image is accessed. `tile_size`
+    is the tile side in pixels; it is capped so that the estimated working set
+    stays within `max_memory` bytes (DEFAULT_MAX_MEMORY if neither is given).
+    For 'linked' operators an explicit `max_memory` also covers the linking of
+    one whole channel (LINK_BYTES_PER_PIXEL). The output is not counted.
+
+    The (C, H, W) uint8 edge planes are written into `out` (allocated when None).
+    Returns (out, tile_size).
+    """
+    H, W = shape
+    stages = EDGE_STAGES[edge_func]
+    halo = stages.halo
+
+    if tile_size is None or max_memory is not None:
+        budget = max_memory or DEFAULT_MAX_MEMORY
+        if max_memory is not None and stages.scope == 'linked':
+            budget -= LINK_BYTES_PER_PIXEL * H * W
+            if budget <= 0:
+                raise ValueError(f"max_memory of {max_memory} bytes is too small to link a {H}x{W} channel")
+        planned = plan_tile_size(edge_func, channels, precision, budget)
+        tile_size = planned if tile_size is None else min(tile_size, planned)
+    tile_size = max(int(tile_size), 1)
+
+    if out is None:
+        out = np.empty((channels, H, W), dtype=np.uint8)
+
+    def read_with_halo(y0, y1, x0, x1):
+        # region grown by the halo, clipped to the image: at the real border the
+        # operators pad exactly as they do for the whole image
+        ys, ye = max(0, y0 - halo), min(H, y1 + halo)
+        xs, xe = max(0, x0 - halo), min(W, x1 + halo)
+        crop = (slice(y0 - ys, y1 - ys), slice(x0 - xs, x1 - xs))
+        return read_stack(ys, ye, xs, xe), crop
+
+    def response(y0, y1, x0, x1):
+        stack, (rows, cols) = read_with_halo(y0, y1, x0, x1)
+        return stages.response(stack, precision)[:, rows, cols]
+
+    tiles = list(tile_grid(H, W, tile_size))
+
+    if stages.response is None:
+        # operator without a separate response stage: run it whole on every tile
+        for y0, y1, x0, x1 in tiles:
+            stack, (rows, cols) = read_with_halo(y0, y1, x0, x1)
+            edges = edge_func(stack, low_t, high_t, precision=precision)
+            out[:, y0:y1, x0:x1] = np.moveaxis(edges[rows, cols], -1, 0)
+
+    elif stages.scope == 'local':
+        for y0, y1, x0, x1 in tiles:
+            out[:, y0:y1, x0:x1] = stages.finish(response(y0, y1, x0, x1), low_t, high_t, overwrite=True)
+
+    elif stages.scope == 'minmax':
+        # pass 1: global range of the clipped response per channel
+        lo = np.full(channels, np.inf)
+        hi = np.full(channels, -np.inf)
+        for y0, y1, x0, x1 in tiles:
+            r = response(y0, y1, x0, x1)
+            lo = np.minimum(lo, r.min(axis=(1, 2)))
+            hi = np.maximum(hi, r.max(axis=(1, 2)))
+        value_range = list(zip(np.clip(lo, low_t, high_t), np.clip(hi, low_t, high_t)))
+
+        # pass 2: recompute and normalize every tile against the global range
+        for y0, y1, x0, x1 in tiles:
+            out[:, y0:y1, x0:x1] = normalize_response(response(y0, y1, x0, x1), low_t, high_t,
+                                                      value_range=value_range, overwrite=True)
+
+    elif stages.scope == 'linked':
+        # weak (1) / strong (2) classes per tile, linked over the whole channel
+        for y0, y1, x0, x1 in tiles:
+            r = response(y0, y1, x0, x1)
+            out[:, y0:y1, x0:x1] = (r > low_t) * (1 + (r > high_t))
+        for c in range(channels):
+            out[c] = hysteresis_threshold(out[c], 0, 1)
+
+    else:
+        raise ValueError(f"Unknown stage scope: {stages.scope}")
+
+    return out, tile_size
@@ -1,11 +1,18 @@
 import os
+import threading
+import weakref
+from collections import OrderedDict
 import cv2
 import numpy as np
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
 from PIL import Image, ImageTk
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeout
 
-from edges_detection import detect_edges
+from edges_detection import COLOR_SPACE_CHANNELS, detect_edges
+from edges_profile import breakdown
+from edges_io import open_image
+from edges_parallel import SharedImagePool
 
 # Aktualny język ('pl' lub 'en')
 current_language = 'pl'
@@ -27,6 +34,13 @@ TRANSLATIONS = {
         'STATUS_NO_IMAGE': "Brak obrazu",
         'STATUS_READY': "Gotowe",
         'STATUS_ERROR': "Błąd",
+        'STATUS_RUNNING': "Przetwarzanie...",
+        'STATUS_CANCELLED': "Anulowano",
+        'STATUS_PREVIEW': "Podgląd...",
+        'PREVIEW': "Szybki podgląd",
+        'PROFILE': "Profilowanie",
+        'STATUS_READY_PROFILE': "Gotowe ({})",
+        'CANCEL': "Anuluj",
         'STATUS_LOADED': "Wczytano: {}",
         'BINARYZATION': "Binaryzacja",
         'ORIGINAL': "Oryginał",
@@ -66,6 +80,13 @@ TRANSLATIONS = {
         'STATUS_NO_IMAGE': "No image",
         'STATUS_READY': "Ready",
         'STATUS_ERROR': "Error",
+        'STATUS_RUNNING': "Processing...",
+        'STATUS_CANCELLED': "Cancelled",
+        'STATUS_PREVIEW': "Preview...",
+        'PREVIEW': "Quick preview",
+        'PROFILE': "Profiling",
+        'STATUS_READY_PROFILE': "Ready ({})",
+        'CANCEL': "Cancel",
         'STATUS_LOADED': "Loaded: {}",
         'BINARYZATION': "Binarization",
         'ORIGINAL': "Original",
@@ -99,16 +120,12 @@ def get_text(key):
 # Koniec sekcji Języki
 # ==============================================================================
 
-root = tk.Tk()
-root.title(get_text('APP_TITLE')) # Zmiana
-root.geometry("1600x900")
-
-root.state("zoomed")
-
 comparison_frames = []
 shared_image_cv2 = None
 shared_image_pil = None
 shared_image_path = None
+shared_image_handle = None
+shared_preview_cv2 = None
 
 # ===== FOLDERY DOMYŚLNE =====
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -118,6 +135,23 @@ OUTPUT_DIR = os.path.join(BASE_DIR, "Zapisane obrazy wynikowe")
 os.makedirs(SAMPLES_DIR, exist_ok=True)
 os.makedirs(OUTPUT_DIR, exist_ok=True)
 
+# ===== Obliczenia w tle =====
+# wykrywanie krawędzi działa w puli procesów (obraz w pamięci współdzielonej),
+# wątki czekają na wyniki i przygotowują podgląd, a wyniki wracają do Tk
+# przez odpytywanie z after()
+worker_pool = ThreadPoolExecutor(max_workers=os.cpu_count())
+process_pool = None
+POLL_INTERVAL_MS = 50
+CANCEL_CHECK_S = 0.1
+
+
+def get_process_pool():
+    """Pula procesów tworzona przy pierwszym użyciu (nie w procesach roboczych)."""
+    global process_pool
+    if process_pool is None:
+        process_pool = SharedImagePool()
+    return process_pool
+
 
 # ===== Pomocnicze funkcje =====
 def resize_for_canvas(pil_image, frame_size=200):
@@ -127,6 +161,141 @@ def resize_for_canvas(pil_image, frame_size=200):
     return pil_image.resize((new_w, new_h), Image.LANCZOS)
 
 
+def edge_to_pil(e, binary, out=None):
+    """Negatyw (i opcjonalnie binaryzacja) mapy krawędzi zapisany w `out`, jednym przebiegiem.
+
+    Obraz PIL współdzieli pamięć z `out` (bez kopii), więc bufor nie może być
+    nadpisany, dopóki obraz jest używany.
+    """
+    if out is None:
+        out = np.empty(e.shape, dtype=np.uint8)
+
+    if e.max() <= 1:
+        # mapy 0/1 rozciągamy do 0/255
+        np.multiply(e, 255, out=out, casting='unsafe')
+        np.subtract(255, out, out=out)
+    else:
+        np.subtract(255, e, out=out, casting='unsafe')
+
+    if binary:
+        cv2.threshold(out, 254, 255, cv2.THRESH_BINARY, dst=out)
+
+    return Image.fromarray(out)
+
+
+# ===== Pamięć podręczna powiększeń =====
+# przeskalowane powiększenia (LANCZOS) są liczone przy pierwszym kliknięciu
+# i trzymane w LRU, więc kolejne kliknięcie w tę samą kanwę jest natychmiastowe
+ZOOM_CACHE_SIZE = 32
+
+
+class ZoomCache:
+    """LRU przeskalowanych obrazów, kluczem jest obraz źródłowy (słaba referencja) i rozmiar."""
+
+    def __init__(self, max_entries=ZOOM_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+
+    def get(self, pil_image, size):
+        key = (id(pil_image), size)
+        entry = self._entries.get(key)
+        # id może zostać użyte ponownie przez nowy obraz - sprawdzamy referencję
+        if entry is not None and entry[0]() is pil_image:
+            self._entries.move_to_end(key)
+            return entry[1]
+
+        zoomed = pil_image.resize(size, Image.LANCZOS)
+        self._entries[key] = (weakref.ref(pil_image), zoomed)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return zoomed
+
+    def discard(self, pil_image):
+        """Usuwa powiększenia obrazu, który nie jest już wyświetlany."""
+        for key in [k for k in self._entries if k[0] == id(pil_image)]:
+            del self._entries[key]
+
+
+zoom_cache = ZoomCache()
+
+
+def preview_level(img, frame_size=200):
+    """Najmniejszy poziom piramidy (cv2.pyrDown), którego dłuższy bok nadal wypełnia kanwę."""
+    level = img
+    while max(level.shape[:2]) // 2 >= frame_size:
+        level = cv2.pyrDown(level)
+    return level
+
+
+class CancelledRun(Exception):
+    pass
+
+
+def compute_edges(params, cancel_event):
+    """Wykrywanie krawędzi w procesie roboczym; zwraca gotowe obrazy PIL (bez Tk)."""
+    if cancel_event.is_set():
+        raise CancelledRun()
+
+    future = get_process_pool().submit(
+        params['image'],
+        params['color_space'],
+        params['method'],
+        low_threshold=params['low_t'],
+        high_threshold=params['high_t'],
+        profile=params['profile']
+    )
+
+    # czekamy na proces, sprawdzając co chwilę, czy uruchomienie nie zostało anulowane
+    while True:
+        try:
+            result = future.result(timeout=CANCEL_CHECK_S)
+            break
+        except FuturesTimeout:
+            if cancel_event.is_set():
+                future.cancel()
+                raise CancelledRun()
+
+    if cancel_event.is_set():
+        raise CancelledRun()
+
+    edges, edges_sum, title_keys = result[:3]
+    # czasy etapów z procesu roboczego, np. "120 ms: convolve2d_bank 80 ms, ..."
+    profile = breakdown(result[3]) if params['profile'] else None
+
+    # tytuły kanałów tłumaczymy tutaj - procesy robocze zwracają klucze
+    titles = [get_text(key) for key in title_keys]
+
+    # negatywy trafiają prosto do bufora tego uruchomienia (przydzielonego w wątku Tk);
+    # oryginał jest już wyświetlony
+    pils = []
+    for e, out in zip(list(edges) + [edges_sum], params['buffer']):
+        # zastąpione uruchomienie przestaje pisać; bufor i tak należy tylko do niego
+        if cancel_event.is_set():
+            raise CancelledRun()
+        pils.append(edge_to_pil(e, params['binary'], out))
+    return None, titles, pils[:-1], pils[-1], profile
+
+
+def compute_preview(params, cancel_event):
+    """Krawędzie na małym poziomie piramidy - liczone w wątku, gotowe po ułamku sekundy."""
+    if cancel_event.is_set():
+        raise CancelledRun()
+
+    _, edges, edges_sum, titles = detect_edges(
+        params['preview'],
+        params['color_space'],
+        params['method'],
+        translations_getter=get_text,
+        low_threshold=params['low_t'],
+        high_threshold=params['high_t']
+    )
+
+    edge_pils = [edge_to_pil(e, params['binary']) for e in edges]
+    sum_pil = edge_to_pil(edges_sum, params['binary'])
+    # oryginał w kanwie zostaje bez zmian
+    return None, titles, edge_pils, sum_pil, None
+
+
 # ===== Klasa jednego modułu porównania =====
 class ComparisonFrame:
     def __init__(self, parent):
@@ -134,6 +303,10 @@ class ComparisonFrame:
         self.tk_images = []
         self.pil_images = []
 
+        # dwa bufory negatywów (C + 1, H, W): jeden wyświetlany, do drugiego pisze nowe uruchomienie
+        self.buffers = [None, None]
+        self.front_buffer = 0
+
         # --- główny frame ---
         self.frame = tk.Frame(parent, pady=10, padx=10, bd=2, relief="groove")
         self.frame.pack(side="top", fill="x", padx=10, pady=5)
@@ -156,8 +329,14 @@ class ComparisonFrame:
             'Scharr',
             'Prewitt',
             'Canny',
+            'Canny Hysteresis',
             'Canny CV2',
-            'Roberts'
+            'Roberts',
+            'Gaussian Gradient',
+            'Gaussian LoG',
+            'DoG',
+            'Multi-scale Gradient',
+            'Multi-scale LoG'
         ]
         self.method_combo.current(0)
         self.method_combo.pack(side="left", padx=5)
@@ -177,9 +356,31 @@ class ComparisonFrame:
         self.status_label = tk.Label(top, text=get_text('STATUS_NO_IMAGE'), fg="gray") # Zmiana
         self.status_label.pack(side="left", padx=10)
 
+        # --- postęp i anulowanie obliczeń w tle ---
+        self.run_id = 0
+        self.future = None
+        self.preview_future = None
+        self.cancel_event = None
+
+        self.progress = ttk.Progressbar(top, mode="indeterminate", length=80)
+        self.progress.pack(side="left", padx=3)
+
+        self.cancel_btn = tk.Button(top, text=get_text('CANCEL'), state="disabled", command=self.cancel_run)
+        self.cancel_btn.pack(side="left", padx=3)
+
         self.binary_var = tk.BooleanVar(value=False)
         self.binary_check = tk.Checkbutton(top, text=get_text('BINARYZATION'), variable=self.binary_var) # Zmiana
         self.binary_check.pack(side="left", padx=10)
+
+        # najpierw szybki podgląd z piramidy, potem pełna rozdzielczość
+        self.preview_var = tk.BooleanVar(value=True)
+        self.preview_check = tk.Checkbutton(top, text=get_text('PREVIEW'), variable=self.preview_var)
+        self.preview_check.pack(side="left", padx=10)
+
+        # czasy poszczególnych etapów obliczeń w pasku statusu
+        self.profile_var = tk.BooleanVar(value=False)
+        self.profile_check = tk.Checkbutton(top, text=get_text('PROFILE'), variable=self.profile_var)
+        self.profile_check.pack(side="left", padx=10)
         
         # Przycisk usuwania tej ramki (minus na ramce)
         self.remove_btn = tk.Button(top, text=get_text('REMOVE_FRAME'), width=3, command=self.remove_self)
@@ -240,11 +441,21 @@ class ComparisonFrame:
         self.canvas_list = self.canvas_list[:1]
         self.label_list = self.label_list[:1]
         self.save_buttons = self.save_buttons[:1]
+        # miniatury usuniętych kanw nie mogą być ponownie użyte
+        self.tk_images = self.tk_images[:1]
+        # pełnowymiarowe obrazy wyników (i ich powiększenia) też nie są już potrzebne
+        for pil_image in self.pil_images[1:]:
+            if pil_image is not None:
+                zoom_cache.discard(pil_image)
+        self.pil_images = self.pil_images[:1]
 
     # Nowa metoda do aktualizacji tekstów w ramce
     def update_texts(self):
         # Zaktualizuj etykiety stałe
         self.binary_check.config(text=get_text('BINARYZATION'))
+        self.cancel_btn.config(text=get_text('CANCEL'))
+        self.preview_check.config(text=get_text('PREVIEW'))
+        self.profile_check.config(text=get_text('PROFILE'))
 
         # Aktualizacja statusu
         if self.cv2_image is None:
@@ -284,19 +495,37 @@ class ComparisonFrame:
         self.pil_images[0] = pil_img
         self.status_label.config(text=get_text('STATUS_LOADED').format(os.path.basename(file_path)), fg="black") # Zmiana
 
+    def back_buffer(self, *shape):
+        """Bufor, którego nie używa wyświetlany wynik (alokowany ponownie tylko przy zmianie rozmiaru)."""
+        index = 1 - self.front_buffer
+        if self.buffers[index] is None or self.buffers[index].shape != shape:
+            self.buffers[index] = np.empty(shape, dtype=np.uint8)
+        return self.buffers[index]
+
     # --- wyświetlenie obrazu w kanwie ---
-    def display_image(self, pil_image, index):
+    def display_image(self, pil_image, index, keep=True):
+        """Wyświetla obraz w kanwie; `keep=False` (podgląd) nie udostępnia go do zapisu i powiększenia."""
         frame_size = 200
         pil_resized = resize_for_canvas(pil_image, frame_size)
-        img_tk = ImageTk.PhotoImage(pil_resized)
 
         while len(self.tk_images) <= index:
             self.tk_images.append(None)
         while len(self.pil_images) <= index:
             self.pil_images.append(None)
 
+        # bez kopii: obrazy wyników nie są później modyfikowane
+        if self.pil_images[index] is not None and self.pil_images[index] is not pil_image:
+            zoom_cache.discard(self.pil_images[index])
+        self.pil_images[index] = pil_image if keep else None
+
+        # ten sam rozmiar miniatury - podmieniamy piksele istniejącego PhotoImage
+        img_tk = self.tk_images[index]
+        if img_tk is not None and (img_tk.width(), img_tk.height()) == pil_resized.size:
+            img_tk.paste(pil_resized)
+            return
+
+        img_tk = ImageTk.PhotoImage(pil_resized)
         self.tk_images[index] = img_tk
-        self.pil_images[index] = pil_image.copy()
 
         canvas = self.canvas_list[index]
         canvas.delete("all")
@@ -329,74 +558,128 @@ class ComparisonFrame:
 
     # --- uruchomienie funkcji wykrywania ---
     def run_function(self):
-        self.clear_dynamic_canvases()
+        # nowsze uruchomienie zastępuje poprzednie, które jeszcze trwa
+        self.cancel_run(update_status=False)
 
         if self.cv2_image is None:
             self.status_label.config(text=get_text("STATUS_NO_IMAGE"), fg="red") # Zmiana
             return
 
-        color_space = self.color_space_combo.get()
-        method = self.method_combo.get()
-
-        low_t = int(self.low_threshold.get())
-        high_t = int(self.high_threshold.get())
-
-        try:
-            # Zmiana: przekazujemy funkcję get_text
-            img_rgb, edges, edges_sum, titles = detect_edges(
-                self.cv2_image,
-                color_space,
-                method,
-                translations_getter=get_text,
-                low_threshold=low_t,
-                high_threshold=high_t
-            )
-
-            img_rgb_pil = Image.fromarray(img_rgb)
-            self.display_image(img_rgb_pil, 0)
+        # parametry czytamy w wątku głównym - zmienne Tk nie są bezpieczne wątkowo
+        params = dict(
+            img=self.cv2_image,
+            image=shared_image_handle,
+            color_space=self.color_space_combo.get(),
+            method=self.method_combo.get(),
+            low_t=int(self.low_threshold.get()),
+            high_t=int(self.high_threshold.get()),
+            binary=self.binary_var.get(),
+            preview=shared_preview_cv2,
+            # bufor wybierany tutaj, w wątku Tk - należy tylko do tego uruchomienia
+            buffer=self.back_buffer(len(COLOR_SPACE_CHANNELS[self.color_space_combo.get()]) + 1,
+                                    *self.cv2_image.shape[:2]),
+            profile=self.profile_var.get(),
+        )
 
-            # Tytuły pochodzą teraz z edges_detection.py, titles zawiera [Kanał 1, Kanał 2, Kanał 3, Suma]
-            channel_titles = titles[:-1] # Pomijamy tytuł sumy
+        self.run_id += 1
+        self.cancel_event = threading.Event()
+        if self.preview_var.get() and shared_preview_cv2 is not None and shared_preview_cv2 is not self.cv2_image:
+            self.preview_future = worker_pool.submit(compute_preview, params, self.cancel_event)
+        self.future = worker_pool.submit(compute_edges, params, self.cancel_event)
 
-            # Najpierw twórz dynamiczne canvas
-            for i in range(len(channel_titles)):
-                # titles[i] to już przetłumaczona nazwa kanału (np. 'R' lub 'H')
-                self._create_canvas_block(f"{get_text('EDGE')} {channel_titles[i]}") # Zmiana
+        self.status_label.config(text=get_text("STATUS_RUNNING"), fg="blue")
+        self.progress.start(10)
+        self.cancel_btn.config(state="normal")
+        self.frame.after(POLL_INTERVAL_MS, self._poll_result, self.run_id)
 
-            # teraz uzupełnij obrazami
-            for i, e in enumerate(edges):
-                e_uint8 = (e * 255).astype(np.uint8) if e.max() <= 1 else e.astype(np.uint8)
-                e_uint8 = 255 - e_uint8
+    def _poll_result(self, run_id):
+        # wynik starszego (anulowanego) uruchomienia jest ignorowany
+        if run_id != self.run_id:
+            return
 
-                if self.binary_var.get():
-                    _, processed = cv2.threshold(e_uint8, 254, 255, cv2.THRESH_BINARY)
-                else:
-                    processed = e_uint8
+        # podgląd pokazujemy tylko, jeśli pełna rozdzielczość jeszcze się liczy
+        preview = self.preview_future
+        if preview is not None and preview.done():
+            self.preview_future = None
+            if not self.future.done() and not preview.cancelled() and preview.exception() is None:
+                self._show_result(preview.result(), preview=True)
 
-                edge_pil = Image.fromarray(processed)
-                self.display_image(edge_pil, i + 1)
+        future = self.future
+        if not future.done():
+            self.frame.after(POLL_INTERVAL_MS, self._poll_result, run_id)
+            return
 
-            e_sum_uint8 = (edges_sum * 255).astype(np.uint8) if edges_sum.max() <= 1 else edges_sum.astype(np.uint8)
-            e_sum_uint8 = 255 - e_sum_uint8
+        self._finish_run()
+        if future.cancelled():
+            return
+        try:
+            self._show_result(future.result())
+        except CancelledRun:
+            pass
+        except Exception as e:
+            messagebox.showerror(get_text("UNKNOWN_ERROR"), str(e)) # Zmiana
+            self.status_label.config(text=get_text("STATUS_ERROR"), fg="red") # Zmiana
 
-            if self.binary_var.get():
-                _, processed = cv2.threshold(e_sum_uint8, 254, 255, cv2.THRESH_BINARY)
-            else:
-                processed = e_sum_uint8
+    def _finish_run(self):
+        self.future = None
+        self.preview_future = None
+        self.cancel_event = None
+        self.progress.stop()
+        self.cancel_btn.config(state="disabled")
 
-            sum_pil = Image.fromarray(processed)
+    def cancel_run(self, update_status=True):
+        """Anuluje trwające obliczenia tej ramki (ich wynik nie zostanie wyświetlony)."""
+        if self.future is None:
+            return
+        if not self.future.done():
+            # anulowany wątek może jeszcze pisać do swojego bufora - następne
+            # uruchomienie dostanie nowy zamiast współdzielić go z nim
+            self.buffers[1 - self.front_buffer] = None
+        self.cancel_event.set()
+        self.future.cancel()
+        if self.preview_future is not None:
+            self.preview_future.cancel()
+        self.run_id += 1
+        self._finish_run()
+        if update_status:
+            self.status_label.config(text=get_text("STATUS_CANCELLED"), fg="gray")
+
+    def _show_result(self, result, preview=False):
+        img_rgb_pil, titles, edge_pils, sum_pil, profile = result
+
+        if img_rgb_pil is not None:
+            self.display_image(img_rgb_pil, 0)
 
-            # Canvas dla sumy (ostatni element z listy titles)
-            self._create_canvas_block(titles[-1])
-            self.display_image(sum_pil, len(self.canvas_list) - 1)
-            self.label_list[0].config(text=get_text("ORIGINAL")) # Zmiana
+        # Tytuły pochodzą teraz z edges_detection.py, titles zawiera [Kanał 1, Kanał 2, Kanał 3, Suma]
+        channel_titles = titles[:-1] # Pomijamy tytuł sumy
+        block_titles = [f"{get_text('EDGE')} {t}" for t in channel_titles] + [titles[-1]] # Zmiana
 
+        if len(self.canvas_list) - 1 == len(block_titles):
+            # ta sama liczba kanałów - kanwy zostają, zmieniamy tylko podpisy i piksele
+            for label, title in zip(self.label_list[1:], block_titles):
+                label.config(text=title)
+        else:
+            self.clear_dynamic_canvases()
+            # titles[i] to już przetłumaczona nazwa kanału (np. 'R' lub 'H'), ostatni blok to suma
+            for title in block_titles:
+                self._create_canvas_block(title)
+
+        # teraz uzupełnij obrazami
+        # podgląd nie trafia do zapisu - zastąpi go wynik w pełnej rozdzielczości
+        for i, edge_pil in enumerate(edge_pils + [sum_pil]):
+            self.display_image(edge_pil, i + 1, keep=not preview)
+        if not preview:
+            # bufor z tym wynikiem jest teraz wyświetlany, następne uruchomienie pisze do drugiego
+            self.front_buffer = 1 - self.front_buffer
+        self.label_list[0].config(text=get_text("ORIGINAL")) # Zmiana
+
+        if preview:
+            self.status_label.config(text=get_text("STATUS_PREVIEW"), fg="blue")
+        elif profile:
+            self.status_label.config(text=get_text("STATUS_READY_PROFILE").format(profile), fg="green")
+        else:
             self.status_label.config(text=get_text("STATUS_READY"), fg="green") # Zmiana
 
-        except Exception as e:
-            messagebox.showerror(get_text("UNKNOWN_ERROR"), str(e)) # Zmiana
-            self.status_label.config(text=get_text("STATUS_ERROR"), fg="red") # Zmiana
-
     def show_preview(self, event, index):
         if index >= len(self.pil_images) or self.pil_images[index] is None:
             return
@@ -412,7 +695,7 @@ class ComparisonFrame:
         zoom_w -= 10
         zoom_h -= 10
 
-        zoomed = img.resize((zoom_w, zoom_h), Image.LANCZOS)
+        zoomed = zoom_cache.get(img, (zoom_w, zoom_h))
         self.preview_img_tk = ImageTk.PhotoImage(zoomed)
 
         self.preview_window = tk.Toplevel()
@@ -450,6 +733,7 @@ class ComparisonFrame:
 
     def remove_self(self):
         """Usuwa tę instancję ComparisonFrame z listy i GUI."""
+        self.cancel_run(update_status=False)
         try:
             comparison_frames.remove(self)
         except ValueError:
@@ -473,6 +757,7 @@ def remove_comparison():
     if not comparison_frames:
         return
     last = comparison_frames.pop()
+    last.cancel_run(update_status=False)
     last.frame.destroy()
     update_scroll_region()
 
@@ -525,27 +810,26 @@ def switch_language(lang):
         frame.update_texts()
 
 
-# ===== Główne przyciski (Zmienione, aby umożliwić aktualizację tekstu) =====
-main_controls = tk.Frame(root, pady=10)
-main_controls.pack(fill="x")
-
-# przyciski zarządzania ramkami
-add_btn = tk.Button(main_controls, text=get_text('ADD_FRAME'), command=add_comparison, width=3)
-add_btn.pack(side="left", padx=5)
-
 # przycisk wyboru obrazu
 def choose_shared_image():
-    global shared_image_cv2, shared_image_pil, shared_image_path
+    global shared_image_cv2, shared_image_pil, shared_image_path, shared_image_handle, shared_preview_cv2
 
     file_path = filedialog.askopenfilename(title=get_text('CHOOSE_IMAGE'), # Zmiana
-                                           filetypes=[(get_text('FILETYPE'), "*.png;*.jpg;*.jpeg")], # Zmiana
+                                           filetypes=[(get_text('FILETYPE'), "*.png;*.jpg;*.jpeg;*.npy")], # Zmiana
                                            initialdir=SAMPLES_DIR)
     if not file_path:
         return
 
     try:
-        img_pil = Image.open(file_path).convert("RGB")
-        img_cv2 = cv2.cvtColor(np.array(img_pil), cv2.COLOR_RGB2BGR)
+        # jeden odczyt w BGR (pliki .npy są mapowane do pamięci), PIL tylko do podglądu
+        img_cv2 = open_image(file_path)
+        img_pil = Image.fromarray(np.ascontiguousarray(img_cv2[..., ::-1]))
+
+        # jedna kopia w pamięci współdzielonej dla wszystkich procesów roboczych
+        shared_image_handle = get_process_pool().share(img_cv2)
+
+        # mały poziom piramidy do szybkiego podglądu, liczony raz na obraz
+        shared_preview_cv2 = preview_level(img_cv2)
 
         shared_image_cv2 = img_cv2
         shared_image_pil = img_pil
@@ -559,72 +843,93 @@ def choose_shared_image():
         messagebox.showerror(get_text('UNKNOWN_ERROR'), str(e)) # Zmiana
 
 
-choose_img_btn = tk.Button(main_controls, text=get_text('CHOOSE_IMAGE'), command=choose_shared_image) # Zmiana
-choose_img_btn.pack(side="left", padx=10)
-
 # przycisk uruchom funkcję
 def run_all():
     if shared_image_cv2 is None:
         messagebox.showwarning(get_text('IMAGE_NOT_LOADED'), get_text('NO_IMAGE_SELECTED_WARNING')) # Zmiana
         return
+    # wszystkie ramki liczą się równolegle, każda wyświetla wynik gdy tylko jest gotowy
     for frame in comparison_frames:
         frame.run_function()
 
 
-run_all_btn = tk.Button(main_controls, text=get_text('RUN_FUNCTION'), command=run_all, bg="#4CAF50", fg="white") # Zmiana
-run_all_btn.pack(side="left", padx=10)
+def language_changed(event):
+    selected = lang_var.get()
+    if selected == get_text('LANG_PL'):
+        switch_language('pl')
+    elif selected == get_text('LANG_EN'):
+        switch_language('en')
 
-image_status_label = tk.Label(main_controls, text=get_text('IMAGE_NOT_LOADED'), fg="gray") # Zmiana
-image_status_label.pack(side="left", padx=10)
 
+# procesy robocze (spawn na Windows) importują ten plik ponownie - GUI budujemy tylko w procesie głównym
+if __name__ == '__main__':
+    root = tk.Tk()
+    root.title(get_text('APP_TITLE')) # Zmiana
+    root.geometry("1600x900")
 
-# Przełącznik języka (Dodany ponownie)
-lang_frame = tk.Frame(main_controls)
-lang_frame.pack(side="right", padx=10)
+    root.state("zoomed")
 
-lang_label = tk.Label(lang_frame, text=get_text('LANGUAGE'))
-lang_label.pack(side="left")
+    # ===== Główne przyciski (Zmienione, aby umożliwić aktualizację tekstu) =====
+    main_controls = tk.Frame(root, pady=10)
+    main_controls.pack(fill="x")
 
-lang_var = tk.StringVar(value=get_text('LANG_PL'))
+    # przyciski zarządzania ramkami
+    add_btn = tk.Button(main_controls, text=get_text('ADD_FRAME'), command=add_comparison, width=3)
+    add_btn.pack(side="left", padx=5)
 
-lang_combo = ttk.Combobox(
-    lang_frame,
-    textvariable=lang_var,
-    state="readonly",
-    width=15
-)
-lang_combo['values'] = [get_text('LANG_PL'), get_text('LANG_EN')]
-lang_combo.pack(side="left")
+    choose_img_btn = tk.Button(main_controls, text=get_text('CHOOSE_IMAGE'), command=choose_shared_image) # Zmiana
+    choose_img_btn.pack(side="left", padx=10)
 
-def language_changed(event):
-    selected = lang_var.get()
-    if selected == get_text('LANG_PL'):
-        switch_language('pl')
-    elif selected == get_text('LANG_EN'):
-        switch_language('en')
+    run_all_btn = tk.Button(main_controls, text=get_text('RUN_FUNCTION'), command=run_all, bg="#4CAF50", fg="white") # Zmiana
+    run_all_btn.pack(side="left", padx=10)
+
+    image_status_label = tk.Label(main_controls, text=get_text('IMAGE_NOT_LOADED'), fg="gray") # Zmiana
+    image_status_label.pack(side="left", padx=10)
+
+
+    # Przełącznik języka (Dodany ponownie)
+    lang_frame = tk.Frame(main_controls)
+    lang_frame.pack(side="right", padx=10)
+
+    lang_label = tk.Label(lang_frame, text=get_text('LANGUAGE'))
+    lang_label.pack(side="left")
+
+    lang_var = tk.StringVar(value=get_text('LANG_PL'))
+
+    lang_combo = ttk.Combobox(
+        lang_frame,
+        textvariable=lang_var,
+        state="readonly",
+        width=15
+    )
+    lang_combo['values'] = [get_text('LANG_PL'), get_text('LANG_EN')]
+    lang_combo.pack(side="left")
 
-lang_combo.bind('<<ComboboxSelected>>', language_changed)
+    lang_combo.bind('<<ComboboxSelected>>', language_changed)
 
 
-# ===== Sekcja przewijana =====
-scroll_container = tk.Frame(root)
-scroll_container.pack(fill="both", expand=True)
+    # ===== Sekcja przewijana =====
+    scroll_container = tk.Frame(root)
+    scroll_container.pack(fill="both", expand=True)
 
-canvas = tk.Canvas(scroll_container)
-canvas.pack(side="left", fill="both", expand=True)
+    canvas = tk.Canvas(scroll_container)
+    canvas.pack(side="left", fill="both", expand=True)
 
-scrollbar = tk.Scrollbar(scroll_container, orient="vertical", command=canvas.yview)
-scrollbar.pack(side="right", fill="y")
+    scrollbar = tk.Scrollbar(scroll_container, orient="vertical", command=canvas.yview)
+    scrollbar.pack(side="right", fill="y")
 
-canvas.configure(yscrollcommand=scrollbar.set)
+    canvas.configure(yscrollcommand=scrollbar.set)
 
-scrollable_frame = tk.Frame(canvas)
-scrollable_frame.bind("<Configure>", update_scroll_region)
-canvas.create_window((0, 0), window=scrollable_frame, anchor="nw")
+    scrollable_frame = tk.Frame(canvas)
+    scrollable_frame.bind("<Configure>", update_scroll_region)
+    canvas.create_window((0, 0), window=scrollable_frame, anchor="nw")
 
-canvas.bind_all("<MouseWheel>", on_mousewheel)
+    canvas.bind_all("<MouseWheel>", on_mousewheel)
 
-# start z jedną ramką
-add_comparison()
+    # start z jedną ramką
+    add_comparison()
 
-root.mainloop()
\ No newline at end of file
+    root.mainloop()
+    worker_pool.shutdown(wait=False, cancel_futures=True)
+    if process_pool is not None:
+        process_pool.close(wait=False)
@@ -0,0 +1,52 @@
+import os
+
+import cv2
+import pytest
+
+import edges_cli
+import edges_detection
+from edges_benchmark import synthetic_image
+from edges_cache import ResultCache
+
+JOBS = [('LAB', 'Sobel', 0, 255), ('LAB', 'Sobel', 50, 150), ('RGB', 'Canny', 50, 150)]
+
+
+@pytest.fixture
+def image_path(tmp_path):
+    path = str(tmp_path / 'scene.png')
+    cv2.imwrite(path, synthetic_image(64, 48, seed=2))
+    return path
+
+
+@pytest.fixture(autouse=True)
+def worker_caches(monkeypatch):
+    # the worker initializer replaces the module-level result cache and ignores Ctrl+C
+    monkeypatch.setattr(edges_detection, 'result_cache', ResultCache())
+    monkeypatch.setattr(edges_cli.signal, 'signal', lambda *args: None)
+    for cache in (edges_detection.conversion_cache, edges_detection.response_cache):
+        cache.clear()
+
+
+def test_worker_keeps_no_results_in_memory_without_cache_dir(tmp_path, image_path):
+    edges_cli._init_worker()
+    records = edges_cli.process_image(image_path, JOBS, str(tmp_path), options=dict(cache=False))
+
+    assert [r['status'] for r in records] == ['ok'] * len(JOBS)
+    for cache in (edges_detection.conversion_cache, edges_detection.response_cache,
+                  edges_detection.result_cache):
+        assert len(cache) == 0
+
+
+def test_worker_keeps_only_the_disk_layer_with_cache_dir(tmp_path, image_path):
+    cache_dir = str(tmp_path / 'cache')
+    edges_cli._init_worker(cache_dir)
+    edges_cli.process_image(image_path, JOBS, str(tmp_path), options=dict(cache=True))
+
+    assert len(os.listdir(cache_dir)) == len(JOBS)
+    for cache in (edges_detection.conversion_cache, edges_detection.response_cache,
+                  edges_detection.result_cache):
+        assert len(cache) == 0
+
+    # a rerun is served from disk
+    edges_cli.process_image(image_path, JOBS, str(tmp_path), options=dict(cache=True))
+    assert edges_detection.result_cache.disk_hits == len(JOBS)
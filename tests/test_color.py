@@ -0,0 +1,24 @@
+import numpy as np
+import pytest
+
+from edges_color import ConversionTables, cmyk_reference, color_lattice, decompose_cmyk, verify_tables
+
+
+def test_decompose_cmyk_matches_formula_on_every_color():
+    lattice = color_lattice(8)
+    np.testing.assert_array_equal(decompose_cmyk(lattice), cmyk_reference(lattice))
+
+
+@pytest.mark.parametrize('color_space', ['HSV', 'LAB', 'CMYK'])
+def test_8bit_tables_are_exact(color_space):
+    tables = ConversionTables()
+    max_error, mean_error = verify_tables((color_space,), bits=8, tables=tables)[color_space]
+    assert max(max_error) == 0
+    assert max(mean_error) == 0
+
+
+def test_tables_persist_in_cache_dir(tmp_path):
+    built = ConversionTables(str(tmp_path)).table('CMYK', bits=5)
+    loaded = ConversionTables(str(tmp_path)).table('CMYK', bits=5)
+    assert isinstance(loaded, np.memmap)
+    np.testing.assert_array_equal(loaded, built)
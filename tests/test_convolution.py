@@ -0,0 +1,53 @@
+import tracemalloc
+
+import cv2
+import numpy as np
+import pytest
+
+from edges_benchmark import synthetic_image
+from edges_methods import CONVOLUTION_BACKENDS, choose_backend, convolve2d_bank
+
+SOBEL_X = np.array([[-1, 0, 1], [-2, 0, 2], [-1, 0, 1]], dtype=np.float64)
+SOBEL_Y = SOBEL_X.T.copy()
+LAPLACIAN = np.array([[0, 1, 0], [1, -4, 1], [0, 1, 0]], dtype=np.float64)
+LOG = np.array([[0, 0, -1, 0, 0], [0, -1, -2, -1, 0], [-1, -2, 16, -2, -1],
+                [0, -1, -2, -1, 0], [0, 0, -1, 0, 0]], dtype=np.float64)
+
+
+@pytest.fixture
+def planes():
+    return np.moveaxis(synthetic_image(80, 60, seed=1), -1, 0)
+
+
+@pytest.mark.parametrize('kernels', [[SOBEL_X, SOBEL_Y], [LAPLACIAN], [LOG]])
+def test_auto_is_exact_on_integer_input(planes, kernels):
+    reference = convolve2d_bank(planes, kernels, backend='strided')
+    np.testing.assert_array_equal(convolve2d_bank(planes, kernels), reference)
+
+
+def test_auto_keeps_strided_rounding_on_float_input(planes):
+    blurred = np.stack([cv2.GaussianBlur(p.astype(np.float64), (5, 5), 1.4) for p in planes])
+    assert choose_backend(np.stack([SOBEL_X, SOBEL_Y]), np.float64, integer_input=False) == 'strided'
+    np.testing.assert_array_equal(convolve2d_bank(blurred, [SOBEL_X, SOBEL_Y]),
+                                  convolve2d_bank(blurred, [SOBEL_X, SOBEL_Y], backend='strided'))
+
+
+@pytest.mark.parametrize('backend', sorted(CONVOLUTION_BACKENDS))
+def test_backends_agree(planes, backend):
+    reference = convolve2d_bank(planes, [SOBEL_X, SOBEL_Y], backend='strided')
+    np.testing.assert_allclose(convolve2d_bank(planes, [SOBEL_X, SOBEL_Y], backend=backend),
+                               reference, atol=1e-9)
+
+
+@pytest.mark.parametrize('backend, kernels', [('bank', [LOG]), ('bank', [LAPLACIAN]),
+                                              ('separable', [SOBEL_X, SOBEL_Y])])
+def test_backend_peak_is_output_plus_padded_stack(backend, kernels):
+    # no (C, H, W, kh, kw) window copy: the output, the padded stack and a few planes
+    stack = np.moveaxis(synthetic_image(512, 512, seed=2), -1, 0).astype(np.float64)
+    cap = (len(kernels) + 1) * stack.nbytes + 3 * stack[0].nbytes
+
+    tracemalloc.start()
+    convolve2d_bank(stack, kernels, backend=backend, integer_input=True)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    assert peak <= cap
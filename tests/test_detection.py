@@ -0,0 +1,54 @@
+import numpy as np
+import pytest
+
+from edges_benchmark import synthetic_image
+from edges_detection import detect_edges, result_cache
+
+
+@pytest.fixture
+def img():
+    return synthetic_image(96, 64, seed=3)
+
+
+def test_memoized_result_is_read_only_on_miss_and_hit(img):
+    result_cache.clear()
+    _, edges, edges_sum, _ = detect_edges(img, 'LAB', 'Sobel')
+    expected = [e.copy() for e in edges]
+
+    for e in edges + [edges_sum]:
+        with pytest.raises(ValueError):
+            e[...] = 7
+
+    _, hit_edges, hit_sum, _ = detect_edges(img, 'LAB', 'Sobel')
+    for e in hit_edges + [hit_sum]:
+        with pytest.raises(ValueError):
+            e[...] = 7
+    for e, ref in zip(hit_edges, expected):
+        np.testing.assert_array_equal(e, ref)
+
+
+def test_uncached_result_is_writable(img):
+    _, edges, edges_sum, _ = detect_edges(img, 'RGB', 'Sobel', cache=False)
+    edges[0][...] = 7
+    edges_sum[...] = 7
+
+
+@pytest.mark.parametrize('color_space', ['RGB', 'LAB'])
+def test_buffer_modified_in_place_is_not_served_stale(img, color_space):
+    # a reused capture buffer: same object, new content
+    detect_edges(img, color_space, 'Canny', low_threshold=40, high_threshold=120)
+    img[:] = synthetic_image(96, 64, seed=4)
+
+    _, edges, edges_sum, _ = detect_edges(img, color_space, 'Canny', low_threshold=40, high_threshold=120)
+    _, ref_edges, ref_sum, _ = detect_edges(img, color_space, 'Canny', low_threshold=40, high_threshold=120,
+                                            cache=False)
+    for e, ref in zip(edges, ref_edges):
+        np.testing.assert_array_equal(e, ref)
+    np.testing.assert_array_equal(edges_sum, ref_sum)
+
+    # and a new threshold pair reuses the response of the new content
+    _, edges, _, _ = detect_edges(img, color_space, 'Canny', low_threshold=60, high_threshold=150)
+    _, ref_edges, _, _ = detect_edges(img, color_space, 'Canny', low_threshold=60, high_threshold=150,
+                                      cache=False)
+    for e, ref in zip(edges, ref_edges):
+        np.testing.assert_array_equal(e, ref)
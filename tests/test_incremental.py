@@ -0,0 +1,66 @@
+import cv2
+import pytest
+
+from edges_benchmark import synthetic_image
+from edges_incremental import IncrementalEdges, verify_incremental
+
+TILE = 32
+
+
+@pytest.fixture
+def frame():
+    return synthetic_image(160, 120, seed=7)
+
+
+def with_patch(frame, x, y, size, color):
+    changed = frame.copy()
+    cv2.rectangle(changed, (x, y), (x + size, y + size), color, -1)
+    return changed
+
+
+@pytest.mark.parametrize('method', ['Sobel', 'Laplacian LoG', 'Canny'])
+def test_unchanged_frame(frame, method):
+    incremental = IncrementalEdges('RGB', method, tile_size=TILE)
+    incremental.update(frame)
+    incremental.update(frame.copy())
+    assert incremental.dirty_fraction == 0
+    assert verify_incremental([frame, frame.copy()], 'RGB', method, tile_size=TILE) == []
+
+
+@pytest.mark.parametrize('color_space', ['RGB', 'LAB', 'CMYK'])
+@pytest.mark.parametrize('method', ['Sobel', 'Laplacian 4-neighbor', 'Canny', 'Roberts'])
+def test_local_change(frame, color_space, method):
+    # a patch with the scene's own colour range, so the normalization range may stay
+    changed = frame.copy()
+    changed[50:60, 70:80] = frame[20:30, 10:20]
+    incremental = IncrementalEdges(color_space, method, tile_size=TILE)
+    incremental.update(frame)
+    value_range = incremental.value_range
+    incremental.update(changed)
+    assert 0 < incremental.dirty_fraction < 1
+    assert incremental.value_range == value_range
+    assert verify_incremental([frame, changed, frame], color_space, method, tile_size=TILE) == []
+
+
+@pytest.mark.parametrize('method', ['Sobel', 'Scharr', 'Canny'])
+def test_change_moving_the_value_range(method):
+    # smooth scene (weak gradients), then a black / white square far stronger than any edge in it
+    frame = cv2.GaussianBlur(synthetic_image(160, 120, seed=2), (0, 0), 6)
+    changed = with_patch(with_patch(frame, 100, 70, 12, (255, 255, 255)), 106, 76, 6, (0, 0, 0))
+    incremental = IncrementalEdges('RGB', method, low_threshold=0, high_threshold=10**6, tile_size=TILE)
+    incremental.update(frame)
+    value_range = incremental.value_range
+    incremental.update(changed)
+    assert incremental.value_range != value_range
+    assert verify_incremental([frame, changed, frame], 'RGB', method, low_threshold=0,
+                              high_threshold=10**6, tile_size=TILE) == []
+
+
+@pytest.mark.parametrize('color_space', ['RGB', 'HSV'])
+def test_linked_hysteresis(frame, color_space):
+    # a new edge chain crossing tile borders, linked to strong pixels elsewhere
+    changed = frame.copy()
+    cv2.line(changed, (5, 5), (150, 110), (255, 255, 255), 2)
+    frames = [frame, changed, with_patch(changed, 60, 40, 8, (0, 0, 0)), frame]
+    assert verify_incremental(frames, color_space, 'Canny Hysteresis', low_threshold=20,
+                              high_threshold=80, tile_size=TILE) == []
@@ -0,0 +1,38 @@
+import numpy as np
+import pytest
+
+from edges_benchmark import synthetic_image
+from edges_io import open_image
+
+
+def test_npy_image_is_memory_mapped(tmp_path):
+    img = synthetic_image(40, 30, seed=1)
+    path = str(tmp_path / 'img.npy')
+    np.save(path, img)
+
+    opened = open_image(path)
+    assert isinstance(opened, np.memmap)
+    np.testing.assert_array_equal(opened, img)
+
+
+@pytest.mark.parametrize('array', [
+    np.zeros((30, 40), dtype=np.uint8),        # grayscale
+    np.zeros((30, 40, 4), dtype=np.uint8),     # BGRA
+    np.zeros((30, 40, 3), dtype=np.uint16),    # 16-bit
+])
+def test_npy_image_that_is_not_bgr_uint8_is_rejected(tmp_path, array):
+    path = str(tmp_path / 'img.npy')
+    np.save(path, array)
+    with pytest.raises(ValueError, match=r'\(H, W, 3\) uint8'):
+        open_image(path)
+
+
+def test_raw_image_needs_three_channels(tmp_path):
+    path = str(tmp_path / 'img.raw')
+    np.zeros((30, 40, 4), dtype=np.uint8).tofile(path)
+
+    assert open_image(path, shape=(30, 40, 3), offset=120).shape == (30, 40, 3)
+    with pytest.raises(ValueError, match=r'\(H, W, 3\)'):
+        open_image(path, shape=(30, 40, 4))
+    with pytest.raises(ValueError, match=r'\(H, W, 3\)'):
+        open_image(path, shape=(30, 40))
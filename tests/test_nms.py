@@ -0,0 +1,45 @@
+import os
+
+import cv2
+import numpy as np
+import pytest
+
+from edges_benchmark import SAMPLES_DIR
+from edges_io import open_image
+from edges_methods import canny_edges, fast_convolve2d, non_max_suppression, non_max_suppression_loop
+
+SAMPLES = sorted(os.listdir(SAMPLES_DIR))
+
+SOBEL_X = np.array([[-1, 0, 1], [-2, 0, 2], [-1, 0, 1]], dtype=np.float64)
+SOBEL_Y = SOBEL_X.T.copy()
+
+
+def legacy_gradients(channel):
+    """Blur and per-kernel gradients of the original `canny_edges`."""
+    blurred = cv2.GaussianBlur(channel.astype(np.float64), (5, 5), 1.4)
+    Ix = fast_convolve2d(blurred, SOBEL_X, backend='strided')
+    Iy = fast_convolve2d(blurred, SOBEL_Y, backend='strided')
+    return np.hypot(Ix, Iy), np.arctan2(Iy, Ix)
+
+
+def legacy_canny(channel, low_t, high_t):
+    mag, angle = legacy_gradients(channel)
+    nms = np.clip(non_max_suppression_loop(mag, angle), low_t, high_t)
+    return cv2.normalize(nms, None, 0, 255, cv2.NORM_MINMAX).astype(np.uint8)
+
+
+@pytest.fixture(scope='module', params=SAMPLES)
+def channel(request):
+    img = open_image(os.path.join(SAMPLES_DIR, request.param))
+    return np.ascontiguousarray(img[..., 1])
+
+
+def test_vectorized_nms_matches_loop(channel):
+    mag, angle = legacy_gradients(channel)
+    np.testing.assert_array_equal(non_max_suppression(mag, angle.copy()),
+                                  non_max_suppression_loop(mag, angle.copy()))
+
+
+@pytest.mark.parametrize('low_t, high_t', [(0, 255), (40, 120)])
+def test_canny_edges_matches_loop(channel, low_t, high_t):
+    np.testing.assert_array_equal(canny_edges(channel, low_t, high_t), legacy_canny(channel, low_t, high_t))
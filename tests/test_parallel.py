@@ -0,0 +1,42 @@
+import numpy as np
+import pytest
+
+from edges_benchmark import synthetic_image
+from edges_detection import detect_edges
+from edges_parallel import SharedImagePool
+
+
+@pytest.fixture
+def pool():
+    pool = SharedImagePool(max_workers=2)
+    yield pool
+    pool.close()
+
+
+def test_rerun_with_new_thresholds_reuses_the_warm_worker(pool):
+    img = synthetic_image(96, 64, seed=1)
+    image = pool.share(img)
+
+    # a first run on each worker, so a rerun could land on either
+    pool.submit(image, 'LAB', 'Sobel').result()
+    first = pool.submit(image, 'RGB', 'Sobel', profile=True).result()
+    worker = pool.worker_of(image, 'RGB', 'Sobel')
+    for low in (20, 40, 60):
+        rerun = pool.submit(image, 'RGB', 'Sobel', low_threshold=low, profile=True).result()
+        assert pool.worker_of(image, 'RGB', 'Sobel') == worker
+        # the response stage comes from the worker's cache
+        assert 'sobel_response' not in [e.name for e in rerun[3]]
+
+        _, edges, edges_sum, _ = detect_edges(img, 'RGB', 'Sobel', low_threshold=low, cache=False)
+        np.testing.assert_array_equal(rerun[0], np.stack(edges))
+        np.testing.assert_array_equal(rerun[1], edges_sum)
+    assert 'sobel_response' in [e.name for e in first[3]]
+
+
+def test_affinity_is_dropped_with_the_released_image(pool):
+    image = pool.share(synthetic_image(32, 32, seed=1))
+    pool.submit(image, 'RGB', 'Sobel').result()
+    assert pool.worker_of(image, 'RGB', 'Sobel') is not None
+
+    pool.share(synthetic_image(32, 32, seed=2))
+    assert pool.worker_of(image, 'RGB', 'Sobel') is None
@@ -0,0 +1,49 @@
+import os
+
+import numpy as np
+import pytest
+
+from edges_benchmark import SAMPLES_DIR, synthetic_image
+from edges_detection import METHODS, detect_edges
+from edges_io import open_image
+
+# documented tolerances vs float64 (edges_methods docstring):
+# (max gray level difference, max share of differing pixels)
+EXACT = (0, 0.0)
+TOLERANCES = {
+    'Laplacian 4-neighbor': EXACT,
+    'Laplacian 8-neighbor': EXACT,
+    'Laplacian LoG': EXACT,
+    'Canny CV2': EXACT,
+    'Canny': (255, 0.016),
+    'Canny Hysteresis': (255, 0.008),
+    'Multi-scale LoG': (2, 0.05),
+}
+DEFAULT_TOLERANCE = (1, 0.01)
+
+IMAGES = ['synthetic', 'lena.jpg', 'shapes.png']
+
+
+@pytest.fixture(scope='module', params=IMAGES)
+def img(request):
+    if request.param == 'synthetic':
+        return synthetic_image(160, 120, seed=7)
+    return np.ascontiguousarray(open_image(os.path.join(SAMPLES_DIR, request.param)))
+
+
+@pytest.mark.parametrize('precision', ['float32', 'integer'])
+@pytest.mark.parametrize('method', sorted(METHODS))
+def test_precision_stays_within_documented_tolerance(img, method, precision):
+    max_diff, max_share = TOLERANCES.get(method, DEFAULT_TOLERANCE)
+    for color_space in ('RGB', 'LAB'):
+        # a low threshold of 0 makes every residual magnitude a weak edge candidate
+        for low, high in ((0, 255), (50, 150)):
+            _, edges, edges_sum, _ = detect_edges(img, color_space, method, low_threshold=low,
+                                                  high_threshold=high, cache=False)
+            _, other, other_sum, _ = detect_edges(img, color_space, method, low_threshold=low,
+                                                  high_threshold=high, precision=precision,
+                                                  cache=False)
+            for e, o in zip(edges + [edges_sum], other + [other_sum]):
+                diff = np.abs(e.astype(np.int16) - o)
+                assert diff.max() <= max_diff
+                assert np.count_nonzero(diff) <= max_share * diff.size
@@ -0,0 +1,78 @@
+import threading
+
+import numpy as np
+
+from edges_benchmark import synthetic_image
+from edges_detection import detect_edges
+from edges_profile import Profiler, active_profiler, profiled, summarize
+
+
+@profiled
+def allocate(n):
+    scratch = np.ones(n, dtype=np.uint8)
+    return scratch[:10].copy()
+
+
+def test_overlapping_profilers_in_threads():
+    entered = threading.Barrier(2)
+    first_out = threading.Event()
+    seen = {}
+
+    def first():
+        with Profiler() as prof:
+            entered.wait()
+            allocate(100)
+        seen['first'] = prof
+        first_out.set()
+        seen['first_after'] = active_profiler()
+
+    def second():
+        with Profiler() as prof:
+            entered.wait()
+            first_out.wait()
+            allocate(100)
+            allocate(100)
+        seen['second'] = prof
+        seen['second_after'] = active_profiler()
+
+    threads = [threading.Thread(target=first), threading.Thread(target=second)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(seen['first'].events) == 1
+    assert len(seen['second'].events) == 2
+    assert seen['first_after'] is None and seen['second_after'] is None
+    assert active_profiler() is None
+
+
+def test_nested_profilers_restore_the_outer_one():
+    with Profiler() as outer:
+        with Profiler() as inner:
+            allocate(10)
+        assert active_profiler() is outer
+        allocate(10)
+    assert active_profiler() is None
+    assert len(inner.events) == 1 and len(outer.events) == 1
+
+
+def test_alloc_bytes_with_trace_memory():
+    with Profiler(trace_memory=True) as prof:
+        allocate(2**20)
+    event, = prof.events
+    assert event.out_bytes == 10
+    assert event.alloc_bytes >= 2**20
+
+    with Profiler() as prof:
+        allocate(2**20)
+    assert prof.events[0].alloc_bytes is None
+
+
+def test_stages_of_detect_edges_are_recorded():
+    img = synthetic_image(64, 48)
+    with Profiler(trace_memory=True) as prof:
+        detect_edges(img, 'LAB', 'Sobel', cache=False)
+    summary = summarize(prof.events)
+    assert {'detect_edges', 'decompose_color_space', 'sobel_response', 'fuse_edges'} <= set(summary)
+    assert summary['detect_edges']['alloc_bytes'] >= summary['sobel_response']['alloc_bytes'] > 0
@@ -0,0 +1,38 @@
+import numpy as np
+import pytest
+
+from edges_benchmark import synthetic_image
+from edges_detection import detect_edges, detect_edges_coarse_to_fine
+from edges_pyramid import MIN_COARSE_SIDE, capped_levels
+
+
+@pytest.fixture
+def img():
+    return synthetic_image(256, 192, seed=5)
+
+
+@pytest.mark.parametrize('method', ['Sobel', 'Laplacian LoG', 'Canny'])
+def test_roi_equals_full_run(img, method):
+    edges, edges_sum, mask = detect_edges_coarse_to_fine(img, 'RGB', method, levels=2, tile_size=32)
+    _, full_edges, full_sum, _ = detect_edges(img, 'RGB', method, cache=False)
+    assert mask.any()
+    np.testing.assert_array_equal(edges_sum[mask], full_sum[mask])
+
+
+def test_levels_are_capped(img):
+    assert capped_levels(img.shape, 8) == 3
+    assert min(img.shape[:2]) >> capped_levels(img.shape, 8) >= MIN_COARSE_SIDE
+    _, _, edges_sum, _ = detect_edges(img, 'RGB', 'Sobel', pyramid_levels=8)
+    assert edges_sum.any()
+
+
+def test_rejects_tiling(img):
+    with pytest.raises(ValueError):
+        detect_edges(img, 'RGB', 'Sobel', pyramid_levels=2, tile_size=64)
+    with pytest.raises(ValueError):
+        detect_edges(img, 'RGB', 'Sobel', pyramid_levels=2, max_memory=2**20)
+
+
+def test_rejects_operators_without_response_stage(img):
+    with pytest.raises(ValueError):
+        detect_edges(img, 'RGB', 'Canny CV2', pyramid_levels=2)
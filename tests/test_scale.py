@@ -0,0 +1,55 @@
+import os
+
+import numpy as np
+import pytest
+from scipy.ndimage import gaussian_filter
+from scipy.signal import lfilter, lfilter_zi
+
+from edges_benchmark import SAMPLES_DIR
+from edges_io import open_image
+from edges_scale import RECURSIVE_MIN_SIGMA, _recursive_coefficients, _recursive_pass, gaussian_blur
+
+
+@pytest.fixture(scope='module')
+def planes():
+    img = open_image(os.path.join(SAMPLES_DIR, 'lena.jpg'))
+    return np.ascontiguousarray(np.moveaxis(img, -1, 0), dtype=np.float64)
+
+
+def _replicated_reference(x, b, a, pad):
+    # the recursive passes over a long replicated border, started from the steady state
+    padded = np.pad(x, pad, mode='edge')
+    zi = lfilter_zi(b, a)
+    y, _ = lfilter(b, a, padded, zi=zi * padded[0])
+    y, _ = lfilter(b, a, y[::-1], zi=zi * y[-1])
+    return y[::-1][pad:-pad]
+
+
+@pytest.mark.parametrize('sigma', [0.5, 3.0, RECURSIVE_MIN_SIGMA, 40.0])
+def test_recursive_pass_is_exact_at_replicated_borders(sigma):
+    rng = np.random.default_rng(0)
+    lines = rng.uniform(0, 255, (4, 300))
+    lines[:, -40:] += 300
+    b, a = _recursive_coefficients(sigma)
+
+    reference = np.stack([_replicated_reference(x, b, a, int(60 * sigma) + 50) for x in lines])
+    np.testing.assert_allclose(_recursive_pass(lines, b, a, -1), reference, atol=1e-6)
+    np.testing.assert_allclose(_recursive_pass(lines.T, b, a, 0).T, reference, atol=1e-6)
+
+
+@pytest.mark.parametrize('sigma', [2.0, 8.0, RECURSIVE_MIN_SIGMA - 0.1])
+def test_fir_blur_matches_gaussian_filter(planes, sigma):
+    reference = np.stack([gaussian_filter(p, sigma, mode='mirror', truncate=4.0) for p in planes])
+    np.testing.assert_allclose(gaussian_blur(planes, sigma, 'fir'), reference, atol=1e-9)
+
+
+@pytest.mark.parametrize('sigma', [RECURSIVE_MIN_SIGMA, 40.0])
+def test_recursive_blur_is_as_accurate_at_the_border_as_inside(planes, sigma):
+    reference = np.stack([gaussian_filter(p, sigma, mode='nearest', truncate=4.0) for p in planes])
+    error = np.abs(gaussian_blur(planes, sigma, 'recursive') - reference)
+
+    margin = int(3 * sigma)
+    interior = error[:, margin:-margin, margin:-margin].max()
+    # the approximation error of the recursive Gaussian, about 1%
+    assert interior <= 2
+    assert error.max() <= interior + 0.5
@@ -0,0 +1,47 @@
+import os
+import tracemalloc
+
+import numpy as np
+import pytest
+
+from edges_benchmark import SAMPLES_DIR, synthetic_image
+from edges_detection import METHODS, detect_edges
+from edges_io import open_image
+
+# cv2.Canny links edges inside the library, across tile borders only within its halo
+TILE_EXACT_METHODS = sorted(m for m in METHODS if m != 'Canny CV2')
+
+
+@pytest.fixture(scope='module', params=['synthetic', 'blocks.jpg'])
+def img(request):
+    # blocks.jpg has its strongest scale-space responses on the image border
+    if request.param == 'synthetic':
+        return synthetic_image(150, 110, seed=5)
+    return np.ascontiguousarray(open_image(os.path.join(SAMPLES_DIR, request.param)))
+
+
+@pytest.mark.parametrize('color_space', ['RGB', 'HSV', 'LAB', 'CMYK'])
+@pytest.mark.parametrize('method', TILE_EXACT_METHODS)
+def test_tiled_equals_whole_image(img, method, color_space):
+    _, edges, edges_sum, _ = detect_edges(img, color_space, method, low_threshold=30,
+                                          high_threshold=100, cache=False)
+    _, tiled, tiled_sum, _ = detect_edges(img, color_space, method, low_threshold=30,
+                                          high_threshold=100, tile_size=37)
+    for e, t in zip(edges, tiled):
+        np.testing.assert_array_equal(t, e)
+    np.testing.assert_array_equal(tiled_sum, edges_sum)
+
+
+@pytest.mark.parametrize('precision', ['float64', 'float32', 'integer'])
+@pytest.mark.parametrize('method', sorted(METHODS))
+def test_traced_peak_stays_within_max_memory(method, precision):
+    img = synthetic_image(640, 480, seed=5)
+    max_memory = 8 * 2**20
+    # the output is the caller's, not part of the working set
+    out = np.empty((5,) + img.shape[:2], dtype=np.uint8)
+
+    tracemalloc.start()
+    detect_edges(img, 'CMYK', method, precision=precision, max_memory=max_memory, out=out)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    assert peak <= max_memory